@@ -15,7 +15,6 @@ from rest_framework.response import Response
 from rest_framework import status as response_status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound, NotAcceptable
-from rest_framework.pagination import LimitOffsetPagination
 
 # JWT
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -35,12 +34,13 @@ from .serializers import (
 
 # GET MODELS FROM GLOBAL UTILS
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from apps.person.utils.permissions import IsUserSelfOrReject
 
 Account = get_model('person', 'Account')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset of user list, newest first
+_ORDERING = ('-date_joined', '-id',)
 
 
 class UserApiView(viewsets.ViewSet):
@@ -93,13 +93,13 @@ class UserApiView(viewsets.ViewSet):
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
@@ -108,7 +108,8 @@ class UserApiView(viewsets.ViewSet):
     def list(self, request, format=None):
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        self.paginator = KeysetPagination(ordering=_ORDERING)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = UserSerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
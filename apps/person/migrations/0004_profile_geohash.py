@@ -0,0 +1,34 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:58
+
+from django.db import migrations, models
+
+from utils.geo import encode_geohash
+
+
+def fill_geohash(apps, schema_editor):
+    Profile = apps.get_model('person', 'Profile')
+
+    objs = list(Profile.objects.filter(latitude__isnull=False, longitude__isnull=False))
+    for obj in objs:
+        obj.geohash = encode_geohash(obj.latitude, obj.longitude)
+    Profile.objects.bulk_update(objs, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('person', '0003_profile_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['geohash'], name='profile_geohash_idx'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
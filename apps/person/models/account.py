@@ -7,6 +7,7 @@ from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.core.validators import validate_email
 
 from utils.generals import get_model
+from utils.geo import encode_geohash
 from apps.person.utils.constant import EMAIL_VALIDATION, TELEPHONE_VALIDATION
 
 
@@ -15,7 +16,7 @@ class AbstractAccount(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
                                 related_name='account')
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -31,6 +32,10 @@ class AbstractAccount(models.Model):
         ordering = ['-user__date_joined']
         verbose_name = _("Account")
         verbose_name_plural = _("Accounts")
+        indexes = [
+            models.Index(fields=['email'], name='account_email_idx'),
+            models.Index(fields=['telephone'], name='account_telephone_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
@@ -71,7 +76,7 @@ class AbstractProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
                                 related_name='profile')
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -79,12 +84,27 @@ class AbstractProfile(models.Model):
     picture = models.ImageField(upload_to=_UPLOAD_TO, max_length=500, null=True,
                                 blank=True)
 
+    # base position of Operator, used when dispatching Purchase
+    latitude = models.FloatField(blank=True, null=True, verbose_name=_("Latitude"))
+    longitude = models.FloatField(blank=True, null=True, verbose_name=_("Longitude"))
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
+
     class Meta:
         abstract = True
         app_label = 'person'
         ordering = ['-user__date_joined']
         verbose_name = _("Profile")
         verbose_name_plural = _("Profiles")
+        indexes = [
+            models.Index(fields=['geohash'], name='profile_geohash_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
+
+    def save(self, *args, **kwargs):
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields', None)
+        if update_fields and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
@@ -65,7 +65,7 @@ class AbstractOTPCode(models.Model):
                              null=True, blank=True, related_name='otps',
                              related_query_name='otp')
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
     date_expired = models.DateTimeField(blank=True, null=True, editable=False)
@@ -96,6 +96,10 @@ class AbstractOTPCode(models.Model):
         app_label = 'person'
         verbose_name = _('OTP Code')
         verbose_name_plural = _('OTP Codes')
+        indexes = [
+            models.Index(fields=['email', 'identifier'], name='otp_email_identifier_idx'),
+            models.Index(fields=['telephone', 'identifier'], name='otp_telephone_identifier_idx'),
+        ]
 
     def __str__(self):
         return self.otp_code
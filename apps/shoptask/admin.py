@@ -6,6 +6,7 @@ from utils.generals import get_model
 
 Attachment = get_model('shoptask', 'Attachment')
 ChangeLog = get_model('shoptask', 'ChangeLog')
+Tombstone = get_model('shoptask', 'Tombstone')
 Purchase = get_model('shoptask', 'Purchase')
 Necessary = get_model('shoptask', 'Necessary')
 Goods = get_model('shoptask', 'Goods')
@@ -47,6 +48,7 @@ class GoodsExtend(admin.ModelAdmin):
 
 
 admin.site.register(ChangeLog)
+admin.site.register(Tombstone)
 admin.site.register(Attachment)
 
 admin.site.register(Purchase)
@@ -1,6 +1,10 @@
+from django.db import models
+
 from rest_framework import serializers
+from rest_framework.exceptions import NotAcceptable
 
 from utils.generals import get_model
+from apps.shoptask.utils.picture import PictureResolver
 
 Category = get_model('shoptask', 'Category')
 Brand = get_model('shoptask', 'Brand')
@@ -27,6 +31,36 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
                 self.fields.pop(field_name)
 
 
+class PictureListSerializer(serializers.ListSerializer):
+    """
+    Resolve pictures for whole page at once,
+    child serializer read it from `picture_resolver`,
+    skipped when the child dropped `picture` field
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        iterable = list(iterable)
+
+        if 'picture' in self.child.fields:
+            self.child.picture_resolver = PictureResolver(iterable)
+        return super().to_representation(iterable)
+
+
+class PictureMixin:
+    """Serializer with `picture` field use this for `get_picture`"""
+    picture_resolver = None
+
+    def get_picture(self, obj):
+        request = self.context.get('request', None)
+        if not request:
+            raise NotAcceptable()
+
+        if self.picture_resolver is None:
+            self.picture_resolver = PictureResolver([obj])
+        return self.picture_resolver.get_url(obj, request)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
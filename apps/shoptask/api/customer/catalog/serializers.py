@@ -12,6 +12,7 @@ from apps.person.utils.auth import CurrentUserDefault
 from apps.shoptask.utils.constant import DRAFT, SUBMITTED, CATALOG_ATTRIBUTE_METRICS
 
 from apps.person.api.user.serializers import SingleUserSerializer
+from ..base.serializers import PictureListSerializer, PictureMixin
 
 Catalog = get_model('shoptask', 'Catalog')
 Attachment = get_model('shoptask', 'Attachment')
@@ -23,7 +24,7 @@ class AttachmentSerializer(serializers.ModelSerializer):
         fields = ('value_image',)
 
 
-class CatalogSerializer(serializers.ModelSerializer):
+class CatalogSerializer(PictureMixin, serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(
         view_name='customer:catalog-detail', lookup_field='uuid',
         read_only=True)
@@ -34,16 +35,7 @@ class CatalogSerializer(serializers.ModelSerializer):
     class Meta:
         model = Catalog
         fields = ('id', 'uuid', 'label', 'url', 'picture', 'default_metric',)
-
-    def get_picture(self, obj):
-        request = self.context.get('request', None)
-        if not request:
-            raise NotAcceptable()
-
-        picture = obj.pictures.first()
-        if picture and picture.value_image:
-            return request.build_absolute_uri(picture.value_image.url)
-        return None
+        list_serializer_class = PictureListSerializer
 
     def get_goods(self, obj):
         """
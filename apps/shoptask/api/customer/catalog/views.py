@@ -12,11 +12,12 @@ from rest_framework import status as response_status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from utils.validators import check_uuid
 from apps.shoptask.utils.constant import PUBLISH
+from apps.shoptask.utils.cache import CountCache, user_scope, CATALOG_SCOPE
 
 from .serializers import CatalogSerializer, CatalogSingleSerializer
 from apps.shoptask.api.customer.necessary.serializers import NecessarySingleSerializer
@@ -25,8 +26,8 @@ Catalog = get_model('shoptask', 'Catalog')
 Goods = get_model('shoptask', 'Goods')
 Necessary = get_model('shoptask', 'Necessary')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset for list, paginator created each request
+_ORDERING = ('label', 'id',)
 
 
 class CatalogApiView(viewsets.ViewSet):
@@ -72,8 +73,8 @@ class CatalogApiView(viewsets.ViewSet):
             except ObjectDoesNotExist:
                 raise NotFound()
 
-        queryset = Catalog.objects.prefetch_related(Prefetch('category'), Prefetch('brand'), Prefetch('pictures')) \
-            .select_related('category', 'brand') \
+        queryset = Catalog.objects.prefetch_related(Prefetch('category'), Prefetch('brand')) \
+            .select_related('category', 'brand', 'primary_picture') \
             .filter(status=PUBLISH) \
             .exclude(
                 Q(goods_catalog__goods__necessary__isnull=False),
@@ -101,13 +102,13 @@ class CatalogApiView(viewsets.ViewSet):
         necessary_obj_serializer = NecessarySingleSerializer(necessary_obj, many=False, context=context)
 
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
         response['necessary'] = necessary_obj_serializer.data
         response['results'] = serializer.data
@@ -117,7 +118,10 @@ class CatalogApiView(viewsets.ViewSet):
     def list(self, request, format=None):
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        counter = CountCache(request, scopes=(user_scope(request.user.id), CATALOG_SCOPE,),
+                              approximate=True)
+        self.paginator = KeysetPagination(ordering=_ORDERING, counter=counter)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = CatalogSerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
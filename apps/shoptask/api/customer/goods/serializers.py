@@ -1,3 +1,5 @@
+from uuid import uuid4
+
 from django.conf import settings
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
@@ -12,8 +14,11 @@ from utils.generals import get_model
 from utils.validators import check_uuid
 from apps.person.utils.auth import CurrentUserDefault
 from apps.shoptask.utils.constant import DRAFT, SUBMITTED, DONE
+from apps.shoptask.utils.progress import update_progress
+from apps.shoptask.utils.cache import invalidate_counts, user_scope
 
 from apps.person.api.user.serializers import SingleUserSerializer
+from apps.shoptask.api.customer.base.serializers import PictureListSerializer, PictureMixin
 
 Goods = get_model('shoptask', 'Goods')
 GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
@@ -21,6 +26,9 @@ GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
 Catalog = get_model('shoptask', 'Catalog')
 Necessary = get_model('shoptask', 'Necessary')
 
+# Max Goods created in one request
+BULK_GOODS_LIMIT = 100
+
 
 class GoodsCatalogSerializer(serializers.ModelSerializer):
     default_metric = serializers.CharField(read_only=True, source='catalog.default_metric')
@@ -32,7 +40,7 @@ class GoodsCatalogSerializer(serializers.ModelSerializer):
         extra_kwargs = {'goods': {'read_only': True}}
 
 
-class GoodsSerializer(serializers.ModelSerializer):
+class GoodsSerializer(PictureMixin, serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(
         view_name='customer:goods-detail', lookup_field='uuid',
         read_only=True)
@@ -44,29 +52,18 @@ class GoodsSerializer(serializers.ModelSerializer):
     picture = serializers.SerializerMethodField(read_only=True)
     goods_catalogs = GoodsCatalogSerializer()
     necessary_uuid = serializers.UUIDField(source='necessary.uuid', read_only=True)
-    goods_assigned_uuid = serializers.UUIDField(read_only=True)
+    goods_assigned_uuid = serializers.UUIDField(source='assigned.uuid', read_only=True)
 
     class Meta:
         model = Goods
         fields = ('id', 'uuid', 'label', 'url', 'is_done', 'is_skip', 'is_accept',
                   'is_from_catalog', 'quantity', 'metric', 'metric_display', 'price',
                   'description', 'necessary', 'necessary_uuid', 'goods_assigned_uuid',
-                  'picture', 'goods_catalogs',)
-
-    def get_picture(self, obj):
-        request = self.context.get('request', None)
-        if not request:
-            raise NotAcceptable()
+                  'status', 'picture', 'goods_catalogs',)
+        list_serializer_class = PictureListSerializer
 
-        # Get image from Catalog if image from Goods not defined
-        if not obj.pictures.exists():
-            catalog_picture_path = obj.catalog_picture
-            if catalog_picture_path:
-                return request.build_absolute_uri(settings.MEDIA_URL + catalog_picture_path)
-        return None
 
-
-class GoodsSingleSerializer(serializers.ModelSerializer):
+class GoodsSingleSerializer(PictureMixin, serializers.ModelSerializer):
     is_done = serializers.BooleanField(read_only=True)
     is_skip = serializers.BooleanField(read_only=True)
     is_accept = serializers.BooleanField(read_only=True)
@@ -80,22 +77,6 @@ class GoodsSingleSerializer(serializers.ModelSerializer):
         model = Goods
         fields = '__all__'
 
-    def get_picture(self, obj):
-        request = self.context.get('request', None)
-        if not request:
-            raise NotAcceptable()
-
-        # Get image from Catalog if image from Goods not defined
-        if not obj.pictures.exists():
-            goods_catalogs = getattr(obj, 'goods_catalogs', None)
-            if goods_catalogs:
-                catalog = getattr(goods_catalogs, 'catalog', None)
-                catalog_picture_path = catalog.pictures.first()
-                value_image = getattr(catalog_picture_path, 'value_image', None)
-                if value_image:
-                    return request.build_absolute_uri(value_image.url)
-        return None
-
 
 class GoodsFactorySerializer(serializers.ModelSerializer):
     """
@@ -185,6 +166,108 @@ class GoodsFactorySerializer(serializers.ModelSerializer):
         return instance
 
 
+class GoodsBulkItemSerializer(serializers.ModelSerializer):
+    """
+    :label generated from Catalog name if create from Catalog
+    """
+    catalog_uuid = serializers.UUIDField(required=False, write_only=True)
+
+    class Meta:
+        model = Goods
+        fields = ('label', 'description', 'quantity', 'metric', 'catalog_uuid',)
+        extra_kwargs = {'label': {'required': False}}
+
+    def validate(self, attrs):
+        if not attrs.get('label', None) and not attrs.get('catalog_uuid', None):
+            raise serializers.ValidationError({'label': _("This field is required.")})
+        return attrs
+
+
+class GoodsBulkFactorySerializer(serializers.Serializer):
+    """
+    Create many Goods for one Necessary
+    Catalog resolved and duplicate validated with single query each
+    """
+    customer = serializers.HiddenField(default=CurrentUserDefault())
+    necessary_uuid = serializers.UUIDField(required=True, write_only=True)
+    goods = serializers.ListField(child=GoodsBulkItemSerializer(), min_length=1,
+                                  max_length=BULK_GOODS_LIMIT)
+
+    def validate(self, attrs):
+        request = self.context.get('request', None)
+        if not request:
+            raise NotAcceptable()
+
+        necessary_uuid = attrs.pop('necessary_uuid')
+        try:
+            attrs['necessary'] = Necessary.objects.select_related('purchase') \
+                .get(uuid=necessary_uuid, customer_id=request.user.id)
+        except ObjectDoesNotExist:
+            raise serializers.ValidationError({
+                'necessary': _("Necessary param defined but invalid.")})
+
+        goods = attrs['goods']
+        catalog_uuids = [item['catalog_uuid'] for item in goods if item.get('catalog_uuid', None)]
+        if not catalog_uuids:
+            return attrs
+
+        # Each Goods can't have multiple Catalog
+        if len(set(catalog_uuids)) != len(catalog_uuids):
+            raise serializers.ValidationError({'goods_catalogs': _("Duplicate catalog.")})
+
+        catalogs = Catalog.objects.in_bulk(catalog_uuids, field_name='uuid')
+        if len(catalogs) != len(catalog_uuids):
+            raise serializers.ValidationError({
+                'catalog': _("Catalog param defined but invalid.")})
+
+        if GoodsCatalog.objects.filter(catalog__uuid__in=catalog_uuids,
+                                       goods__necessary=attrs['necessary']).exists():
+            raise serializers.ValidationError({'goods_catalogs': _("Already exist.")})
+
+        for item in goods:
+            catalog_uuid = item.pop('catalog_uuid', None)
+            if catalog_uuid:
+                item['catalog'] = catalogs[catalog_uuid]
+                item['label'] = item['catalog'].label
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        customer = validated_data['customer']
+        necessary = validated_data['necessary']
+
+        goods_list = list()
+        catalog_by_uuid = dict()
+        for item in validated_data['goods']:
+            catalog = item.pop('catalog', None)
+            obj = Goods(customer=customer, necessary=necessary,
+                        purchase=necessary.purchase, uuid=uuid4(), **item)
+
+            goods_list.append(obj)
+            if catalog:
+                catalog_by_uuid[obj.uuid] = catalog
+
+        Goods.objects.bulk_create(goods_list)
+
+        # bulk_create not return id in all database
+        ids = dict(Goods.objects.filter(uuid__in=[obj.uuid for obj in goods_list])
+                   .values_list('uuid', 'id'))
+        for obj in goods_list:
+            obj.id = ids[obj.uuid]
+
+        GoodsCatalog.objects.bulk_create([
+            GoodsCatalog(goods=obj, catalog=catalog_by_uuid[obj.uuid])
+            for obj in goods_list if obj.uuid in catalog_by_uuid
+        ])
+
+        # bulk_create not fired signals
+        total = len(goods_list)
+        update_progress(necessary.id, necessary.purchase_id,
+                        delta={'total_count': total, 'left_count': total})
+        invalidate_counts(user_scope(customer.id))
+        return goods_list
+
+
 class GoodsAssignedFactorySerializer(serializers.ModelSerializer):
     """
     :is_accept only customer can update
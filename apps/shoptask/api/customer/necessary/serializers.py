@@ -11,12 +11,39 @@ from apps.person.utils.auth import CurrentUserDefault
 from apps.shoptask.utils.constant import DRAFT, SUBMITTED
 
 from apps.person.api.user.serializers import SingleUserSerializer
+from apps.shoptask.api.customer.goods.serializers import GoodsSerializer
 
 Necessary = get_model('shoptask', 'Necessary')
 Purchase = get_model('shoptask', 'Purchase')
 
+# Values accepted by `?include=`
+INCLUDE_GOODS = 'goods'
+INCLUDE_GOODS_PICTURE = 'goods.picture'
+INCLUDE_CHOICES = (INCLUDE_GOODS, INCLUDE_GOODS_PICTURE,)
 
-class NecessarySerializer(serializers.ModelSerializer):
+
+class NecessaryGoodsSerializer(GoodsSerializer):
+    """Goods embedded to Necessary, `picture` only if requested"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if INCLUDE_GOODS_PICTURE not in self.context.get('include', ()):
+            fields.pop('picture', None)
+        return fields
+
+
+class IncludeGoodsMixin:
+    """Add `goods` field if `include` in context ask for it"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        include = self.context.get('include', ())
+        if INCLUDE_GOODS in include or INCLUDE_GOODS_PICTURE in include:
+            fields['goods'] = NecessaryGoodsSerializer(many=True, read_only=True)
+        return fields
+
+
+class NecessarySerializer(IncludeGoodsMixin, serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(
         view_name='customer:necessary-detail', lookup_field='uuid',
         read_only=True)
@@ -32,7 +59,7 @@ class NecessarySerializer(serializers.ModelSerializer):
                   'skip_count', 'accept_count', 'left_count',)
 
 
-class NecessarySingleSerializer(serializers.ModelSerializer):
+class NecessarySingleSerializer(IncludeGoodsMixin, serializers.ModelSerializer):
     total_count = serializers.IntegerField(read_only=True)
     done_count = serializers.IntegerField(read_only=True)
     skip_count = serializers.IntegerField(read_only=True)
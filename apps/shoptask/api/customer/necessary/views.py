@@ -1,7 +1,6 @@
 from django.conf import settings
 from django.db import transaction
-from django.db.models import (
-    Q, F, Prefetch, Case, When, Value, Count, Sum, BooleanField, IntegerField)
+from django.db.models import Q, F, Prefetch
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils.decorators import method_decorator
@@ -11,35 +10,44 @@ from rest_framework import status as response_status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from utils.validators import check_uuid
 from apps.shoptask.utils.permissions import IsCustomerOrReadOnly
 from apps.shoptask.utils.constant import ALLOWED_DELETE_STATUS
+from apps.shoptask.utils.cache import CountCache, user_scope
+from apps.shoptask.utils.prefetch import necessary_goods_prefetch
+from apps.shoptask.utils.tombstone import DeltaSyncMixin
 
 from .serializers import (
     NecessarySerializer,
     NecessaryFactorySerializer,
-    NecessarySingleSerializer)
+    NecessarySingleSerializer,
+    INCLUDE_GOODS_PICTURE,
+    INCLUDE_CHOICES)
 
 Necessary = get_model('shoptask', 'Necessary')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset for list, paginator created each request
+_ORDERING = ('-date_created', '-id',)
 
 
-class NecessaryApiView(viewsets.ViewSet):
+class NecessaryApiView(DeltaSyncMixin, viewsets.ViewSet):
     """
     GET
     ------
     
     1. `purchase_uuid` ***[required]***
+    2. `include` ***[optional]*** `goods` or `goods.picture`
+    3. `since` ***[optional]*** `sync_token` of previous response, only changed
+       Necessary returned and `deleted` uuid
 
     Params:
 
         {
-            "purchase_uuid": "5039d278-503b-421e-baa1-b70629153e6d"
+            "purchase_uuid": "5039d278-503b-421e-baa1-b70629153e6d",
+            "include": "goods.picture"
         }
 
     POST
@@ -58,6 +66,7 @@ class NecessaryApiView(viewsets.ViewSet):
         }
     """
     lookup_field = 'uuid'
+    sync_model = Necessary
     permission_classes = (IsAuthenticated,)
     permission_action = {
         'list': [IsAuthenticated],
@@ -79,40 +88,28 @@ class NecessaryApiView(viewsets.ViewSet):
             # action is not set return default permission_classes
             return [permission() for permission in self.permission_classes]
 
+    def get_include(self):
+        include = self.request.query_params.get('include', None)
+        if not include:
+            return set()
+
+        include = set(item.strip() for item in include.split(',') if item.strip())
+        unknown = include - set(INCLUDE_CHOICES)
+        if unknown:
+            raise NotAcceptable(detail=_("Include %s not supported.") % ', '.join(sorted(unknown)))
+        return include
+
+    def get_goods_prefetch(self, include):
+        """All goods of the necessaries with one query, pictures joined if included"""
+        return necessary_goods_prefetch(picture=INCLUDE_GOODS_PICTURE in include)
+
+    def get_context(self):
+        return {'request': self.request, 'include': self.get_include()}
+
     # Get a objects
     def get_object(self, uuid=None, is_update=False):
         purchase_uuid = self.request.query_params.get('purchase_uuid', None)
-        annotate = {
-            'total_count': Count('goods', distinct=False),
-            'done_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_done=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-            'skip_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_skip=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-            'accept_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_accept=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-           'left_count': Sum(
-                Case(
-                    When(goods__goods_assigned__isnull=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            )
-        }
+        include = self.get_include()
 
         # Single object
         if uuid:
@@ -123,8 +120,9 @@ class NecessaryApiView(viewsets.ViewSet):
 
             try:
                 queryset = Necessary.objects \
-                    .filter(uuid=uuid, customer_id=self.request.user.id) \
-                    .annotate(**annotate)
+                    .filter(uuid=uuid, customer_id=self.request.user.id)
+                if include and not is_update:
+                    queryset = queryset.prefetch_related(self.get_goods_prefetch(include))
                 if is_update:
                     return queryset.select_for_update().get()
                 return queryset.get()
@@ -140,31 +138,37 @@ class NecessaryApiView(viewsets.ViewSet):
             raise NotAcceptable(detail=_(' '.join(err.messages)))
 
         # All objects
-        return Necessary.objects.prefetch_related(Prefetch('customer'), Prefetch('purchase')) \
+        queryset = Necessary.objects.prefetch_related(Prefetch('customer'), Prefetch('purchase')) \
             .select_related('customer', 'purchase') \
             .filter(customer_id=self.request.user.id, purchase__uuid=purchase_uuid) \
-            .annotate(**annotate) \
             .order_by('-date_created')
 
+        if include:
+            queryset = queryset.prefetch_related(self.get_goods_prefetch(include))
+        return self.filter_since(queryset)
+
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
+        response.update(self.get_sync())
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
 
     # Alls
     def list(self, request, format=None):
-        context = {'request': self.request}
+        context = self.get_context()
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        self.paginator = KeysetPagination(ordering=_ORDERING, counter=counter)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = NecessarySerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
@@ -172,7 +176,7 @@ class NecessaryApiView(viewsets.ViewSet):
     @method_decorator(never_cache)
     @transaction.atomic
     def retrieve(self, request, uuid=None, format=None):
-        context = {'request': self.request}
+        context = self.get_context()
         queryset = self.get_object(uuid=uuid)
         serializer = NecessarySingleSerializer(queryset, many=False, context=context)
         return Response(serializer.data, status=response_status.HTTP_200_OK)
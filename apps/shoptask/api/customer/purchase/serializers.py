@@ -1,7 +1,7 @@
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Prefetch
+from django.db.models import Prefetch, prefetch_related_objects
 
 from rest_framework import serializers
 from rest_framework.exceptions import NotAcceptable
@@ -9,7 +9,9 @@ from rest_framework.exceptions import NotAcceptable
 from utils.generals import get_model
 from utils.validators import check_uuid
 from apps.person.utils.auth import CurrentUserDefault
-from apps.shoptask.utils.constant import DRAFT, SUBMITTED, ACCEPT, DONE
+from apps.shoptask.utils.constant import DRAFT, SUBMITTED, ACCEPT, DONE, STATUS_CHOICES
+from apps.shoptask.utils.transition import transition_purchase
+from apps.shoptask.utils.prefetch import purchase_detail_prefetch
 
 from ..base.serializers import DynamicFieldsModelSerializer
 from apps.shoptask.api.customer.shipping.serializers import ShippingAddressSingleSerializer
@@ -53,7 +55,9 @@ class PurchaseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Purchase
-        fields = ('id', 'uuid', 'label', 'status', 'status_display', 'url',)
+        fields = ('id', 'uuid', 'label', 'status', 'status_display', 'url',
+                  'total_count', 'done_count', 'skip_count', 'accept_count',
+                  'left_count',)
 
 
 class PurchaseSingleSerializer(DynamicFieldsModelSerializer):
@@ -70,19 +74,28 @@ class PurchaseSingleSerializer(DynamicFieldsModelSerializer):
         model = Purchase
         fields = '__all__'
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
 
-        if not getattr(data, 'has_delivery', None):
-            data['has_delivery'] = instance.purchase_deliveries.exists()
+class PurchaseStatusSummarySerializer(serializers.Serializer):
+    status = serializers.CharField(read_only=True)
+    status_display = serializers.SerializerMethodField(read_only=True)
+    count = serializers.IntegerField(read_only=True)
 
-        if not getattr(data, 'has_schedule', None):
-            data['has_schedule'] = instance.purchase_deliveries \
-                .filter(schedule_date__isnull=False,
-                        schedule_time_start__isnull=False,
-                        schedule_time_end__isnull=False) \
-                .exists()
-        return data
+    def get_status_display(self, obj):
+        return dict(STATUS_CHOICES).get(obj['status'], None)
+
+    @classmethod
+    def from_summary(cls, summary, **kwargs):
+        """Each status in `STATUS_CHOICES` order, missing one counted 0"""
+        items = [{'status': status, 'count': summary.get(status, 0)}
+                 for status, label in STATUS_CHOICES]
+        return cls(items, many=True, **kwargs)
+
+
+class PurchaseTimelineSerializer(serializers.Serializer):
+    event = serializers.CharField(read_only=True)
+    date = serializers.DateTimeField(read_only=True)
+    old_value = serializers.CharField(read_only=True)
+    new_value = serializers.CharField(read_only=True)
 
 
 class PurchaseFactorySerializer(serializers.ModelSerializer):
@@ -148,21 +161,12 @@ class PurchaseFactorySerializer(serializers.ModelSerializer):
         and note instances using a note serializer.
         """
         if isinstance(instance, Purchase):
+            # delivery may just changed, loaded after save
+            prefetch_related_objects([instance], *purchase_detail_prefetch())
             serializer = PurchaseSingleSerializer(instance, many=False, context=self.context)
         else:
             raise Exception(_("Unexpected type of object."))
-
-        data = serializer.data
-        if not getattr(data, 'has_delivery', None):
-            data['has_delivery'] = instance.purchase_deliveries.exists()
-
-        if not getattr(data, 'has_schedule', None):
-            data['has_schedule'] = instance.purchase_deliveries \
-                .filter(schedule_date__isnull=False,
-                        schedule_time_start__isnull=False,
-                        schedule_time_end__isnull=False) \
-                .exists()
-        return data
+        return serializer.data
 
     @transaction.atomic
     def create(self, validated_data):
@@ -185,6 +189,9 @@ class PurchaseFactorySerializer(serializers.ModelSerializer):
         delivery_data = validated_data.pop('delivery_data', None)
         shipping_address = delivery_data.get('shipping_address', None)
 
+        # status moved by compare-and-swap, never saved with other fields
+        status = validated_data.pop('status', None)
+
         # update the instance
         for item in validated_data:
             value = validated_data[item]
@@ -202,5 +209,7 @@ class PurchaseFactorySerializer(serializers.ModelSerializer):
             else:
                 PurchaseDelivery.objects.create(purchase=instance, **delivery_data)
 
-        instance.save()
+        instance.save(update_fields=list(validated_data) + ['date_updated'])
+        if status:
+            transition_purchase(instance, status)
         return instance
@@ -1,49 +1,50 @@
-from uuid import uuid4
-from collections import defaultdict
-
 from django.conf import settings
 from django.db import transaction
-from django.db.models import (
-    Q, Prefetch, Case, When, Value, Sum, BooleanField, IntegerField)
+from django.db.models import Prefetch
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
-from django.utils.timezone import localtime, now
 
 from rest_framework import status as response_status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from utils.validators import check_uuid
 from apps.shoptask.utils.permissions import IsCustomerOrReadOnly
-from apps.shoptask.utils.constant import ALLOWED_DELETE_STATUS, DRAFT, ACCEPT
+from apps.shoptask.utils.constant import ALLOWED_DELETE_STATUS, ACCEPT
+from apps.shoptask.utils.progress import recount_progress
+from apps.shoptask.utils.clone import clone_purchase
+from apps.shoptask.utils.prefetch import purchase_detail_prefetch
+from apps.shoptask.utils.tombstone import DeltaSyncMixin
+from apps.shoptask.utils.timeline import purchase_timeline, TIMELINE_LIMIT
+from apps.shoptask.utils.cache import CountCache, invalidate_counts, user_scope
 
 from .serializers import (
     PurchaseSerializer,
     PurchaseFactorySerializer,
-    PurchaseSingleSerializer)
+    PurchaseSingleSerializer,
+    PurchaseStatusSummarySerializer,
+    PurchaseTimelineSerializer)
 
 Purchase = get_model('shoptask', 'Purchase')
-PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
-Necessary = get_model('shoptask', 'Necessary')
-Goods = get_model('shoptask', 'Goods')
-GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset for list, paginator created each request
+_ORDERING = ('-date_created', '-id',)
 
 
-class PurchaseApiView(viewsets.ViewSet):
+class PurchaseApiView(DeltaSyncMixin, viewsets.ViewSet):
     """
     GET
     ------
 
     1. `status` ***[required]*** string with comma separate
+    2. `since` ***[optional]*** `sync_token` of previous response, only changed
+       Purchase returned (status ignored) and `deleted` uuid
 
     Params:
 
@@ -94,12 +95,15 @@ class PurchaseApiView(viewsets.ViewSet):
         }
     """
     lookup_field = 'uuid'
+    sync_model = Purchase
     permission_classes = (IsAuthenticated,)
     permission_action = {
         'list': [IsAuthenticated],
         'retrieve': [IsAuthenticated],
         'partial_update': [IsAuthenticated, IsCustomerOrReadOnly],
         'destroy': [IsAuthenticated, IsCustomerOrReadOnly],
+        'summary': [IsAuthenticated],
+        'timeline': [IsAuthenticated],
     }
 
     def get_permissions(self):
@@ -128,61 +132,44 @@ class PurchaseApiView(viewsets.ViewSet):
 
             try:
                 queryset = Purchase.objects \
-                    .filter(uuid=uuid, customer_id=self.request.user.id) \
-                    .annotate(
-                        bill_summary=Sum(
-                            'goods__bill', distinct=True,
-                            output_field=IntegerField()
-                        ),
-                        has_operator=Case(
-                            When(purchase_assigned__isnull=False, then=Value(True)),
-                            default=Value(False),
-                            output_field=BooleanField()
-                        ),
-                        has_delivery=Case(
-                            When(purchase_delivery__isnull=False, then=Value(True)),
-                            default=Value(False),
-                            output_field=BooleanField()
-                        ),
-                        has_schedule=Case(
-                            When(
-                                Q(purchase_delivery__isnull=False)
-                                & Q(purchase_delivery__schedule_date__isnull=False)
-                                & Q(purchase_delivery__schedule_time_start__isnull=False)
-                                & Q(purchase_delivery__schedule_time_end__isnull=False), 
-                                then=Value(True)
-                            ),
-                            default=Value(False),
-                            output_field=BooleanField()
-                        )
-                    ) \
+                    .filter(uuid=uuid, customer_id=self.request.user.id)
 
+                # status moved by compare-and-swap, no row lock needed
                 if is_update:
-                    return queryset.select_for_update().get()
+                    return queryset.get()
+
+                # shipping and assigned loaded once, flags read from them
+                queryset = queryset.prefetch_related(*purchase_detail_prefetch())
                 return queryset.get()
             except ObjectDoesNotExist:
                 raise NotFound()
 
-        if not status:
+        since = self.get_since()
+        if not status and not since:
             raise NotFound()
 
         # All objects
-        return Purchase.objects.prefetch_related(Prefetch('customer')) \
+        queryset = Purchase.objects.prefetch_related(Prefetch('customer')) \
             .select_related('customer') \
-            .filter(customer_id=self.request.user.id, status__in=status.split(',')) \
-            .order_by('-date_created')
+            .filter(customer_id=self.request.user.id)
+
+        # on sync changed one returned whatever the status, so client can move it
+        if not since:
+            queryset = queryset.filter(status__in=status.split(','))
+        return self.filter_since(queryset).order_by('-date_created')
 
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
+        response.update(self.get_sync())
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
 
@@ -190,29 +177,52 @@ class PurchaseApiView(viewsets.ViewSet):
     def list(self, request, format=None):
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        self.paginator = KeysetPagination(ordering=_ORDERING, counter=counter)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = PurchaseSerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
+    # Count each status for tabs
+    @method_decorator(never_cache)
+    @action(methods=['get'], detail=False, url_path='summary', url_name='summary')
+    def summary(self, request, format=None):
+        context = {'request': self.request}
+        queryset = Purchase.objects.filter(customer_id=request.user.id)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        summary = counter.get_summary(queryset)
+
+        serializer = PurchaseStatusSummarySerializer.from_summary(summary, context=context)
+        response = dict()
+        response['total'] = sum(summary.values())
+        response['results'] = serializer.data
+        return Response(response, status=response_status.HTTP_200_OK)
+
+    # History of status, assignment and delivery
+    @method_decorator(never_cache)
+    @action(methods=['get'], detail=True, url_path='timeline', url_name='timeline')
+    def timeline(self, request, uuid=None):
+        try:
+            uuid = check_uuid(uid=uuid)
+        except ValidationError as err:
+            raise NotAcceptable(detail=_(' '.join(err.messages)))
+
+        try:
+            purchase = Purchase.objects.get(uuid=uuid, customer_id=request.user.id)
+        except ObjectDoesNotExist:
+            raise NotFound()
+
+        context = {'request': self.request}
+        events = purchase_timeline(purchase, limit=TIMELINE_LIMIT)
+        serializer = PurchaseTimelineSerializer(events, many=True, context=context)
+        return Response(serializer.data, status=response_status.HTTP_200_OK)
+
     # Single
+    # past schedule of DRAFT cleared by `clear_expired_schedules` command
     @method_decorator(never_cache)
-    @transaction.atomic
     def retrieve(self, request, uuid=None, format=None):
         context = {'request': self.request}
         queryset = self.get_object(uuid=uuid)
-
-        # if 'status' is DRAFT and 'schedule_date' smaller than current date
-        # set all 'schedule_*' to null
-        if queryset.status == DRAFT:
-            delivery = queryset.purchase_deliveries.first()
-            datenow = localtime(now()).date()
-            if delivery and delivery.schedule_date and (delivery.schedule_date < datenow):
-                delivery.schedule_date = None
-                delivery.schedule_time_start = None
-                delivery.schedule_time_end = None
-                delivery.save()
-                queryset.refresh_from_db()
-
         serializer = PurchaseSingleSerializer(queryset, many=False, context=context)
         return Response(serializer.data, status=response_status.HTTP_200_OK)
 
@@ -285,94 +295,12 @@ class PurchaseApiView(viewsets.ViewSet):
 
         context = {'request': self.request}
         user = request.user
+        purchase = clone_purchase(purchase, user)
 
-        purchase.pk = None
-        purchase.uuid = uuid4()
-        purchase.customer = user
-        purchase.status = DRAFT
-        purchase.save()
-
-        # copy Necessary
-        necessaries = Necessary.objects.filter(purchase__uuid=uuid)
-        if necessaries.exists():
-            necessaries_list_new = list()
-            for item in necessaries:
-                item.pk = None
-                item.uuid = uuid4()
-                item.customer = user
-                item.purchase = purchase
-                necessaries_list_new.append(item)
-
-            if necessaries_list_new:
-                Necessary.objects.bulk_create(necessaries_list_new)
-
-        # get new Necessaries
-        new_necessaries = Necessary.objects.filter(purchase__uuid=purchase.uuid)
-
-        # copy Goods
-        goods_by_necessary = defaultdict(list)
-        goods = Goods.objects.filter(purchase__uuid=uuid)
-        if goods.exists():
-            for item in goods:
-                necessary = item.necessary
-                goods_by_necessary[necessary].append(item)
-
-            goods_list_new = list()
-            for index, item in enumerate(goods_by_necessary):
-                new_necessary = new_necessaries[index]
-                goods = goods_by_necessary[item]
-                for g in goods:
-                    g.pk = None
-                    g.uuid = uuid4()
-                    g.customer = user
-                    g.purchase = purchase
-                    g.necessary = new_necessary
-                    g.price = None
-                    g.bill = None
-                    goods_list_new.append(g)
-
-            if goods_list_new:
-                Goods.objects.bulk_create(goods_list_new)
-
-        # get new Goods
-        new_goods = Goods.objects.filter(purchase__uuid=purchase.uuid)
-
-        # copy GoodsCatalog
-        catalogs_by_goods = defaultdict(list)
-        goods_catalogs = GoodsCatalog.objects.filter(goods__purchase__uuid=uuid)
-        if goods_catalogs.exists():
-            for item in goods_catalogs:
-                goods = item.goods
-                catalogs_by_goods[goods].append(item)
-
-            goods_catalogs_list_new = list()
-            for item in catalogs_by_goods:
-                ng = new_goods.get(label=item.label)
-                catalogs = catalogs_by_goods[item]
-                for c in catalogs:
-                    c.pk = None
-                    c.uuid = uuid4()
-                    c.goods = ng
-                    goods_catalogs_list_new.append(c)
-
-            if goods_catalogs_list_new:
-                GoodsCatalog.objects.bulk_create(goods_catalogs_list_new)
-
-        # copy Delivery
-        deliveries = PurchaseDelivery.objects.filter(purchase__uuid=uuid)
-        if deliveries.exists():
-            deliveries_new_list = list()
-            for item in deliveries:
-                item.pk = None
-                item.uuid = uuid4()
-                item.purchase = purchase
-                item.schedule_date = None
-                item.schedule_time_start = None
-                item.schedule_time_end = None
-                deliveries_new_list.append(item)
- 
-            if deliveries_new_list:
-                PurchaseDelivery.objects.bulk_create(deliveries_new_list)
+        # bulk_create not fired signals
+        recount_progress(purchase_ids=[purchase.id])
+        invalidate_counts(user_scope(user.id))
+        purchase.refresh_from_db()
 
         # serializing
         serializer = PurchaseSingleSerializer(purchase, many=False, context=context)
@@ -10,9 +10,9 @@ from rest_framework import status as response_status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from utils.validators import check_uuid
 from apps.shoptask.utils.permissions import IsCustomerOrReadOnly
 
@@ -24,8 +24,8 @@ from .serializers import (
 
 ShippingAddress = get_model('shoptask', 'ShippingAddress')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset for list, paginator created each request
+_ORDERING = ('label', 'id',)
 
 
 class ShippingAddressApiView(viewsets.ViewSet):
@@ -78,13 +78,13 @@ class ShippingAddressApiView(viewsets.ViewSet):
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
@@ -93,7 +93,8 @@ class ShippingAddressApiView(viewsets.ViewSet):
     def list(self, request, format=None):
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        self.paginator = KeysetPagination(ordering=_ORDERING)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = ShippingAddressSerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
@@ -14,6 +14,7 @@ from apps.person.utils.auth import CurrentUserDefault
 from apps.shoptask.utils.constant import DRAFT, SUBMITTED, DONE
 
 from apps.person.api.user.serializers import SingleUserSerializer
+from apps.shoptask.api.customer.base.serializers import PictureListSerializer, PictureMixin
 
 Goods = get_model('shoptask', 'Goods')
 GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
@@ -32,7 +33,7 @@ class GoodsCatalogSerializer(serializers.ModelSerializer):
         extra_kwargs = {'goods': {'read_only': True}}
 
 
-class GoodsSerializer(serializers.ModelSerializer):
+class GoodsSerializer(PictureMixin, serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(
         view_name='customer:goods-detail', lookup_field='uuid',
         read_only=True)
@@ -44,29 +45,18 @@ class GoodsSerializer(serializers.ModelSerializer):
     picture = serializers.SerializerMethodField(read_only=True)
     goods_catalogs = GoodsCatalogSerializer()
     necessary_uuid = serializers.UUIDField(source='necessary.uuid', read_only=True)
-    goods_assigned_uuid = serializers.UUIDField(read_only=True)
+    goods_assigned_uuid = serializers.UUIDField(source='assigned.uuid', read_only=True)
 
     class Meta:
         model = Goods
         fields = ('id', 'uuid', 'label', 'url', 'is_done', 'is_skip', 'is_accept',
                   'is_from_catalog', 'quantity', 'metric', 'metric_display', 'price',
                   'description', 'necessary', 'necessary_uuid', 'goods_assigned_uuid',
-                  'picture', 'goods_catalogs',)
-
-    def get_picture(self, obj):
-        request = self.context.get('request', None)
-        if not request:
-            raise NotAcceptable()
-
-        # Get image from Catalog if image from Goods not defined
-        if not obj.pictures.exists():
-            catalog_picture_path = obj.catalog_picture
-            if catalog_picture_path:
-                return request.build_absolute_uri(settings.MEDIA_URL + catalog_picture_path)
-        return None
+                  'status', 'picture', 'goods_catalogs',)
+        list_serializer_class = PictureListSerializer
 
 
-class GoodsSingleSerializer(serializers.ModelSerializer):
+class GoodsSingleSerializer(PictureMixin, serializers.ModelSerializer):
     is_done = serializers.BooleanField(read_only=True)
     is_skip = serializers.BooleanField(read_only=True)
     is_accept = serializers.BooleanField(read_only=True)
@@ -80,22 +70,6 @@ class GoodsSingleSerializer(serializers.ModelSerializer):
         model = Goods
         fields = '__all__'
 
-    def get_picture(self, obj):
-        request = self.context.get('request', None)
-        if not request:
-            raise NotAcceptable()
-
-        # Get image from Catalog if image from Goods not defined
-        if not obj.pictures.exists():
-            goods_catalogs = getattr(obj, 'goods_catalogs', None)
-            if goods_catalogs:
-                catalog = getattr(goods_catalogs, 'catalog', None)
-                catalog_picture_path = catalog.pictures.first()
-                value_image = getattr(catalog_picture_path, 'value_image', None)
-                if value_image:
-                    return request.build_absolute_uri(value_image.url)
-        return None
-
 
 class GoodsFactorySerializer(serializers.ModelSerializer):
     """
@@ -12,13 +12,16 @@ from rest_framework import status as response_status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
+from utils.etag import make_etag, etag_matches, set_etag, not_modified
 from utils.validators import check_uuid
 from apps.shoptask.utils.permissions import (
     IsCustomerOrReadOnly, IsGoodsCustomerOrReject)
 from apps.shoptask.utils.constant import ALLOWED_DELETE_STATUS, DONE, ACCEPT
+from apps.shoptask.utils.cache import CountCache, user_scope
+from apps.shoptask.utils.tombstone import DeltaSyncMixin
 
 from .serializers import (
     GoodsSerializer,
@@ -35,12 +38,12 @@ GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
 Purchase = get_model('shoptask', 'Purchase')
 Necessary = get_model('shoptask', 'Necessary')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset for list, paginator created each request
+_ORDERING = ('-date_created', '-id',)
 _FINAL_STATUS = (DONE, ACCEPT,)
 
 
-class GoodsApiView(viewsets.ViewSet):
+class GoodsApiView(DeltaSyncMixin, viewsets.ViewSet):
     """
     GET
     ---------------------
@@ -49,12 +52,15 @@ class GoodsApiView(viewsets.ViewSet):
     Params:
 
         {
-            "necessary_uuid": "valid UUID format uuid.uuid4"
+            "necessary_uuid": "valid UUID format uuid.uuid4",
+            "status": "left,done,skip,accept" [optional] string with comma separate
+            "since": "sync_token of previous response" [optional] only changed Goods
+                     returned (status ignored) and `deleted` uuid
         }
     
     Example:
 
-    http://endpoint/?necessary_uuid=abfc-2252-ect
+    http://endpoint/?necessary_uuid=abfc-2252-ect&status=left
 
     Return list Goods:
 
@@ -75,6 +81,7 @@ class GoodsApiView(viewsets.ViewSet):
                 "description": "",
                 "necessary": 89,
                 "necessary_uuid": "926f50ce-ec3d-44e5-b85b-c926b0ae9568",
+                "status": "left",
                 "picture": null,
                 "goods_catalogs": null
             },
@@ -128,6 +135,7 @@ class GoodsApiView(viewsets.ViewSet):
         }
     """
     lookup_field = 'uuid'
+    sync_model = Goods
     permission_classes = (IsAuthenticated,)
     permission_action = {
         'list': [IsAuthenticated],
@@ -149,47 +157,30 @@ class GoodsApiView(viewsets.ViewSet):
             # action is not set return default permission_classes
             return [permission() for permission in self.permission_classes]
 
-    # Get a objects
-    def get_object(self, uuid=None, is_update=False):
-        necessary_uuid = self.request.query_params.get('necessary_uuid', None)
-        goods_catalog = GoodsCatalog.objects.filter(id=OuterRef('goods_catalog__id'))
+    # Base queryset, annotated for serializer
+    def get_queryset(self):
         annotate_param = {
-            'is_skip': Case(
-                When(goods_assigned__is_skip=True, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            ),
-            'is_done': Case(
-                When(goods_assigned__is_done=True, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            ),
-            'is_accept': Case(
-                When(goods_assigned__is_accept=True, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            ),
             'is_from_catalog': Case(
                 When(goods_catalog__isnull=False, then=Value(True)),
                 default=Value(False),
                 output_field=BooleanField()
-            ),
-            'catalog_picture': Subquery(goods_catalog.values('catalog__pictures__value_image')[:1]),
-            'goods_assigned_uuid': Case(
-                When(goods_assigned__isnull=False, then=F('goods_assigned__uuid')),
-                default=Value(None),
-                output_field=CharField()
             )
         }
 
-        queryset = Goods.objects \
+        return Goods.objects \
             .prefetch_related(Prefetch('customer'), Prefetch('purchase'),
                               Prefetch('necessary'), Prefetch('goods_catalogs'),
                               Prefetch('goods_catalogs__catalog')) \
             .select_related('customer', 'purchase', 'necessary', 'goods_catalog',
-                            'goods_catalog__catalog') \
+                            'goods_catalog__catalog', 'assigned', 'primary_picture',
+                            'goods_catalog__catalog__primary_picture') \
             .annotate(**annotate_param)
 
+    # Get a objects
+    def get_object(self, uuid=None, is_update=False):
+        necessary_uuid = self.request.query_params.get('necessary_uuid', None)
+        queryset = self.get_queryset()
+
         # Single object
         if uuid:
             try:
@@ -213,8 +204,13 @@ class GoodsApiView(viewsets.ViewSet):
             raise NotAcceptable(detail=_(' '.join(err.messages)))
 
         # All objects
-        return queryset.filter(Q(customer_id=self.request.user.id), Q(necessary__uuid=necessary_uuid)) \
-            .order_by('-date_created')
+        queryset = queryset.filter(Q(customer_id=self.request.user.id), Q(necessary__uuid=necessary_uuid))
+
+        # on sync changed one returned whatever the status, so client can move it
+        status = self.request.query_params.get('status', None)
+        if status and not self.get_since():
+            queryset = queryset.filter(status__in=status.split(','))
+        return self.filter_since(queryset).order_by('-date_created')
 
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
@@ -231,68 +227,61 @@ class GoodsApiView(viewsets.ViewSet):
                                                            fields=('id', 'uuid', 'status_display', 'label',
                                                            'description', 'merchant', 'status'))
 
-        necessary_annotate = {
-            'bill_summary': Sum('goods__bill', output_field=IntegerField()),
-            'total_count': Count('goods', distinct=False),
-            'done_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_done=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-            'skip_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_skip=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-            'accept_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_accept=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-           'left_count': Sum(
-                Case(
-                    When(goods__goods_assigned__isnull=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            )
-        }
-
         necessary_obj = Necessary.objects \
-            .prefetch_related(Prefetch('goods'), Prefetch('purchase')) \
             .select_related('purchase') \
             .filter(uuid=necessary_uuid) \
-            .annotate(**necessary_annotate) \
             .first()
         necessary_obj_serializer = NecessarySingleSerializer(necessary_obj, many=False, context=context)
 
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
         response['purchase'] = purchase_obj_serializer.data
         response['necessary'] = necessary_obj_serializer.data
+        response.update(self.get_sync())
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
 
+    def get_etag(self):
+        """
+        Necessary version and both `date_updated` with one lookup by uuid,
+        None if Necessary not found so the list raise as usual
+        """
+        necessary_uuid = self.request.query_params.get('necessary_uuid', None)
+        try:
+            necessary_uuid = check_uuid(uid=necessary_uuid)
+        except ValidationError:
+            return None
+
+        version = Necessary.objects \
+            .filter(uuid=necessary_uuid, customer_id=self.request.user.id) \
+            .values_list('version', 'date_updated', 'purchase__date_updated') \
+            .first()
+
+        if version is None:
+            return None
+        return make_etag(self.request, *version)
+
     # Alls
     def list(self, request, format=None):
+        # unchanged since last poll
+        etag = self.get_etag()
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        self.paginator = KeysetPagination(ordering=_ORDERING, counter=counter)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = GoodsSerializer(queryset_paginator, many=True, context=context)
-        return self.get_response(serializer)
+        return set_etag(self.get_response(serializer), etag)
 
     # Single
     @method_decorator(never_cache)
@@ -1,7 +1,6 @@
 from django.conf import settings
 from django.db import transaction
-from django.db.models import (
-    Q, F, Prefetch, Case, When, Value, Count, Sum, BooleanField, IntegerField)
+from django.db.models import Q, F, Prefetch
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils.decorators import method_decorator
@@ -11,12 +10,14 @@ from rest_framework import status as response_status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from utils.validators import check_uuid
 from apps.shoptask.utils.permissions import IsOperatorOrReject
 from apps.shoptask.utils.constant import ALLOWED_DELETE_STATUS
+from apps.shoptask.utils.cache import CountCache, user_scope
+from apps.shoptask.utils.tombstone import DeltaSyncMixin
 
 from .serializers import (
     OperatorNecessarySerializer,
@@ -25,16 +26,18 @@ from .serializers import (
 
 Necessary = get_model('shoptask', 'Necessary')
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Keyset for list, paginator created each request
+_ORDERING = ('-date_created', '-id',)
 
 
-class OperatorNecessaryApiView(viewsets.ViewSet):
+class OperatorNecessaryApiView(DeltaSyncMixin, viewsets.ViewSet):
     """
     GET
     ------
     
     1. `purchase_uuid` ***[required]***
+    2. `since` ***[optional]*** `sync_token` of previous response, only changed
+       Necessary returned and `deleted` uuid
 
     Params:
 
@@ -43,6 +46,7 @@ class OperatorNecessaryApiView(viewsets.ViewSet):
         }
     """
     lookup_field = 'uuid'
+    sync_model = Necessary
     permission_classes = (IsAuthenticated,)
     permission_action = {
         'list': [IsAuthenticated],
@@ -66,37 +70,6 @@ class OperatorNecessaryApiView(viewsets.ViewSet):
     # Get a objects
     def get_object(self, uuid=None, is_update=False):
         purchase_uuid = self.request.query_params.get('purchase_uuid', None)
-        annotate = {
-            'total_count': Count('goods', distinct=False),
-            'done_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_done=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-            'skip_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_skip=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-            'accept_count': Sum(
-                Case(
-                    When(goods__goods_assigned__is_accept=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            ),
-           'left_count': Sum(
-                Case(
-                    When(goods__goods_assigned__isnull=True, then=Value(1)),
-                    default=Value(0),
-                    output_field=IntegerField()
-                )
-            )
-        }
 
         # Single object
         if uuid:
@@ -106,7 +79,7 @@ class OperatorNecessaryApiView(viewsets.ViewSet):
                 raise NotAcceptable(detail=_(' '.join(err.messages)))
 
             try:
-                queryset = Necessary.objects.annotate(**annotate)
+                queryset = Necessary.objects.all()
                 if is_update:
                     return queryset.select_for_update() \
                         .get(uuid=uuid, customer_id=self.request.user.id)
@@ -123,23 +96,24 @@ class OperatorNecessaryApiView(viewsets.ViewSet):
             raise NotAcceptable(detail=_(' '.join(err.messages)))
 
         # All objects
-        return Necessary.objects.prefetch_related(Prefetch('customer'), Prefetch('purchase')) \
+        queryset = Necessary.objects.prefetch_related(Prefetch('customer'), Prefetch('purchase')) \
             .select_related('customer', 'purchase') \
             .filter(purchase__purchase_assigned__operator_id=self.request.user.id, purchase__uuid=purchase_uuid) \
-            .annotate(**annotate) \
             .order_by('-date_created')
+        return self.filter_since(queryset)
 
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
+        response.update(self.get_sync())
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
 
@@ -147,7 +121,9 @@ class OperatorNecessaryApiView(viewsets.ViewSet):
     def list(self, request, format=None):
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        self.paginator = KeysetPagination(ordering=_ORDERING, counter=counter)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = OperatorNecessarySerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
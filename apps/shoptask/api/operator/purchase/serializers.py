@@ -1,6 +1,9 @@
+from uuid import uuid4
+
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
+from django.utils.timezone import now
 from django.db.models import Prefetch
 
 from rest_framework import serializers
@@ -9,15 +12,29 @@ from rest_framework.exceptions import NotAcceptable
 from utils.generals import get_model
 from utils.validators import check_uuid
 from apps.person.utils.auth import CurrentUserDefault
-from apps.shoptask.utils.constant import DRAFT, SUBMITTED, ACCEPT, DONE, PROCESSED
+from apps.shoptask.utils.constant import DRAFT, SUBMITTED, ACCEPT, DONE, PROCESSED, ASSIGNED
+from apps.shoptask.utils.progress import recount_progress, recount_goods_status
+from apps.shoptask.utils.cache import invalidate_counts, user_scope
+from apps.shoptask.utils.transition import transition_purchase
+from apps.shoptask.utils.log import CreateChangeLog, write_on_commit
 
 from apps.shoptask.api.customer.shipping.serializers import ShippingAddressSingleSerializer
+from apps.shoptask.api.customer.necessary.serializers import NecessaryGoodsSerializer
+from apps.shoptask.api.operator.necessary.serializers import OperatorNecessarySerializer
 from apps.person.api.user.serializers import SingleUserSerializer
 
 Purchase = get_model('shoptask', 'Purchase')
 PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
 PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
 ShippingAddress = get_model('shoptask', 'ShippingAddress')
+Goods = get_model('shoptask', 'Goods')
+GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+
+# Max Goods checked in one request
+CHECKLIST_LIMIT = 200
+
+# Goods only can checked at this Purchase status
+CHECKLIST_STATUS = (ASSIGNED, PROCESSED,)
 
 
 class OperatorPurchaseDeliverySerializer(serializers.ModelSerializer):
@@ -44,7 +61,16 @@ class OperatorPurchaseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Purchase
-        fields = ('id', 'uuid', 'label', 'status', 'status_display', 'url',)
+        fields = ('id', 'uuid', 'label', 'status', 'status_display', 'url',
+                  'total_count', 'done_count', 'skip_count', 'accept_count',
+                  'left_count',)
+
+
+class OperatorNearbyPurchaseSerializer(OperatorPurchaseSerializer):
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta(OperatorPurchaseSerializer.Meta):
+        fields = OperatorPurchaseSerializer.Meta.fields + ('distance',)
 
 
 class OperatorPurchaseSingleSerializer(serializers.ModelSerializer):
@@ -63,6 +89,15 @@ class OperatorPurchaseSingleSerializer(serializers.ModelSerializer):
         return data
 
 
+class OperatorSnapshotNecessarySerializer(OperatorNecessarySerializer):
+    """Necessary with whole goods, context `include` decide the picture"""
+    bill_summary = serializers.IntegerField(read_only=True)
+    goods = NecessaryGoodsSerializer(many=True, read_only=True)
+
+    class Meta(OperatorNecessarySerializer.Meta):
+        fields = OperatorNecessarySerializer.Meta.fields + ('bill_summary', 'goods',)
+
+
 class OperatorPurchaseFactorySerializer(serializers.ModelSerializer):
     # just a placeholder after object created
     status_display = serializers.CharField(source='get_status_display',
@@ -109,10 +144,117 @@ class OperatorPurchaseFactorySerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def update(self, instance, validated_data):
+        # status moved by compare-and-swap, never saved with other fields
+        status = validated_data.pop('status', None)
+
         # update the instance
         for item in validated_data:
             value = validated_data[item]
             setattr(instance, item, value)
 
-        instance.save()
+        instance.save(update_fields=list(validated_data) + ['date_updated'])
+        if status:
+            transition_purchase(instance, status)
         return instance
+
+
+class OperatorChecklistItemSerializer(serializers.Serializer):
+    goods_uuid = serializers.UUIDField(required=True)
+    is_done = serializers.BooleanField(required=False)
+    is_skip = serializers.BooleanField(required=False)
+    price = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+
+
+class OperatorChecklistGoodsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Goods
+        fields = ('id', 'uuid', 'label', 'quantity', 'metric', 'price', 'bill', 'status',)
+
+
+class OperatorChecklistSerializer(serializers.Serializer):
+    """
+    Check many Goods of one Purchase at once
+    -------------
+    Purchase must already verified belong to Operator,
+    each Goods get new GoodsAssigned or the current updated
+    """
+    operator = serializers.HiddenField(default=CurrentUserDefault())
+    goods = serializers.ListField(child=OperatorChecklistItemSerializer(), min_length=1,
+                                  max_length=CHECKLIST_LIMIT)
+
+    def validate(self, attrs):
+        purchase = self.context.get('purchase', None)
+        if not purchase:
+            raise NotAcceptable()
+
+        if purchase.status not in CHECKLIST_STATUS:
+            raise serializers.ValidationError({'status': _("You can't perform this action.")})
+
+        items = {item['goods_uuid']: item for item in attrs['goods']}
+        if len(items) != len(attrs['goods']):
+            raise serializers.ValidationError({'goods': _("Duplicate goods.")})
+
+        goods = Goods.objects.select_related('assigned') \
+            .filter(purchase_id=purchase.id, uuid__in=list(items))
+        goods = list(goods)
+        if len(goods) != len(items):
+            raise serializers.ValidationError({'goods': _("Goods param defined but invalid.")})
+
+        attrs['goods'] = [(obj, items[obj.uuid]) for obj in goods]
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        purchase = self.context['purchase']
+        operator = validated_data['operator']
+        timestamp = now()
+
+        goods_update = list()
+        assigned_create = list()
+        assigned_update = list()
+        changelogs = list()
+
+        for goods, item in validated_data['goods']:
+            if 'price' in item:
+                # logged same as Goods.save()
+                if item['price'] != goods.price:
+                    changelogs.append(CreateChangeLog(obj=Goods, obj_id=goods.id, column='price',
+                                                      old_value=goods.price,
+                                                      new_value=item['price']).build())
+
+                goods.price = item['price']
+                goods.bill = goods.price * goods.quantity if goods.price is not None else None
+                goods.date_updated = timestamp
+                goods_update.append(goods)
+
+            flags = {key: item[key] for key in ('is_done', 'is_skip') if key in item}
+            if not flags:
+                continue
+
+            # current assignment by this Operator updated, else create new one
+            assigned = goods.assigned
+            if assigned and assigned.operator_id == operator.id:
+                for key, value in flags.items():
+                    setattr(assigned, key, value)
+                assigned.date_updated = timestamp
+                assigned_update.append(assigned)
+            else:
+                assigned_create.append(GoodsAssigned(goods=goods, operator=operator,
+                                                     uuid=uuid4(), **flags))
+
+        if goods_update:
+            Goods.objects.bulk_update(goods_update, ['price', 'bill', 'date_updated'])
+            write_on_commit(changelogs)
+
+        if assigned_create:
+            GoodsAssigned.objects.bulk_create(assigned_create)
+
+        if assigned_update:
+            GoodsAssigned.objects.bulk_update(assigned_update, ['is_done', 'is_skip', 'date_updated'])
+
+        # bulk write not fired signals
+        goods_ids = [goods.id for goods, item in validated_data['goods']]
+        recount_goods_status(goods_ids=goods_ids)
+        recount_progress(purchase_ids=[purchase.id])
+        invalidate_counts(user_scope(purchase.customer_id))
+        return goods_ids
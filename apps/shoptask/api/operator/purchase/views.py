@@ -12,24 +12,47 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import NotFound, NotAcceptable
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
 
 from utils.generals import get_model
+from utils.pagination import KeysetPagination
 from utils.validators import check_uuid
-from apps.shoptask.utils.permissions import IsOperatorOrReject
+from utils.etag import make_etag, etag_matches, set_etag, not_modified
+from utils.compress import compressed_response
+from apps.shoptask.utils.permissions import IsOperatorOrReject, IsOperatorRole
+from apps.shoptask.utils.claim import claim_purchase, nearby_purchases
+from apps.shoptask.utils.prefetch import purchase_detail_prefetch, necessary_goods_prefetch
+from apps.shoptask.utils.snapshot import snapshot_version
+from apps.shoptask.utils.tombstone import DeltaSyncMixin
+from apps.shoptask.utils.timeline import purchase_timeline, TIMELINE_LIMIT
+from apps.shoptask.utils.cache import CountCache, user_scope
+
+from apps.shoptask.api.customer.purchase.serializers import (
+    PurchaseStatusSummarySerializer, PurchaseTimelineSerializer)
+from apps.shoptask.api.customer.necessary.serializers import INCLUDE_GOODS_PICTURE
 
 from .serializers import (
     OperatorPurchaseSerializer,
+    OperatorNearbyPurchaseSerializer,
     OperatorPurchaseFactorySerializer,
-    OperatorPurchaseSingleSerializer)
+    OperatorPurchaseSingleSerializer,
+    OperatorSnapshotNecessarySerializer,
+    OperatorChecklistSerializer,
+    OperatorChecklistGoodsSerializer)
 
 Purchase = get_model('shoptask', 'Purchase')
+Necessary = get_model('shoptask', 'Necessary')
+Goods = get_model('shoptask', 'Goods')
+
+# Keyset for list, paginator created each request
+_ORDERING = ('-date_created', '-id',)
 
-# Define to avoid used ...().paginate__
-_PAGINATOR = LimitOffsetPagination()
+# Nearby open Purchase, radius in kilometer
+NEARBY_RADIUS = 5
+NEARBY_MAX_RADIUS = 50
+NEARBY_LIMIT = 50
 
 
-class OperatorPurchaseApiView(viewsets.ViewSet):
+class OperatorPurchaseApiView(DeltaSyncMixin, viewsets.ViewSet):
     """ Get Purchase assigned to Operator
 
     GET
@@ -38,6 +61,8 @@ class OperatorPurchaseApiView(viewsets.ViewSet):
     Accept params;
 
     1. `status` ***[required]*** string with comma separate
+    2. `since` ***[optional]*** `sync_token` of previous response, only changed
+       Purchase returned (status ignored) and `deleted` uuid
 
     JSON;
 
@@ -46,12 +71,19 @@ class OperatorPurchaseApiView(viewsets.ViewSet):
         }
     """
     lookup_field = 'uuid'
+    sync_model = Purchase
     permission_classes = (IsAuthenticated,)
     permission_action = {
         'list': [IsAuthenticated],
         'retrieve': [IsAuthenticated],
         'partial_update': [IsAuthenticated, IsOperatorOrReject],
         'destroy': [IsAuthenticated, IsOperatorOrReject],
+        'checklist': [IsAuthenticated],
+        'summary': [IsAuthenticated],
+        'timeline': [IsAuthenticated],
+        'claim': [IsAuthenticated, IsOperatorRole],
+        'nearby': [IsAuthenticated, IsOperatorRole],
+        'snapshot': [IsAuthenticated],
     }
 
     def get_permissions(self):
@@ -79,41 +111,45 @@ class OperatorPurchaseApiView(viewsets.ViewSet):
 
             try:
                 queryset = Purchase.objects \
-                    .filter(uuid=uuid, purchase_assigned__operator_id=self.request.user.id) \
-                    .annotate(
-                        bill_summary=Sum(
-                            'goods__bill', distinct=True,
-                            output_field=IntegerField()
-                        )
-                    ) \
+                    .filter(uuid=uuid, purchase_assigned__operator_id=self.request.user.id)
 
+                # status moved by compare-and-swap, no row lock needed
                 if is_update:
-                    return queryset.select_for_update().get()
+                    return queryset.get()
+
+                queryset = queryset \
+                    .select_related('customer', 'customer__account', 'customer__profile') \
+                    .prefetch_related(*purchase_detail_prefetch())
                 return queryset.get()
             except ObjectDoesNotExist:
                 raise NotFound()
 
-        if not status:
+        since = self.get_since()
+        if not status and not since:
             raise NotFound()
 
         # All objects
-        return Purchase.objects.prefetch_related(Prefetch('customer')) \
+        queryset = Purchase.objects.prefetch_related(Prefetch('customer')) \
             .select_related('customer') \
-            .filter(purchase_assigned__operator_id=self.request.user.id,
-                    status__in=status.split(',')) \
-            .order_by('-date_created')
+            .filter(purchase_assigned__operator_id=self.request.user.id)
+
+        # on sync changed one returned whatever the status, so client can move it
+        if not since:
+            queryset = queryset.filter(status__in=status.split(','))
+        return self.filter_since(queryset).order_by('-date_created')
 
     # Return a response
     def get_response(self, serializer, serializer_parent=None):
         response = dict()
-        response['count'] = _PAGINATOR.count
+        response['count'] = self.paginator.count
         response['per_page'] = settings.PAGINATION_PER_PAGE
         response['navigate'] = {
-            'offset': _PAGINATOR.offset,
-            'limit': _PAGINATOR.limit,
-            'previous': _PAGINATOR.get_previous_link(),
-            'next': _PAGINATOR.get_next_link(),
+            'offset': self.paginator.offset,
+            'limit': self.paginator.limit,
+            'previous': self.paginator.get_previous_link(),
+            'next': self.paginator.get_next_link(),
         }
+        response.update(self.get_sync())
         response['results'] = serializer.data
         return Response(response, status=response_status.HTTP_200_OK)
 
@@ -121,10 +157,111 @@ class OperatorPurchaseApiView(viewsets.ViewSet):
     def list(self, request, format=None):
         context = {'request': self.request}
         queryset = self.get_object()
-        queryset_paginator = _PAGINATOR.paginate_queryset(queryset, request)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        self.paginator = KeysetPagination(ordering=_ORDERING, counter=counter)
+        queryset_paginator = self.paginator.paginate_queryset(queryset, request)
         serializer = OperatorPurchaseSerializer(queryset_paginator, many=True, context=context)
         return self.get_response(serializer)
 
+    # Count each status for tabs
+    @method_decorator(never_cache)
+    @action(methods=['get'], detail=False, url_path='summary', url_name='summary')
+    def summary(self, request, format=None):
+        context = {'request': self.request}
+        queryset = Purchase.objects.filter(purchase_assigned__operator_id=request.user.id)
+        counter = CountCache(request, scopes=(user_scope(request.user.id),))
+        summary = counter.get_summary(queryset)
+
+        serializer = PurchaseStatusSummarySerializer.from_summary(summary, context=context)
+        response = dict()
+        response['total'] = sum(summary.values())
+        response['results'] = serializer.data
+        return Response(response, status=response_status.HTTP_200_OK)
+
+    # Area of operator from `latitude`, `longitude` and `radius` (km)
+    def get_area(self, params):
+        keys = ('latitude', 'longitude', 'radius',)
+        values = [params.get(key, None) for key in keys]
+        if all(value in (None, '') for value in values):
+            return None
+
+        try:
+            return tuple(float(value) for value in values)
+        except (TypeError, ValueError):
+            raise NotAcceptable(detail=_("Area need valid latitude, longitude and radius."))
+
+    # Open Purchase around the operator, nearest first
+    @method_decorator(never_cache)
+    @action(methods=['get'], detail=False, url_path='nearby', url_name='nearby')
+    def nearby(self, request, format=None):
+        """
+        Params:
+
+            {
+                "latitude": -7.797068,
+                "longitude": 110.370529,
+                "radius": 5
+            }
+
+        Without `latitude` and `longitude` position in operator profile used.
+        """
+        context = {'request': self.request}
+        params = request.query_params.copy()
+        params.setdefault('radius', NEARBY_RADIUS)
+
+        profile = request.user.profile
+        params.setdefault('latitude', profile.latitude)
+        params.setdefault('longitude', profile.longitude)
+
+        latitude, longitude, radius = self.get_area(params)
+        purchases = nearby_purchases(latitude, longitude, min(radius, NEARBY_MAX_RADIUS),
+                                     limit=NEARBY_LIMIT)
+        serializer = OperatorNearbyPurchaseSerializer(purchases, many=True, context=context)
+        return Response(serializer.data, status=response_status.HTTP_200_OK)
+
+    # Pull oldest submitted Purchase as own work
+    @method_decorator(never_cache)
+    @action(methods=['post'], detail=False, url_path='claim', url_name='claim')
+    def claim(self, request, format=None):
+        """
+        Params:
+
+            {
+                "latitude": -7.797068,
+                "longitude": 110.370529,
+                "radius": 10
+            }
+
+        Area optional, without it any Purchase can claimed.
+        """
+        context = {'request': self.request}
+        purchase = claim_purchase(request.user, area=self.get_area(request.data))
+        if not purchase:
+            raise NotFound(detail=_("No purchase waiting."))
+
+        purchase = self.get_object(uuid=str(purchase.uuid))
+        serializer = OperatorPurchaseSingleSerializer(purchase, many=False, context=context)
+        return Response(serializer.data, status=response_status.HTTP_201_CREATED)
+
+    # History of status, assignment and delivery
+    @method_decorator(never_cache)
+    @action(methods=['get'], detail=True, url_path='timeline', url_name='timeline')
+    def timeline(self, request, uuid=None):
+        try:
+            uuid = check_uuid(uid=uuid)
+        except ValidationError as err:
+            raise NotAcceptable(detail=_(' '.join(err.messages)))
+
+        try:
+            purchase = Purchase.objects.get(uuid=uuid, purchase_assigned__operator_id=request.user.id)
+        except ObjectDoesNotExist:
+            raise NotFound()
+
+        context = {'request': self.request}
+        events = purchase_timeline(purchase, limit=TIMELINE_LIMIT)
+        serializer = PurchaseTimelineSerializer(events, many=True, context=context)
+        return Response(serializer.data, status=response_status.HTTP_200_OK)
+
     # Single
     @method_decorator(never_cache)
     @transaction.atomic
@@ -134,6 +271,35 @@ class OperatorPurchaseApiView(viewsets.ViewSet):
         serializer = OperatorPurchaseSingleSerializer(queryset, many=False, context=context)
         return Response(serializer.data, status=response_status.HTTP_200_OK)
 
+    # Whole Purchase tree for offline use
+    @action(methods=['get'], detail=True, url_path='snapshot', url_name='snapshot')
+    def snapshot(self, request, uuid=None):
+        """
+        Purchase, delivery, necessaries and their goods with picture in one response.
+        Keep `version` (also the `ETag`) and send it back as `If-None-Match`,
+        304 returned while nothing changed. Body gzipped if `Accept-Encoding` allow.
+        """
+        purchase = self.get_object(uuid=uuid)
+
+        etag = make_etag(request, *snapshot_version(purchase))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        necessaries = Necessary.objects \
+            .filter(purchase_id=purchase.id) \
+            .prefetch_related(necessary_goods_prefetch(picture=True)) \
+            .order_by('-date_created', '-id')
+
+        context = {'request': self.request, 'include': {INCLUDE_GOODS_PICTURE}}
+        serializer_purchase = OperatorPurchaseSingleSerializer(purchase, many=False, context=context)
+        serializer_necessary = OperatorSnapshotNecessarySerializer(necessaries, many=True, context=context)
+
+        response = dict()
+        response['version'] = etag
+        response['purchase'] = serializer_purchase.data
+        response['necessaries'] = serializer_necessary.data
+        return set_etag(compressed_response(request, response), etag)
+
     # Update
     @method_decorator(never_cache)
     @transaction.atomic
@@ -150,4 +316,47 @@ class OperatorPurchaseApiView(viewsets.ViewSet):
         if serializer.is_valid(raise_exception=True):
             serializer.save()
             return Response(serializer.data, status=response_status.HTTP_200_OK)
-        return Response(serializer.errors, status=response_status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=response_status.HTTP_400_BAD_REQUEST)
+
+    # Sub-action check many Goods at once
+    @method_decorator(never_cache)
+    @transaction.atomic
+    @action(methods=['post'], detail=True, url_path='checklist', url_name='checklist')
+    def checklist(self, request, uuid=None):
+        """
+        Params:
+
+            {
+                "goods": [
+                    {"goods_uuid": "eaaf94e6-361e-4557-8bf1-fc3d5fd27035", "is_done": true, "price": 3000},
+                    {"goods_uuid": "926f50ce-ec3d-44e5-b85b-c926b0ae9568", "is_skip": true}
+                ]
+            }
+        """
+        try:
+            uuid = check_uuid(uid=uuid)
+        except ValidationError as err:
+            raise NotAcceptable(detail=_(' '.join(err.messages)))
+
+        # Operator ownership verified once here
+        try:
+            purchase = Purchase.objects.select_for_update() \
+                .get(uuid=uuid, purchase_assigned__operator_id=request.user.id)
+        except ObjectDoesNotExist:
+            raise NotFound()
+
+        context = {'request': self.request, 'purchase': purchase}
+        serializer = OperatorChecklistSerializer(data=request.data, context=context)
+        if serializer.is_valid(raise_exception=True):
+            goods_ids = serializer.save()
+            purchase.refresh_from_db()
+
+            queryset = Goods.objects.filter(id__in=goods_ids).order_by('-date_created', '-id')
+            serializer_goods = OperatorChecklistGoodsSerializer(queryset, many=True, context=context)
+            serializer_purchase = OperatorPurchaseSerializer(purchase, many=False, context=context)
+
+            response = dict()
+            response['purchase'] = serializer_purchase.data
+            response['results'] = serializer_goods.data
+            return Response(response, status=response_status.HTTP_200_OK)
+        return Response(serializer.errors, status=response_status.HTTP_400_BAD_REQUEST)
@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete, post_delete
 
 
 class ShoptaskConfig(AppConfig):
@@ -7,13 +7,65 @@ class ShoptaskConfig(AppConfig):
 
     def ready(self):
         from utils.generals import get_model
-        from apps.shoptask.signals import purchase_save_handler, purchase_assigned_save_handler
+        from apps.shoptask.utils.coalesce import coalesce
+        from apps.shoptask.signals import (
+            purchase_save_handler, purchase_assigned_save_handler,
+            goods_save_handler, goods_delete_handler,
+            goods_assigned_save_handler, goods_assigned_delete_handler,
+            goods_catalog_save_handler,
+            attachment_save_handler, attachment_delete_handler, count_save_handler,
+            tombstone_delete_handler)
 
         Purchase = get_model('shoptask', 'Purchase')
         PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+        Necessary = get_model('shoptask', 'Necessary')
+        Goods = get_model('shoptask', 'Goods')
+        GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+        Attachment = get_model('shoptask', 'Attachment')
+        GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
+        Catalog = get_model('shoptask', 'Catalog')
 
+        # goods accepted in the same transaction as the status, never deferred
         post_save.connect(purchase_save_handler, sender=Purchase,
                           dispatch_uid='purchase_save_signal')
 
-        post_save.connect(purchase_assigned_save_handler, sender=PurchaseAssigned,
-                          dispatch_uid='purchase_assigned_save_signal')
+        # cascade run once each instance after commit
+        post_save.connect(coalesce(purchase_assigned_save_handler), sender=PurchaseAssigned,
+                          weak=False, dispatch_uid='purchase_assigned_save_signal')
+
+        # progress counters
+        post_save.connect(goods_save_handler, sender=Goods,
+                          dispatch_uid='goods_save_signal')
+        post_delete.connect(goods_delete_handler, sender=Goods,
+                            dispatch_uid='goods_delete_signal')
+        post_save.connect(goods_assigned_save_handler, sender=GoodsAssigned,
+                          dispatch_uid='goods_assigned_save_signal')
+        post_delete.connect(goods_assigned_delete_handler, sender=GoodsAssigned,
+                            dispatch_uid='goods_assigned_delete_signal')
+
+        # goods list version
+        post_save.connect(goods_catalog_save_handler, sender=GoodsCatalog,
+                          dispatch_uid='goods_catalog_save_signal')
+        post_delete.connect(goods_catalog_save_handler, sender=GoodsCatalog,
+                            dispatch_uid='goods_catalog_delete_signal')
+
+        # primary picture
+        post_save.connect(attachment_save_handler, sender=Attachment,
+                          dispatch_uid='attachment_save_signal')
+        post_delete.connect(attachment_delete_handler, sender=Attachment,
+                            dispatch_uid='attachment_delete_signal')
+
+        # list counts cache
+        for model in (Purchase, PurchaseAssigned, Necessary, Goods, GoodsAssigned,
+                      GoodsCatalog, Catalog):
+            model_name = model._meta.model_name
+            post_save.connect(count_save_handler, sender=model,
+                              dispatch_uid='%s_count_save_signal' % model_name)
+            post_delete.connect(count_save_handler, sender=model,
+                                dispatch_uid='%s_count_delete_signal' % model_name)
+
+        # delta sync
+        for model in (Purchase, PurchaseAssigned, Necessary, Goods):
+            model_name = model._meta.model_name
+            pre_delete.connect(tombstone_delete_handler, sender=model,
+                               dispatch_uid='%s_tombstone_signal' % model_name)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.shoptask.utils.delivery import clear_expired_schedules
+
+
+class Command(BaseCommand):
+    help = "Clear past delivery schedule of DRAFT Purchase, run periodically or with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="How many PurchaseDelivery cleared in one UPDATE.")
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help="Keep running, sweep each --interval seconds.")
+        parser.add_argument('--interval', type=int, default=300,
+                            help="Seconds between sweeps with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            total = clear_expired_schedules(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS("Cleared %s expired schedules." % total))
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,54 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.shoptask.utils.transition import TransitionConflict
+from apps.shoptask.utils.dispatch import dispatch_purchases, DISPATCH_CAPACITY
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError("Invalid date %s, use YYYY-MM-DD." % value)
+
+
+class Command(BaseCommand):
+    help = "Assign submitted Purchase to the nearest operator with capacity, run periodically or with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=parse_date, default=None,
+                            help="Only delivery scheduled on or after this date (YYYY-MM-DD).")
+        parser.add_argument('--date-to', type=parse_date, default=None,
+                            help="Only delivery scheduled on or before this date (YYYY-MM-DD).")
+        parser.add_argument('--capacity', type=int, default=DISPATCH_CAPACITY,
+                            help="Open Purchase each operator can hold.")
+        parser.add_argument('--radius', type=float, default=None,
+                            help="Kilometer, operator further than it never picked.")
+        parser.add_argument('--dry-run', action='store_true', default=False,
+                            help="Show the plan, nothing written.")
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help="Keep running, dispatch each --interval seconds.")
+        parser.add_argument('--interval', type=int, default=60,
+                            help="Seconds between dispatch with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                plan, total = dispatch_purchases(
+                    date_from=options['date_from'], date_to=options['date_to'],
+                    capacity=options['capacity'], radius=options['radius'],
+                    dry_run=options['dry_run'])
+            except TransitionConflict:
+                self.stdout.write(self.style.WARNING("Purchase changed while dispatching, nothing assigned."))
+            else:
+                if options['dry_run']:
+                    for purchase_id, operator_id in plan.items():
+                        self.stdout.write("Purchase %s to operator %s" % (purchase_id, operator_id))
+                self.stdout.write(self.style.SUCCESS(
+                    "Planned %s, assigned %s purchases." % (len(plan), total)))
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
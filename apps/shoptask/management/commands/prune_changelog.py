@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from utils.generals import get_model
+from apps.shoptask.utils.tombstone import TOMBSTONE_DAYS
+
+ChangeLog = get_model('shoptask', 'ChangeLog')
+Tombstone = get_model('shoptask', 'Tombstone')
+
+
+class Command(BaseCommand):
+    help = "Delete ChangeLog older than --days and Tombstone older than --tombstone-days, oldest first in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help="Keep ChangeLog of this many last days.")
+        parser.add_argument('--tombstone-days', type=int, default=TOMBSTONE_DAYS,
+                            help="Keep Tombstone of this many last days, older sync token expired anyway.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="How many rows deleted in one transaction.")
+
+    def prune(self, model, days, batch_size):
+        cutoff = now() - timedelta(days=days)
+
+        # read through the `date_created` index
+        expired = model.objects.filter(date_created__lt=cutoff).order_by('date_created')
+
+        total = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return total
+
+            with transaction.atomic():
+                model.objects.filter(id__in=ids).delete()
+            total += len(ids)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        total = self.prune(ChangeLog, options['days'], batch_size)
+        self.stdout.write(self.style.SUCCESS("Deleted %s changelogs." % total))
+
+        total = self.prune(Tombstone, options['tombstone_days'], batch_size)
+        self.stdout.write(self.style.SUCCESS("Deleted %s tombstones." % total))
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction, connections
+
+from utils.generals import get_model
+from apps.shoptask.utils.progress import recount_progress, recount_goods_status, progress_drift
+
+Purchase = get_model('shoptask', 'Purchase')
+
+
+class Command(BaseCommand):
+    help = "Reconcile Necessary and Purchase progress counters, bill summary and Goods status from Goods and GoodsAssigned."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purchase', nargs='*', default=None,
+                            help="Only Purchase with this UUID (multiple allowed).")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="How many Purchase recounted in one transaction.")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="How many chunks recounted at the same time, each with own connection.")
+
+    def recount_chunk(self, chunk):
+        """Return (drifted necessaries, drifted purchases, necessaries, purchases)"""
+        with transaction.atomic():
+            necessary_drift, purchase_drift = progress_drift(purchase_ids=chunk)
+            necessary_count, purchase_count = recount_progress(purchase_ids=chunk)
+            recount_goods_status(purchase_ids=chunk)
+        return necessary_drift, purchase_drift, necessary_count, purchase_count
+
+    def recount_chunk_in_thread(self, chunk):
+        try:
+            return self.recount_chunk(chunk)
+        finally:
+            # connection opened by this thread
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = max(options['workers'], 1)
+        queryset = Purchase.objects.order_by('id')
+
+        if options['purchase']:
+            queryset = queryset.filter(uuid__in=options['purchase'])
+
+        purchase_ids = list(queryset.values_list('id', flat=True))
+        chunks = [purchase_ids[index:index + chunk_size]
+                  for index in range(0, len(purchase_ids), chunk_size)]
+
+        if workers == 1:
+            results = [self.recount_chunk(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self.recount_chunk_in_thread, chunks))
+
+        necessary_drift, purchase_drift, necessary_total, purchase_total = \
+            [sum(values) for values in zip(*results)] if results else (0, 0, 0, 0)
+
+        if necessary_drift or purchase_drift:
+            self.stdout.write(self.style.WARNING(
+                "Drift found on %s purchases and %s necessaries." % (purchase_drift, necessary_drift)))
+
+        self.stdout.write(self.style.SUCCESS(
+            "Recounted %s purchases and %s necessaries." % (purchase_total, necessary_total)))
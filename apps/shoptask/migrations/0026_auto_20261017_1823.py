@@ -0,0 +1,101 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:23
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value, Subquery, OuterRef, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def _subquery(queryset, lookup, aggregate):
+    queryset = queryset.filter(**{lookup: OuterRef('pk')}).order_by() \
+        .values(lookup).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), Value(0))
+
+
+def recount_progress(apps, schema_editor):
+    Goods = apps.get_model('shoptask', 'Goods')
+    GoodsAssigned = apps.get_model('shoptask', 'GoodsAssigned')
+
+    for model_name, lookup in (('Necessary', 'necessary'), ('Purchase', 'purchase')):
+        model = apps.get_model('shoptask', model_name)
+        goods_lookup = 'goods__%s' % lookup
+        values = {
+            'total_count': _subquery(Goods.objects.all(), lookup, Count('pk')),
+            'done_count': _subquery(GoodsAssigned.objects.filter(is_done=True), goods_lookup, Count('pk')),
+            'skip_count': _subquery(GoodsAssigned.objects.filter(is_skip=True), goods_lookup, Count('pk')),
+            'accept_count': _subquery(GoodsAssigned.objects.filter(is_accept=True), goods_lookup, Count('pk')),
+            'left_count': _subquery(Goods.objects.filter(goods_assigned__isnull=True), lookup, Count('pk')),
+        }
+
+        if model_name == 'Necessary':
+            values['bill_summary'] = _subquery(Goods.objects.all(), lookup, Sum('bill'))
+        model.objects.update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoptask', '0025_auto_20200529_1029'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='changelog',
+            options={'ordering': ['-date_created'], 'verbose_name': 'Changelog', 'verbose_name_plural': 'Changelogs'},
+        ),
+        migrations.AddField(
+            model_name='necessary',
+            name='accept_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='necessary',
+            name='bill_summary',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='necessary',
+            name='done_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='necessary',
+            name='left_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='necessary',
+            name='skip_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='necessary',
+            name='total_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='accept_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='done_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='left_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='skip_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='total_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recount_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:27
+
+from django.db import migrations, models
+from django.db.models import Subquery, OuterRef
+import django.db.models.deletion
+
+
+def fill_primary_picture(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Attachment = apps.get_model('shoptask', 'Attachment')
+
+    for model_name in ('Goods', 'Catalog'):
+        content_type = ContentType.objects \
+            .filter(app_label='shoptask', model=model_name.lower()) \
+            .first()
+        if not content_type:
+            continue
+
+        pictures = Attachment.objects \
+            .filter(content_type_id=content_type.id, object_id=OuterRef('pk'), is_delete=False) \
+            .exclude(value_image='') \
+            .order_by('-date_updated') \
+            .values('id')[:1]
+
+        model = apps.get_model('shoptask', model_name)
+        model.objects.update(primary_picture=Subquery(pictures))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoptask', '0026_auto_20261017_1823'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalog',
+            name='primary_picture',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shoptask.Attachment'),
+        ),
+        migrations.AddField(
+            model_name='goods',
+            name='primary_picture',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shoptask.Attachment'),
+        ),
+        migrations.RunPython(fill_primary_picture, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:28
+
+from django.db import migrations, models
+from django.db.models import Value, Subquery, OuterRef, CharField, Case, When
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_goods_status(apps, schema_editor):
+    Goods = apps.get_model('shoptask', 'Goods')
+    GoodsAssigned = apps.get_model('shoptask', 'GoodsAssigned')
+
+    current = GoodsAssigned.objects \
+        .filter(goods_id=OuterRef('pk')) \
+        .order_by('-date_created', '-id') \
+        .annotate(goods_status=Case(
+            When(is_accept=True, then=Value('accept')),
+            When(is_done=True, then=Value('done')),
+            When(is_skip=True, then=Value('skip')),
+            default=Value('left'),
+            output_field=CharField()
+        ))
+
+    Goods.objects.update(
+        assigned=Subquery(current.values('id')[:1]),
+        status=Coalesce(Subquery(current.values('goods_status')[:1], output_field=CharField()),
+                        Value('left')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoptask', '0027_auto_20261017_1827'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goods',
+            name='assigned',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shoptask.GoodsAssigned'),
+        ),
+        migrations.AddField(
+            model_name='goods',
+            name='status',
+            field=models.CharField(choices=[('left', 'Left'), ('done', 'Done'), ('skip', 'Skip'), ('accept', 'Accept')], default='left', editable=False, max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['necessary', 'status', '-date_created'], name='goods_necessary_status_idx'),
+        ),
+        migrations.RunPython(fill_goods_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoptask', '0029_auto_20261017_1833'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='necessary',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
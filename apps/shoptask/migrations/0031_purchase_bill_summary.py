@@ -0,0 +1,31 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:44
+
+from django.db import migrations, models
+from django.db.models import Sum, Value, Subquery, OuterRef, BigIntegerField
+from django.db.models.functions import Coalesce
+
+
+def fill_bill_summary(apps, schema_editor):
+    Purchase = apps.get_model('shoptask', 'Purchase')
+    Goods = apps.get_model('shoptask', 'Goods')
+
+    bills = Goods.objects.filter(purchase=OuterRef('pk')).order_by() \
+        .values('purchase').annotate(value=Sum('bill')).values('value')
+    Purchase.objects.update(
+        bill_summary=Coalesce(Subquery(bills, output_field=BigIntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoptask', '0030_necessary_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='bill_summary',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_bill_summary, migrations.RunPython.noop),
+    ]
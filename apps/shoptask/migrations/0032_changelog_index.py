@@ -0,0 +1,21 @@
+# Generated by Django 3.0.14 on 2026-10-17 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shoptask', '0031_purchase_bill_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['content_type', 'object_id', '-date_created'], name='changelog_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['date_created'], name='changelog_date_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.0.14 on 2026-10-17 12:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('shoptask', '0033_shippingaddress_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True, null=True)),
+                ('object_uuid', models.UUIDField()),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'db_table': 'shoptask_tombstone',
+                'ordering': ['-date_created'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['customer', 'date_updated'], name='goods_customer_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='necessary',
+            index=models.Index(fields=['customer', 'date_updated'], name='necessary_customer_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['customer', 'date_updated'], name='purchase_customer_sync_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='content_type',
+            field=models.ForeignKey(limit_choices_to=models.Q(app_label='shoptask'), on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', related_query_name='tombstone', to='contenttypes.ContentType'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', related_query_name='tombstone', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'content_type', 'date_created'], name='tombstone_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['date_created'], name='tombstone_date_idx'),
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.utils.translation import gettext_lazy as _
 from django.core.validators import ValidationError
 
 from apps.person.utils.constant import OPERATOR, CUSTOMER
+from apps.shoptask.utils.constant import LEFT, SKIP, DONE, ACCEPT
 
 
 class AbstractPurchaseAssigned(models.Model):
@@ -13,7 +14,9 @@ class AbstractPurchaseAssigned(models.Model):
     :is_done marked by Operator
     :is_accept marked by Purchaser
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    __original_operator_id = None
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -36,6 +39,13 @@ class AbstractPurchaseAssigned(models.Model):
         abstract = True
         verbose_name = _("Purchase Assigned")
         verbose_name_plural = _("Purchase Assigneds")
+        indexes = [
+            models.Index(fields=['operator', 'purchase'], name='purchase_assigned_operator_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__original_operator_id = self.operator_id
 
     def clean(self):
         roles = self.operator.roles.all().values_list('identifier', flat=True)
@@ -48,10 +58,15 @@ class AbstractPurchaseAssigned(models.Model):
         if customer:
             self.customer = customer
         super().save(*args, **kwargs)
+        self.__original_operator_id = self.operator_id
 
     def __str__(self):
         return self.purchase.label
 
+    @property
+    def original_operator_id(self):
+        return self.__original_operator_id
+
 
 class AbstractGoodsAssigned(models.Model):
     """
@@ -59,7 +74,9 @@ class AbstractGoodsAssigned(models.Model):
     :is_done marked by Operator
     :is_accept marked by Customer
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    __original_progress = None
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -84,11 +101,43 @@ class AbstractGoodsAssigned(models.Model):
         verbose_name = _("Goods Assigned")
         verbose_name_plural = _("Goods Assigneds")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__original_progress = self.progress
+
     def save(self, *args, **kwargs):
         customer = self.goods.customer
         if customer:
             self.customer = customer
         super().save(*args, **kwargs)
+        self.__original_progress = self.progress
 
     def __str__(self):
         return self.goods.label
+
+    @property
+    def progress(self):
+        """
+        Counters this assignment add to Necessary and Purchase
+        :left_count moved by signals, only first and last assignment of the Goods
+        """
+        return {
+            'done_count': int(self.is_done),
+            'skip_count': int(self.is_skip),
+            'accept_count': int(self.is_accept),
+        }
+
+    @property
+    def original_progress(self):
+        return self.__original_progress
+
+    @property
+    def goods_status(self):
+        """Status this assignment give to Goods"""
+        if self.is_accept:
+            return ACCEPT
+        if self.is_done:
+            return DONE
+        if self.is_skip:
+            return SKIP
+        return LEFT
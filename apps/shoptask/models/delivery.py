@@ -5,6 +5,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from utils.generals import get_model
+from utils.geo import encode_geohash
 from apps.person.utils.constant import CUSTOMER
 
 
@@ -15,7 +16,7 @@ class AbstractShippingAddress(models.Model):
     ------------
     :is_default if checked the address default for Purchase address
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -35,6 +36,7 @@ class AbstractShippingAddress(models.Model):
     postal_code = models.CharField(max_length=255, blank=True)
     latitude = models.FloatField(blank=True, null=True, verbose_name=_("Latitude"))
     longitude = models.FloatField(blank=True, null=True, verbose_name=_("Longitude"))
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
     notes = models.TextField(blank=True, help_text=_("Eg; Put in garage"))
     is_default = models.BooleanField(default=False)
 
@@ -43,6 +45,10 @@ class AbstractShippingAddress(models.Model):
         ordering = ['-date_created']
         verbose_name = _('Shipping Address')
         verbose_name_plural = _('Shippings Address')
+        indexes = [
+            models.Index(fields=['customer', 'label'], name='shipping_customer_label_idx'),
+            models.Index(fields=['geohash'], name='shipping_geohash_idx'),
+        ]
 
     def __str__(self):
         return self.label
@@ -55,11 +61,16 @@ class AbstractShippingAddress(models.Model):
             old_objs = ShippingAddress.objects.filter(is_default=True, customer_id=self.customer.id)
             if old_objs.exists():
                 old_objs.update(is_default=False)
+
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields', None)
+        if update_fields and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
         super().save(*args, **kwargs)
 
 
 class AbstractPurchaseDelivery(models.Model):
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -17,7 +17,7 @@ _ALL_METRICS = METRICS + DIMENSION_METRICS + WEIGHT_METRICS
 
 
 class AbstractAttachment(models.Model):
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
@@ -62,7 +62,7 @@ class AbstractAttachment(models.Model):
 
 
 class AbstractChangeLog(models.Model):
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -89,11 +89,52 @@ class AbstractChangeLog(models.Model):
         ordering = ['-date_created']
         verbose_name = _('Changelog')
         verbose_name_plural = _('Changelogs')
+        indexes = [
+            # history of an object
+            models.Index(fields=['content_type', 'object_id', '-date_created'],
+                         name='changelog_object_idx'),
+            # prune oldest first
+            models.Index(fields=['date_created'], name='changelog_date_idx'),
+        ]
 
     def __str__(self):
         return self.new_value
 
 
+class AbstractTombstone(models.Model):
+    """
+    Deleted Purchase, Necessary or Goods read by delta sync
+    -------------
+    :user who listed the object (customer or operator), one row each
+    :object_uuid the object already gone, only uuid kept
+    """
+    date_created = models.DateTimeField(auto_now_add=True, null=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE,
+                                     related_name='tombstones',
+                                     related_query_name='tombstone',
+                                     limit_choices_to=Q(app_label='shoptask'))
+    object_uuid = models.UUIDField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='tombstones',
+                             related_query_name='tombstone')
+
+    class Meta:
+        abstract = True
+        ordering = ['-date_created']
+        verbose_name = _('Tombstone')
+        verbose_name_plural = _('Tombstones')
+        indexes = [
+            # deleted since last sync of an user
+            models.Index(fields=['user', 'content_type', 'date_created'],
+                         name='tombstone_user_idx'),
+            # prune oldest first
+            models.Index(fields=['date_created'], name='tombstone_date_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.object_uuid)
+
+
 class AbstractExtraCharge(models.Model):
     """
     for some Goods maybe has extra size and quantity
@@ -108,7 +149,7 @@ class AbstractExtraCharge(models.Model):
     ----------
     if :limit 1 sack and purchase goods.quantity is 2 sack = run extra charge
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
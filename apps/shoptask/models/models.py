@@ -151,3 +151,12 @@ if not is_model_registered('shoptask', 'GoodsExtraCharge'):
             db_table = 'shoptask_goods_extra_charge'
 
     __all__.append('GoodsExtraCharge')
+
+
+# 17
+if not is_model_registered('shoptask', 'Tombstone'):
+    class Tombstone(AbstractTombstone):
+        class Meta(AbstractTombstone.Meta):
+            db_table = 'shoptask_tombstone'
+
+    __all__.append('Tombstone')
@@ -14,7 +14,7 @@ from apps.shoptask.utils.constant import (
 class AbstractCategory(models.Model):
     _UPLOAD_TO = 'images/icon/category'
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -43,7 +43,7 @@ class AbstractCategory(models.Model):
 class AbstractBrand(models.Model):
     _UPLOAD_TO = 'images/icon/brand'
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -67,7 +67,7 @@ class AbstractBrand(models.Model):
 
 
 class AbstractCatalog(models.Model):
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -81,6 +81,9 @@ class AbstractCatalog(models.Model):
                              null=True, related_name='catalogs',
                              related_query_name='catalog')
     pictures = GenericRelation('shoptask.Attachment', related_query_name='catalog')
+    primary_picture = models.ForeignKey('shoptask.Attachment', on_delete=models.SET_NULL,
+                                        null=True, blank=True, editable=False,
+                                        related_name='+')
 
     sku = models.CharField(max_length=255)
     label = models.CharField(max_length=255)
@@ -96,13 +99,16 @@ class AbstractCatalog(models.Model):
         abstract = True
         verbose_name = _("Catalog")
         verbose_name_plural = _("Catalogs")
+        indexes = [
+            models.Index(fields=['status', 'label'], name='catalog_status_label_idx'),
+        ]
 
     def __str__(self):
         return self.label
 
 
 class AbstractCatalogAttribute(models.Model):
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
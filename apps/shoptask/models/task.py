@@ -8,8 +8,11 @@ from django.contrib.contenttypes.fields import GenericRelation
 
 from utils.validators import IDENTIFIER_VALIDATOR, non_python_keyword
 from apps.person.utils.constant import CUSTOMER
-from apps.shoptask.utils.constant import DRAFT, SUBMITTED, STATUS_CHOICES, METRICS
+from apps.shoptask.utils.constant import (
+    DRAFT, SUBMITTED, STATUS_CHOICES, METRICS, LEFT, SKIP, DONE, ACCEPT,
+    GOODS_STATUS_CHOICES)
 from apps.shoptask.utils.log import CreateChangeLog
+from apps.shoptask.utils.prefetch import DELIVERIES_ATTR, ASSIGNEDS_ATTR
 
 from django_currentuser.middleware import (
     get_current_user, get_current_authenticated_user)
@@ -27,7 +30,10 @@ class AbstractPurchase(models.Model):
     """
     __original_status = None
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    # status moved since `purchase_save_handler` last run
+    status_changed = False
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -50,10 +56,24 @@ class AbstractPurchase(models.Model):
                                           non_python_keyword],
                               max_length=255)
 
+    # progress, maintained by signals from Goods and GoodsAssigned
+    total_count = models.IntegerField(editable=False, default=0)
+    done_count = models.IntegerField(editable=False, default=0)
+    skip_count = models.IntegerField(editable=False, default=0)
+    accept_count = models.IntegerField(editable=False, default=0)
+    left_count = models.IntegerField(editable=False, default=0)
+    bill_summary = models.BigIntegerField(editable=False, default=0)
+
     class Meta:
         abstract = True
         verbose_name = _("Purchase")
         verbose_name_plural = _("Purchases")
+        indexes = [
+            models.Index(fields=['customer', 'status', '-date_created'],
+                         name='purchase_customer_status_idx'),
+            # delta sync
+            models.Index(fields=['customer', 'date_updated'], name='purchase_customer_sync_idx'),
+        ]
 
     def __str__(self):
         return self.label
@@ -63,26 +83,63 @@ class AbstractPurchase(models.Model):
         self.__original_status = self.status
 
     def save(self, force_insert=False, force_update=False, *args, **kwargs):
-        # create change log for status
-        if self.status != self.__original_status:
-            changelog = CreateChangeLog(
+        changed = self.status != self.__original_status
+        if changed:
+            self.status_changed = True
+        super().save(force_insert, force_update, *args, **kwargs)
+
+        # create change log for status, written after commit
+        if changed:
+            CreateChangeLog(
                 obj=self,
                 obj_id=self.id,
                 column='status',
                 old_value=self.__original_status,
                 new_value=self.status
             ).save()
-
-        super().save(force_insert, force_update, *args, **kwargs)
         self.__original_status = self.status
 
+    @property
+    def status_moved(self):
+        """Status differ from the one loaded, read by post_save before save() return"""
+        return self.status != self.__original_status
+
+    def sync_status(self, status):
+        """Status already written by `transition_purchase`, not logged again"""
+        self.status = status
+        self.status_changed = True
+        self.__original_status = status
+
+    def _first_related(self, attr, manager):
+        """Use `purchase_detail_prefetch` result if loaded, otherwise query"""
+        objs = getattr(self, attr, None)
+        if objs is not None:
+            return objs[0] if objs else None
+        return manager.order_by('id').first()
+
     @property
     def shipping(self):
-        return self.purchase_deliveries.first()
+        return self._first_related(DELIVERIES_ATTR, self.purchase_deliveries)
 
     @property
     def assigned(self):
-        return self.purchase_assigneds.first()
+        return self._first_related(ASSIGNEDS_ATTR, self.purchase_assigneds)
+
+    @property
+    def has_operator(self):
+        return self.assigned is not None
+
+    @property
+    def has_delivery(self):
+        return self.shipping is not None
+
+    @property
+    def has_schedule(self):
+        shipping = self.shipping
+        return shipping is not None \
+            and shipping.schedule_date is not None \
+            and shipping.schedule_time_start is not None \
+            and shipping.schedule_time_end is not None
 
 
 class AbstractNecessary(models.Model):
@@ -103,7 +160,7 @@ class AbstractNecessary(models.Model):
     | -------------
     | ect...
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -123,10 +180,26 @@ class AbstractNecessary(models.Model):
     excerpt = models.TextField(blank=True, max_length=255, null=True)
     description = models.TextField(blank=True)
 
+    # progress, maintained by signals from Goods and GoodsAssigned
+    total_count = models.IntegerField(editable=False, default=0)
+    done_count = models.IntegerField(editable=False, default=0)
+    skip_count = models.IntegerField(editable=False, default=0)
+    accept_count = models.IntegerField(editable=False, default=0)
+    left_count = models.IntegerField(editable=False, default=0)
+    bill_summary = models.BigIntegerField(editable=False, default=0)
+
+    # bumped on each Goods or GoodsAssigned change, goods list ETag follow it
+    version = models.PositiveIntegerField(editable=False, default=0)
+
     class Meta:
         abstract = True
         verbose_name = _("Necessary")
         verbose_name_plural = _("Necessaries")
+        indexes = [
+            models.Index(fields=['purchase', '-date_created'], name='necessary_purchase_idx'),
+            # delta sync
+            models.Index(fields=['customer', 'date_updated'], name='necessary_customer_sync_idx'),
+        ]
 
     def __str__(self):
         return self.label
@@ -142,7 +215,14 @@ class AbstractGoods(models.Model):
     1 Pepsodent 300gr is IDR 3.000 with quantity 5 pack
     so bill is 3.000 x 5 = IDR 15.000
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    __original_parents = None
+    __original_progress = None
+    __original_values = None
+
+    # change of these logged to ChangeLog
+    logged_fields = ('price', 'quantity',)
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -174,20 +254,98 @@ class AbstractGoods(models.Model):
     bill = models.BigIntegerField(blank=True, null=True)
     pictures = GenericRelation('shoptask.Attachment',
                                related_query_name='goods')
+    primary_picture = models.ForeignKey('shoptask.Attachment', on_delete=models.SET_NULL,
+                                        null=True, blank=True, editable=False,
+                                        related_name='+')
+
+    # follow the current GoodsAssigned
+    status = models.CharField(choices=GOODS_STATUS_CHOICES, default=LEFT, max_length=15,
+                              editable=False)
+    assigned = models.ForeignKey('shoptask.GoodsAssigned', on_delete=models.SET_NULL,
+                                 null=True, blank=True, editable=False,
+                                 related_name='+')
 
     class Meta:
         abstract = True
         verbose_name = _("Goods")
         verbose_name_plural = _("Goods")
+        indexes = [
+            models.Index(fields=['necessary', '-date_created'], name='goods_necessary_idx'),
+            # plain composite, MySQL has no partial index
+            models.Index(fields=['necessary', 'status', '-date_created'],
+                         name='goods_necessary_status_idx'),
+            # delta sync
+            models.Index(fields=['customer', 'date_updated'], name='goods_customer_sync_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__original_parents = self.progress_parents
+        self.__original_progress = self.progress
+        self.__original_values = self.logged_values
 
     def save(self, *args, **kwargs):
         if self.necessary:
             self.purchase = self.necessary.purchase
+
+        # bill always follow price and quantity
+        if self.price is not None and self.quantity is not None:
+            self.bill = self.price * self.quantity
+
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
+        # create change log, written after commit
+        if not adding:
+            for column, value in self.logged_values.items():
+                original = self.__original_values.get(column, None)
+                if value != original:
+                    CreateChangeLog(obj=self, obj_id=self.id, column=column,
+                                    old_value=original, new_value=value).save()
+
+        self.__original_parents = self.progress_parents
+        self.__original_progress = self.progress
+        self.__original_values = self.logged_values
+
     def __str__(self):
         return self.label
 
+    @property
+    def progress_parents(self):
+        return (self.necessary_id, self.purchase_id)
+
+    @property
+    def logged_values(self):
+        return {column: getattr(self, column) for column in self.logged_fields}
+
+    @property
+    def progress(self):
+        """
+        Counters this Goods add to Necessary and Purchase
+        :left_count taken back by the first GoodsAssigned
+        """
+        return {'total_count': 1, 'left_count': 1, 'bill_summary': self.bill or 0}
+
+    @property
+    def is_done(self):
+        return self.status == DONE
+
+    @property
+    def is_skip(self):
+        return self.status == SKIP
+
+    @property
+    def is_accept(self):
+        return self.status == ACCEPT
+
+    @property
+    def original_parents(self):
+        return self.__original_parents
+
+    @property
+    def original_progress(self):
+        return self.__original_progress
+
 
 class AbstractGoodsExtraCharge(models.Model):
     """
@@ -196,7 +354,7 @@ class AbstractGoodsExtraCharge(models.Model):
     so we need also charge the extra
     but each Goods has different approach
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
@@ -229,7 +387,7 @@ class AbstractGoodsCatalog(models.Model):
     - label
     - pictures
     """
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     date_created = models.DateTimeField(auto_now_add=True, null=True)
     date_updated = models.DateTimeField(auto_now=True, null=True)
 
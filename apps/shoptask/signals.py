@@ -1,34 +1,209 @@
+from django.utils.timezone import now
+
 from utils.generals import get_model
 from apps.shoptask.utils.constant import ASSIGNED, REVIEWED, ACCEPT
+from apps.shoptask.utils.progress import (
+    move_progress, recount_progress, recount_goods_status, bump_version, accept_goods)
+from apps.shoptask.utils.picture import refresh_primary_picture
+from apps.shoptask.utils.transition import transition_purchase
+from apps.shoptask.utils.tombstone import bury
+from apps.shoptask.utils.cache import (
+    invalidate_counts, user_scope, CATALOG_SCOPE)
 
+Purchase = get_model('shoptask', 'Purchase')
+PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+Necessary = get_model('shoptask', 'Necessary')
+Goods = get_model('shoptask', 'Goods')
 GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
+Catalog = get_model('shoptask', 'Catalog')
 
 
 def purchase_save_handler(sender, instance, created, **kwargs):
     """
     Customer mark Purchase 'accept'
-    then mark 'is_accept' in 'goods_assigneds' to True
+    then mark 'is_accept' in current 'goods_assigneds' to True
+    only when status just moved, not every save of accepted Purchase,
+    run inside the transaction moved the status so both commit together
     """
-    if instance.status == ACCEPT:
-        goods = instance.goods.filter(goods_assigned__isnull=False,
-                                      goods_assigned__is_accept=False)
-        if goods.exists():
-            goods_assigned_update = list()
-            for item in goods:
-                assigned = item.goods_assigneds.first()
-                if assigned:
-                    assigned.is_accept = True
-                goods_assigned_update.append(assigned)
-            GoodsAssigned.objects.bulk_update(goods_assigned_update, ['is_accept'])
+    update_fields = kwargs.get('update_fields', None) or ()
+    status_changed = instance.status_changed or 'status' in update_fields
+    instance.status_changed = False
+
+    if status_changed and instance.status == ACCEPT:
+        if accept_goods(purchase_ids=[instance.id]):
+            # UPDATE not fired signals
+            recount_progress(purchase_ids=[instance.id])
+            recount_goods_status(purchase_ids=[instance.id])
 
 
 def purchase_assigned_save_handler(sender, instance, created, **kwargs):
     operator = getattr(instance, 'operator', None)
-    purchase = getattr(instance, 'purchase', None)
+    purchase = Purchase.objects.filter(id=instance.purchase_id).first()
 
     if purchase:
-        if operator:
-            purchase.status = ASSIGNED
+        status = ASSIGNED if operator else REVIEWED
+        transition_purchase(purchase, status, validate=False)
+
+
+def goods_save_handler(sender, instance, created, **kwargs):
+    """Keep Necessary and Purchase progress counters up to date"""
+    old_parents = None if created else instance.original_parents
+    old_progress = None if created else instance.original_progress
+
+    move_progress(old_parents, old_progress, instance.progress_parents, instance.progress)
+
+
+def goods_delete_handler(sender, instance, **kwargs):
+    move_progress(instance.original_parents, instance.original_progress, None, None)
+
+
+def _goods_parents(instance):
+    """(necessary_id, purchase_id) from GoodsAssigned"""
+    if GoodsAssigned.goods.is_cached(instance):
+        return instance.goods.progress_parents
+
+    goods = Goods.objects.filter(id=instance.goods_id) \
+        .values_list('necessary_id', 'purchase_id') \
+        .first()
+    return goods
+
+
+def _other_assigned(instance):
+    """Goods still have assignment beside :instance"""
+    return GoodsAssigned.objects \
+        .filter(goods_id=instance.goods_id) \
+        .exclude(id=instance.id) \
+        .exists()
+
+
+def goods_assigned_save_handler(sender, instance, created, **kwargs):
+    old_progress = dict() if created else instance.original_progress
+    new_progress = dict(instance.progress)
+
+    # first assignment take the Goods out of left, same as recount
+    if created and not _other_assigned(instance):
+        new_progress['left_count'] = -1
+
+    # nothing changed, don't touch the parents
+    if old_progress == new_progress:
+        return
+
+    parents = _goods_parents(instance)
+    move_progress(parents, old_progress, parents, new_progress)
+
+    # new assignment become the current one
+    goods = Goods.objects.filter(id=instance.goods_id)
+    if not created:
+        goods = goods.filter(assigned_id=instance.id)
+    goods.update(assigned=instance, status=instance.goods_status, date_updated=now())
+
+
+def goods_assigned_delete_handler(sender, instance, **kwargs):
+    old_progress = dict(instance.original_progress)
+
+    # last assignment gone, Goods left again
+    if not _other_assigned(instance):
+        old_progress['left_count'] = -1
+
+    parents = _goods_parents(instance)
+    move_progress(parents, old_progress, None, None)
+
+    # pointer already set to null, fallback to the remaining assignment
+    recount_goods_status(goods_ids=[instance.goods_id])
+
+
+def goods_catalog_save_handler(sender, instance, **kwargs):
+    """Picked Catalog shown in goods list, mark the Necessary changed"""
+    bump_version(goods_ids=[instance.goods_id])
+
+
+def attachment_save_handler(sender, instance, created, **kwargs):
+    """Keep Goods and Catalog `primary_picture` pointed to newest picture"""
+    if instance.content_type_id and instance.object_id:
+        refresh_primary_picture(instance.content_type_id, instance.object_id)
+
+
+def attachment_delete_handler(sender, instance, **kwargs):
+    if instance.content_type_id and instance.object_id:
+        refresh_primary_picture(instance.content_type_id, instance.object_id)
+
+
+def _operator_scopes(purchase_id):
+    return [user_scope(operator_id) for operator_id in PurchaseAssigned.objects
+            .filter(purchase_id=purchase_id)
+            .values_list('operator_id', flat=True)]
+
+
+def count_save_handler(sender, instance, **kwargs):
+    """
+    Invalidate cached list counts who can see the instance, after commit
+    - Customer see their Purchase, Necessary, Goods and Catalog not picked yet
+    - Operator see Purchase assigned to them and the Necessary
+    Purchase only when status moved, PurchaseAssigned when operator moved,
+    Necessary when created or deleted, other save not change the counts
+    """
+    # post_delete sent without `created`
+    deleted = 'created' not in kwargs
+    created = kwargs.get('created', False)
+    update_fields = kwargs.get('update_fields', None) or ()
+    scopes = list()
+
+    if sender is Purchase:
+        if not (created or deleted or instance.status_moved or 'status' in update_fields):
+            return
+        scopes.append(user_scope(instance.customer_id))
+        scopes.extend(_operator_scopes(instance.id))
+
+    if sender is PurchaseAssigned:
+        if created or deleted or instance.operator_id != instance.original_operator_id:
+            scopes.extend(user_scope(operator_id) for operator_id in
+                          (instance.operator_id, instance.original_operator_id) if operator_id)
+
+    if sender is Necessary:
+        if created or deleted:
+            scopes.append(user_scope(instance.customer_id))
+            scopes.extend(_operator_scopes(instance.purchase_id))
+
+    if sender is Catalog:
+        scopes.append(CATALOG_SCOPE)
+
+    if sender is Goods:
+        scopes.append(user_scope(instance.customer_id))
+
+    # Goods status and picked Catalog follow these
+    if sender in (GoodsAssigned, GoodsCatalog):
+        if sender.goods.is_cached(instance):
+            customer_id = instance.goods.customer_id
         else:
-            purchase.status = REVIEWED
-        purchase.save()
+            customer_id = Goods.objects.filter(id=instance.goods_id) \
+                .values_list('customer_id', flat=True) \
+                .first()
+
+        if customer_id:
+            scopes.append(user_scope(customer_id))
+
+    invalidate_counts(*scopes)
+
+
+def tombstone_delete_handler(sender, instance, using, **kwargs):
+    """
+    Deleted object remembered for delta sync of who listed it,
+    pre_delete so the assignment still readable inside cascade
+    """
+    if sender is PurchaseAssigned:
+        # Purchase gone from the operator list only
+        purchase_uuid = Purchase.objects.using(using) \
+            .filter(id=instance.purchase_id) \
+            .values_list('uuid', flat=True) \
+            .first()
+        if purchase_uuid:
+            bury(Purchase, purchase_uuid, [instance.operator_id], using=using)
+        return
+
+    user_ids = [instance.customer_id]
+    if sender is Necessary:
+        user_ids.extend(PurchaseAssigned.objects.using(using)
+                        .filter(purchase_id=instance.purchase_id)
+                        .values_list('operator_id', flat=True))
+    bury(sender, instance.uuid, user_ids, using=using)
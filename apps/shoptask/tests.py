@@ -1,3 +1,1467 @@
-from django.test import TestCase
+import re
+import json
+import gzip
+from io import StringIO
+from uuid import uuid4
+from unittest import mock
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils.timezone import now
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+
+from rest_framework.test import APIClient
+from django_currentuser.middleware import _set_current_user
+
+from utils.generals import get_model
+from utils.geo import encode_geohash
+from apps.person.utils.auth import set_roles
+from apps.person.utils.constant import OPERATOR
+from apps.shoptask.utils.progress import recount_progress, recount_goods_status
+from apps.shoptask.utils.picture import PictureResolver
+from apps.shoptask.utils.clone import clone_purchase
+from apps.shoptask.utils.delivery import clear_expired_schedules
+from apps.shoptask.utils.transition import transition_purchase, TransitionConflict
+from apps.shoptask.utils.claim import claim_purchase
+from apps.shoptask.utils.cache import user_scope
+from apps.shoptask.utils.tombstone import deleted_since, TOMBSTONE_DAYS
+from apps.shoptask.utils.dispatch import dispatch_purchases, plan_dispatch, nearest_operators
+from apps.shoptask.utils.constant import (
+    LEFT, SKIP, DONE, ACCEPT, DRAFT, SUBMITTED, PUBLISH, ASSIGNED, PROCESSED, REVIEWED,
+    REJECTED)
+
+Purchase = get_model('shoptask', 'Purchase')
+Necessary = get_model('shoptask', 'Necessary')
+Goods = get_model('shoptask', 'Goods')
+GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
+Catalog = get_model('shoptask', 'Catalog')
+Attachment = get_model('shoptask', 'Attachment')
+PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+ShippingAddress = get_model('shoptask', 'ShippingAddress')
+PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+ChangeLog = get_model('shoptask', 'ChangeLog')
+OTPCode = get_model('person', 'OTPCode')
+
 
 # Create your tests here.
+class ShoptaskMixin:
+    def setUp(self):
+        # ChangeLog read user left by previous test request
+        _set_current_user(None)
+
+        self.customer = User.objects.create_user('customer', 'customer@email.com', '123456')
+        self.operator = User.objects.create_user('operator', 'operator@email.com', '123456')
+
+        self.purchase = Purchase.objects.create(customer=self.customer, label='Belanja lebaran')
+        self.necessary = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                                  label='Kebutuhan dapur')
+
+    def create_goods(self, label='Minyak', necessary=None, **kwargs):
+        return Goods.objects.create(customer=self.customer, necessary=necessary or self.necessary,
+                                    label=label, quantity=1, metric='piece', **kwargs)
+
+
+class ShoptaskTestCase(ShoptaskMixin, TestCase):
+    pass
+
+
+class ShoptaskTransactionTestCase(ShoptaskMixin, TransactionTestCase):
+    """Commit really happen, `on_commit` callbacks run"""
+
+
+class ProgressTestCase(ShoptaskTestCase):
+    def assertProgress(self, obj, **counters):
+        obj.refresh_from_db()
+        for key, value in counters.items():
+            self.assertEqual(getattr(obj, key), value, key)
+
+    def test_goods_counted(self):
+        self.create_goods('Minyak', bill=15000)
+        self.create_goods('Gula', bill=5000)
+
+        self.assertProgress(self.necessary, total_count=2, left_count=2, bill_summary=20000)
+        self.assertProgress(self.purchase, total_count=2, left_count=2)
+
+    def test_goods_assigned_counted(self):
+        goods = self.create_goods()
+        assigned = GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+        self.assertProgress(self.necessary, total_count=1, left_count=0, done_count=1)
+
+        assigned.is_done = False
+        assigned.is_skip = True
+        assigned.save()
+        self.assertProgress(self.necessary, done_count=0, skip_count=1)
+        self.assertProgress(self.purchase, done_count=0, skip_count=1)
+
+        assigned.delete()
+        self.assertProgress(self.necessary, total_count=1, left_count=1, skip_count=0)
+
+    def test_many_assigned(self):
+        goods = self.create_goods()
+        first = GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+        second = GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_skip=True)
+        self.assertProgress(self.necessary, total_count=1, left_count=0)
+
+        first.delete()
+        self.assertProgress(self.necessary, total_count=1, left_count=0)
+        self.assertProgress(self.purchase, left_count=0)
+
+        second.delete()
+        self.assertProgress(self.necessary, total_count=1, left_count=1)
+        self.assertProgress(self.purchase, left_count=1)
+
+        # same as recount from scratch
+        recount_progress(purchase_ids=[self.purchase.id])
+        self.assertProgress(self.necessary, total_count=1, left_count=1)
+
+    def test_goods_deleted(self):
+        goods = self.create_goods(bill=3000)
+        GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+        Goods.objects.filter(id=goods.id).delete()
+
+        self.assertProgress(self.necessary, total_count=0, left_count=0, done_count=0,
+                            bill_summary=0)
+        self.assertProgress(self.purchase, total_count=0, left_count=0, done_count=0)
+
+    def test_goods_moved(self):
+        other = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                         label='Kebutuhan bayi')
+        goods = self.create_goods()
+        goods.necessary = other
+        goods.save()
+
+        self.assertProgress(self.necessary, total_count=0, left_count=0)
+        self.assertProgress(other, total_count=1, left_count=1)
+        self.assertProgress(self.purchase, total_count=1, left_count=1)
+
+    def test_recount(self):
+        goods = self.create_goods(bill=1000)
+        GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_accept=True)
+        Necessary.objects.update(total_count=0, accept_count=0, bill_summary=0)
+        Purchase.objects.update(total_count=0)
+
+        with self.assertNumQueries(2):
+            recount_progress(purchase_ids=[self.purchase.id])
+
+        self.assertProgress(self.necessary, total_count=1, accept_count=1, bill_summary=1000)
+        self.assertProgress(self.purchase, total_count=1, accept_count=1, left_count=0)
+
+
+class PictureTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.catalog = Catalog.objects.create(label='Minyak goreng', sku='MG-01')
+        self.catalog_picture = self.create_picture(self.catalog, 'catalog.jpg')
+
+    def create_picture(self, obj, name):
+        content_type = ContentType.objects.get_for_model(obj, for_concrete_model=False)
+        return Attachment.objects.create(content_type=content_type, object_id=obj.id,
+                                         value_image=name)
+
+    def test_primary_picture(self):
+        goods = self.create_goods()
+        first = self.create_picture(goods, 'first.jpg')
+        second = self.create_picture(goods, 'second.jpg')
+
+        goods.refresh_from_db()
+        self.assertEqual(goods.primary_picture_id, second.id)
+
+        second.delete()
+        goods.refresh_from_db()
+        self.assertEqual(goods.primary_picture_id, first.id)
+
+    def test_resolve_page(self):
+        own = self.create_goods('Gula')
+        own_picture = self.create_picture(own, 'gula.jpg')
+        from_catalog = self.create_goods('Minyak')
+        GoodsCatalog.objects.create(goods=from_catalog, catalog=self.catalog)
+        self.create_goods('Garam')
+
+        goods_list = list(Goods.objects.order_by('id'))
+        with self.assertNumQueries(2):
+            resolver = PictureResolver(goods_list)
+
+        with self.assertNumQueries(0):
+            pictures = [resolver.get(goods) for goods in goods_list]
+        self.assertEqual(pictures, [own_picture, self.catalog_picture, None])
+
+    def test_resolve_selected(self):
+        goods = self.create_goods()
+        GoodsCatalog.objects.create(goods=goods, catalog=self.catalog)
+
+        goods_list = list(Goods.objects.select_related(
+            'primary_picture', 'goods_catalog__catalog__primary_picture'))
+        with self.assertNumQueries(0):
+            resolver = PictureResolver(goods_list)
+        self.assertEqual(resolver.get(goods_list[0]), self.catalog_picture)
+
+
+class GoodsStatusTestCase(ShoptaskTestCase):
+    def test_status_follow_assigned(self):
+        goods = self.create_goods()
+        assigned = GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_skip=True)
+        goods.refresh_from_db()
+        self.assertEqual((goods.status, goods.assigned_id), (SKIP, assigned.id))
+
+        assigned.is_done = True
+        assigned.save()
+        goods.refresh_from_db()
+        self.assertEqual(goods.status, DONE)
+        self.assertTrue(goods.is_done)
+        self.assertFalse(goods.is_skip)
+
+        assigned.is_accept = True
+        assigned.save()
+        goods.refresh_from_db()
+        self.assertEqual(goods.status, ACCEPT)
+
+    def test_status_fallback_when_deleted(self):
+        goods = self.create_goods()
+        first = GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_skip=True)
+        second = GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+
+        second.delete()
+        goods.refresh_from_db()
+        self.assertEqual((goods.status, goods.assigned_id), (SKIP, first.id))
+
+        first.delete()
+        goods.refresh_from_db()
+        self.assertEqual((goods.status, goods.assigned_id), (LEFT, None))
+
+    def test_status_filter(self):
+        goods = self.create_goods('Gula')
+        self.create_goods('Garam')
+        GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+
+        remaining = Goods.objects.filter(necessary=self.necessary, status=LEFT)
+        self.assertEqual(list(remaining.values_list('label', flat=True)), ['Garam'])
+
+
+class KeysetPaginationTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.labels = ['Goods %s' % index for index in range(5)]
+        for label in self.labels:
+            self.create_goods(label)
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_walk_pages(self):
+        url = '/api/customer/goods/?necessary_uuid=%s&limit=2' % self.necessary.uuid
+        labels = list()
+        pages = list()
+
+        while url:
+            page = self.get_page(url)
+            self.assertIsNone(page['count'])
+            labels += [item['label'] for item in page['results']]
+            pages.append(page)
+            url = page['navigate']['next']
+
+        self.assertEqual(labels, list(reversed(self.labels)))
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['navigate']['previous'])
+
+        # back from last page
+        page = self.get_page(pages[-1]['navigate']['previous'])
+        self.assertEqual([item['label'] for item in page['results']], ['Goods 2', 'Goods 1'])
+        self.assertEqual(page['navigate']['next'], pages[1]['navigate']['next'])
+
+    def test_count_opt_in(self):
+        url = '/api/customer/goods/?necessary_uuid=%s&count=true' % self.necessary.uuid
+        self.assertEqual(self.get_page(url)['count'], 5)
+
+    def test_invalid_cursor(self):
+        url = '/api/customer/goods/?necessary_uuid=%s&cursor=xyz' % self.necessary.uuid
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CountCacheTestCase(ShoptaskTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.url = '/api/customer/goods/?necessary_uuid=%s&count=true' % self.necessary.uuid
+        self.create_goods('Gula')
+
+    def get_count(self, url=None):
+        return self.client.get(url or self.url).data['count']
+
+    def test_count_cached(self):
+        self.assertEqual(self.get_count(), 1)
+
+        # next page use cached count
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.get_count(self.url + '&limit=1'), 1)
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql']])
+
+    def test_count_invalidated(self):
+        self.assertEqual(self.get_count(), 1)
+        goods = self.create_goods('Garam')
+        self.assertEqual(self.get_count(), 2)
+
+        GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+        self.assertEqual(self.get_count(self.url + '&status=left'), 1)
+
+        goods.delete()
+        self.assertEqual(self.get_count(), 1)
+
+
+class CountInvalidateTestCase(ShoptaskTransactionTestCase):
+    def deleted_keys(self, func):
+        with mock.patch('apps.shoptask.utils.cache.cache.delete_many') as delete_many:
+            func()
+        return [sorted(call[0][0]) for call in delete_many.call_args_list]
+
+    def test_once_on_commit(self):
+        def save_many():
+            with transaction.atomic():
+                for label in ('Gula', 'Garam', 'Teh'):
+                    self.create_goods(label)
+
+        self.assertEqual(self.deleted_keys(save_many),
+                         [['count:generation:%s' % user_scope(self.customer.id)]])
+
+    def test_skip_unchanged(self):
+        def save_label():
+            self.purchase.label = 'Belanja mingguan'
+            self.purchase.save()
+            self.necessary.label = 'Kebutuhan kamar mandi'
+            self.necessary.save()
+
+        self.assertEqual(self.deleted_keys(save_label), [])
+
+    def test_operator_scope(self):
+        other = User.objects.create_user('other', 'other@email.com', '123456')
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+
+        def assign_other():
+            purchase = Purchase.objects.create(customer=self.customer, label='Belanja lain')
+            PurchaseAssigned.objects.create(purchase=purchase, operator=other)
+
+        keys = sum(self.deleted_keys(assign_other), [])
+        self.assertIn('count:generation:%s' % user_scope(other.id), keys)
+        self.assertNotIn('count:generation:%s' % user_scope(self.operator.id), keys)
+
+        # status moved reach the assigned operator
+        self.purchase.refresh_from_db()
+        keys = sum(self.deleted_keys(lambda: transition_purchase(self.purchase, PROCESSED)), [])
+        self.assertIn('count:generation:%s' % user_scope(self.operator.id), keys)
+
+
+class IndexUsageTestCase(ShoptaskTestCase):
+    """
+    Main query of each endpoint must not full scan the table
+    EXPLAIN QUERY PLAN on SQLite, EXPLAIN with seqscan disabled on PostgreSQL,
+    other backends skipped
+    """
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+                return [row[0] for row in cursor.fetchall()]
+
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest("EXPLAIN format not supported.")
+
+        table = queryset.model._meta.db_table
+        plan = self.get_plan(queryset)
+
+        if connection.vendor == 'postgresql':
+            full_scans = [line for line in plan if 'Seq Scan on %s ' % table in line]
+        else:
+            full_scans = [line for line in plan
+                          if re.match(r'^SCAN (TABLE )?%s( |$)' % table, line) and 'INDEX' not in line]
+        self.assertFalse(full_scans, '\n'.join(plan))
+
+    def test_uuid_lookup(self):
+        for model in (Purchase, Necessary, Goods, GoodsAssigned, Catalog, ShippingAddress, OTPCode):
+            self.assertUsesIndex(model.objects.filter(uuid=uuid4()))
+
+    def test_customer_lists(self):
+        customer_id = self.customer.id
+        self.assertUsesIndex(Purchase.objects
+                             .filter(customer_id=customer_id, status__in=[DRAFT, SUBMITTED])
+                             .order_by('-date_created', '-id'))
+        self.assertUsesIndex(Necessary.objects
+                             .filter(customer_id=customer_id, purchase__uuid=self.purchase.uuid)
+                             .order_by('-date_created', '-id'))
+        self.assertUsesIndex(Goods.objects
+                             .filter(customer_id=customer_id, necessary__uuid=self.necessary.uuid)
+                             .order_by('-date_created', '-id'))
+        self.assertUsesIndex(Goods.objects
+                             .filter(necessary_id=self.necessary.id, status=LEFT)
+                             .order_by('-date_created', '-id'))
+        self.assertUsesIndex(ShippingAddress.objects
+                             .filter(customer_id=customer_id)
+                             .order_by('label', 'id'))
+        self.assertUsesIndex(Catalog.objects
+                             .filter(status=PUBLISH)
+                             .order_by('label', 'id'))
+
+    def test_operator_lists(self):
+        self.assertUsesIndex(PurchaseAssigned.objects.filter(operator_id=self.operator.id))
+        self.assertUsesIndex(Necessary.objects
+                             .filter(purchase__purchase_assigned__operator_id=self.operator.id,
+                                     purchase__uuid=self.purchase.uuid)
+                             .order_by('-date_created', '-id'))
+
+    def test_otp_lookup(self):
+        self.assertUsesIndex(OTPCode.objects.filter(email='customer@email.com',
+                                                    identifier='register_validation',
+                                                    is_used=True))
+
+
+class GoodsBulkTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.catalogs = [Catalog.objects.create(label='Catalog %s' % index, sku='SKU-%s' % index)
+                         for index in range(3)]
+
+    def post(self, goods):
+        data = {'necessary_uuid': str(self.necessary.uuid), 'goods': goods}
+        return self.client.post('/api/customer/goods/bulk/', data, format='json')
+
+    def test_bulk_create(self):
+        goods = [{'catalog_uuid': str(catalog.uuid), 'quantity': 1, 'metric': 'kg'}
+                 for catalog in self.catalogs]
+        goods.append({'label': 'Tempe', 'quantity': 2, 'metric': 'piece'})
+
+        response = self.post(goods)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(sorted(item['label'] for item in response.data['results']),
+                         ['Catalog 0', 'Catalog 1', 'Catalog 2', 'Tempe'])
+        self.assertEqual(GoodsCatalog.objects.filter(goods__necessary=self.necessary).count(), 3)
+
+        self.necessary.refresh_from_db()
+        self.assertEqual((self.necessary.total_count, self.necessary.left_count), (4, 4))
+
+    def test_bulk_duplicate_catalog(self):
+        catalog_uuid = str(self.catalogs[0].uuid)
+        goods = [{'catalog_uuid': catalog_uuid, 'quantity': 1, 'metric': 'kg'}]
+        self.assertEqual(self.post(goods).status_code, 201)
+
+        # already in the Necessary
+        self.assertEqual(self.post(goods).status_code, 400)
+
+        # twice in the payload
+        goods = [{'catalog_uuid': str(self.catalogs[1].uuid), 'quantity': 1, 'metric': 'kg'}] * 2
+        self.assertEqual(self.post(goods).status_code, 400)
+        self.assertEqual(Goods.objects.count(), 1)
+
+
+class OperatorChecklistTestCase(ShoptaskTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+        self.purchase.refresh_from_db()
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.operator)
+        self.url = '/api/operator/purchases/%s/checklist/' % self.purchase.uuid
+        self.goods = [self.create_goods('Goods %s' % index) for index in range(10)]
+
+    def post(self, items):
+        return self.client.post(self.url, {'goods': items}, format='json')
+
+    def test_checklist(self):
+        skipped = self.goods[0]
+        GoodsAssigned.objects.create(goods=skipped, operator=self.operator, is_skip=True)
+
+        items = [{'goods_uuid': str(goods.uuid), 'is_done': True, 'is_skip': False, 'price': 1000}
+                 for goods in self.goods[:8]]
+        items.append({'goods_uuid': str(self.goods[8].uuid), 'is_skip': True})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(context.captured_queries), 20)
+
+        # current assignment reused
+        self.assertEqual(GoodsAssigned.objects.filter(goods=skipped).count(), 1)
+        self.assertEqual(Goods.objects.filter(status=DONE, bill=1000).count(), 8)
+        self.assertEqual(response.data['purchase']['done_count'], 8)
+        self.assertEqual(response.data['purchase']['skip_count'], 1)
+        self.assertEqual(response.data['purchase']['left_count'], 1)
+
+        self.necessary.refresh_from_db()
+        self.assertEqual(self.necessary.bill_summary, 8000)
+
+    def test_checklist_logged(self):
+        ChangeLog.objects.all().delete()
+        since = now()
+        self.post([{'goods_uuid': str(goods.uuid), 'price': 1500} for goods in self.goods[:3]])
+
+        changelogs = ChangeLog.objects.filter(column='price') \
+            .values_list('object_id', 'old_value', 'new_value')
+        self.assertEqual(sorted(changelogs), [(goods.id, '', '1500') for goods in self.goods[:3]])
+        self.assertEqual(Goods.objects.filter(date_updated__gte=since).count(), 3)
+
+    def test_checklist_not_assigned(self):
+        other = User.objects.create_user('other', 'other@email.com', '123456')
+        self.client.force_authenticate(user=other)
+        response = self.post([{'goods_uuid': str(self.goods[0].uuid), 'is_done': True}])
+        self.assertEqual(response.status_code, 404)
+
+    def test_checklist_invalid_goods(self):
+        response = self.post([{'goods_uuid': str(uuid4()), 'is_done': True}])
+        self.assertEqual(response.status_code, 400)
+
+
+class NecessaryIncludeTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.url = '/api/customer/necessaries/'
+        self.other = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                              label='Kebutuhan kamar')
+
+    def list(self, include):
+        params = {'purchase_uuid': str(self.purchase.uuid), 'include': include}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_include_goods(self):
+        self.create_goods('Minyak')
+        self.create_goods('Sabun', necessary=self.other)
+        response, small = self.list('goods.picture')
+
+        for index in range(5):
+            self.create_goods('Beras %s' % index)
+            self.create_goods('Handuk %s' % index, necessary=self.other)
+        response, large = self.list('goods.picture')
+
+        # one prefetch whatever goods count
+        self.assertEqual(small, large)
+        goods = {item['label']: item['goods'] for item in response.data['results']}
+        self.assertEqual(len(goods['Kebutuhan dapur']), 6)
+        self.assertEqual(len(goods['Kebutuhan kamar']), 6)
+        self.assertIn('picture', goods['Kebutuhan dapur'][0])
+        self.assertEqual(goods['Kebutuhan dapur'][0]['status'], LEFT)
+
+    def create_pictured_goods(self, label, necessary=None):
+        goods = self.create_goods(label, necessary=necessary)
+        content_type = ContentType.objects.get_for_model(goods, for_concrete_model=False)
+        Attachment.objects.create(content_type=content_type, object_id=goods.id,
+                                  value_image='%s.jpg' % goods.id)
+        return goods
+
+    def test_include_without_picture(self):
+        self.create_pictured_goods('Minyak')
+        self.create_pictured_goods('Sabun', necessary=self.other)
+        response, small = self.list('goods')
+        goods = response.data['results'][-1]['goods']
+        self.assertNotIn('picture', goods[0])
+
+        # picture not resolved each necessary
+        for index in range(6):
+            necessary = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                                 label='Kebutuhan %s' % index)
+            self.create_pictured_goods('Handuk %s' % index, necessary=necessary)
+        response, large = self.list('goods')
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertEqual(small, large)
+
+        response = self.client.get('%s%s/' % (self.url, self.necessary.uuid), {'include': 'goods'})
+        self.assertEqual(len(response.data['goods']), 1)
+
+    def test_include_default_and_unknown(self):
+        response = self.client.get(self.url, {'purchase_uuid': str(self.purchase.uuid)})
+        self.assertNotIn('goods', response.data['results'][0])
+
+        response = self.client.get(self.url, {'purchase_uuid': str(self.purchase.uuid),
+                                              'include': 'customer'})
+        self.assertEqual(response.status_code, 406)
+
+
+class GoodsETagTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.url = '/api/customer/goods/'
+        self.params = {'necessary_uuid': str(self.necessary.uuid)}
+        self.goods = self.create_goods('Minyak')
+
+    def poll(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, self.params, **headers)
+
+    def test_not_modified(self):
+        etag = self.poll()['ETag']
+        self.assertTrue(etag)
+
+        with self.assertNumQueries(1):
+            response = self.poll(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changed(self):
+        etag = self.poll()['ETag']
+
+        GoodsAssigned.objects.create(goods=self.goods, operator=self.operator, is_done=True)
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.goods.description = 'Yang besar'
+        self.goods.save()
+        self.assertEqual(self.poll(etag).status_code, 200)
+
+    def test_other_filter(self):
+        etag = self.poll()['ETag']
+        self.params['status'] = LEFT
+        self.assertEqual(self.poll(etag).status_code, 200)
+
+
+class ClonePurchaseTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.catalog = Catalog.objects.create(label='Minyak goreng', sku='MG-01')
+        self.kitchen = self.necessary
+        self.bathroom = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                                 label='Kebutuhan mandi')
+
+    def fill(self, size):
+        """:size Goods in each Necessary, same labels in both"""
+        goods = [Goods(customer=self.customer, purchase=self.purchase, necessary=necessary,
+                       label='Goods %s' % index, quantity=1, metric='piece', price=1000,
+                       uuid=uuid4())
+                 for necessary in (self.kitchen, self.bathroom) for index in range(size)]
+        Goods.objects.bulk_create(goods)
+
+        goods = list(Goods.objects.filter(purchase=self.purchase).order_by('id'))
+        GoodsCatalog.objects.bulk_create([GoodsCatalog(goods=obj, catalog=self.catalog, uuid=uuid4())
+                                          for obj in goods])
+        content_type = ContentType.objects.get_for_model(Goods, for_concrete_model=False)
+        Attachment.objects.create(content_type=content_type, object_id=goods[-1].id,
+                                  value_image='sabun.jpg')
+        PurchaseDelivery.objects.create(purchase=self.purchase)
+
+    def clone(self):
+        with CaptureQueriesContext(connection) as context:
+            purchase = clone_purchase(self.purchase, self.customer)
+        # INSERT split in batches by the backend
+        queries = [query['sql'] for query in context.captured_queries
+                   if not query['sql'].startswith('INSERT')]
+        return purchase, len(queries)
+
+    def test_clone_tree(self):
+        self.fill(3)
+        purchase, _ = self.clone()
+        recount_progress(purchase_ids=[purchase.id])
+        purchase.refresh_from_db()
+
+        self.assertEqual(purchase.status, DRAFT)
+        self.assertEqual(purchase.total_count, 6)
+        self.assertEqual(PurchaseDelivery.objects.filter(purchase=purchase).count(), 1)
+
+        for necessary in Necessary.objects.filter(purchase=purchase):
+            labels = sorted(necessary.goods.values_list('label', flat=True))
+            self.assertEqual(labels, ['Goods 0', 'Goods 1', 'Goods 2'])
+
+        goods = Goods.objects.filter(purchase=purchase)
+        self.assertEqual(goods.filter(price__isnull=True, goods_catalog__catalog=self.catalog).count(), 6)
+
+        pictured = goods.get(primary_picture__isnull=False)
+        self.assertEqual(pictured.necessary.label, 'Kebutuhan mandi')
+        self.assertEqual(pictured.primary_picture.object_id, pictured.id)
+
+    def test_query_count_flat(self):
+        self.fill(5)
+        _, small = self.clone()
+
+        Goods.objects.all().delete()
+        self.fill(500)
+        _, large = self.clone()
+        self.assertEqual(small, large)
+
+    def test_repurchase(self):
+        self.fill(2)
+        self.purchase.status = ACCEPT
+        self.purchase.save()
+
+        client = APIClient()
+        client.force_authenticate(user=self.customer)
+        response = client.post('/api/customer/purchases/%s/repurchase/' % self.purchase.uuid)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_count'], 4)
+
+
+class ExpiredScheduleTestCase(ShoptaskTestCase):
+    def test_clear_expired(self):
+        today = date(2020, 5, 10)
+        expired = PurchaseDelivery.objects.create(purchase=self.purchase, schedule_date=date(2020, 5, 9))
+
+        submitted = Purchase.objects.create(customer=self.customer, label='Sudah dikirim',
+                                            status=SUBMITTED)
+        kept = PurchaseDelivery.objects.create(purchase=submitted, schedule_date=date(2020, 5, 9))
+        upcoming = PurchaseDelivery.objects.create(purchase=self.purchase, schedule_date=today)
+        since = now()
+
+        self.assertEqual(clear_expired_schedules(today=today, batch_size=1), 1)
+        expired.refresh_from_db()
+        kept.refresh_from_db()
+        upcoming.refresh_from_db()
+        self.assertIsNone(expired.schedule_date)
+
+        # delta sync see the cleared schedule
+        self.assertGreaterEqual(expired.date_updated, since)
+        self.assertTrue(Purchase.objects.filter(id=self.purchase.id, date_updated__gte=since).exists())
+        self.assertLess(kept.date_updated, since)
+        self.assertEqual(kept.schedule_date, date(2020, 5, 9))
+        self.assertEqual(upcoming.schedule_date, today)
+
+    def test_retrieve_read_only(self):
+        PurchaseDelivery.objects.create(purchase=self.purchase, schedule_date=date(2020, 5, 9))
+        client = APIClient()
+        client.force_authenticate(user=self.customer)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/customer/purchases/%s/' % self.purchase.uuid)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in context.captured_queries
+                          if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))])
+
+
+class BillSummaryTestCase(ShoptaskTestCase):
+    def test_bill_follow_goods(self):
+        first = self.create_goods('Minyak')
+        second = self.create_goods('Gula')
+
+        # same bill counted twice
+        for goods in (first, second):
+            goods.price = 1500
+            goods.quantity = 2
+            goods.save()
+
+        self.purchase.refresh_from_db()
+        self.assertEqual(first.bill, 3000)
+        self.assertEqual((self.purchase.bill_summary, self.purchase.total_count), (6000, 2))
+
+        second.delete()
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.bill_summary, 3000)
+
+        client = APIClient()
+        client.force_authenticate(user=self.customer)
+        response = client.get('/api/customer/purchases/%s/' % self.purchase.uuid)
+        self.assertEqual(response.data['bill_summary'], 3000)
+
+    def test_recount_report_drift(self):
+        goods = self.create_goods()
+        goods.price = 1000
+        goods.save()
+        Purchase.objects.update(bill_summary=1)
+
+        out = StringIO()
+        call_command('recount_progress', stdout=out)
+        self.assertIn('Drift found on 1 purchases and 0 necessaries.', out.getvalue())
+
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.bill_summary, 1000)
+
+
+class PurchaseTransitionTestCase(ShoptaskTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.url = '/api/customer/purchases/%s/' % self.purchase.uuid
+
+    def test_submit(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.url, {'status': SUBMITTED}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], SUBMITTED)
+        self.assertFalse([query for query in context.captured_queries
+                          if 'FOR UPDATE' in query['sql']])
+
+
+    def test_not_allowed(self):
+        response = self.client.patch(self.url, {'status': ACCEPT}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.status, DRAFT)
+
+    def test_customer_edges(self):
+        # pulled back before an operator assigned
+        for status in (REVIEWED, REJECTED):
+            Purchase.objects.filter(id=self.purchase.id).update(status=status)
+            response = self.client.patch(self.url, {'status': DRAFT}, format='json')
+            self.assertEqual(response.status_code, 200, status)
+
+        # once assigned the customer can't pull it back anymore
+        for status in (ASSIGNED, PROCESSED, DONE):
+            Purchase.objects.filter(id=self.purchase.id).update(status=status)
+            response = self.client.patch(self.url, {'status': DRAFT}, format='json')
+            self.assertEqual(response.status_code, 400, status)
+            self.purchase.refresh_from_db()
+            self.assertEqual(self.purchase.status, status)
+
+    def test_conflict(self):
+        stale = Purchase.objects.get(id=self.purchase.id)
+        transition_purchase(self.purchase, SUBMITTED)
+
+        with self.assertRaises(TransitionConflict):
+            transition_purchase(stale, SUBMITTED)
+
+    def test_accept_goods(self):
+        goods = self.create_goods()
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.status, ASSIGNED)
+
+        GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+        Purchase.objects.filter(id=self.purchase.id).update(status=DONE)
+
+        response = self.client.patch(self.url, {'status': ACCEPT}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        # post_save sent after the UPDATE
+        goods.refresh_from_db()
+        self.assertEqual(goods.status, ACCEPT)
+
+
+class AcceptGoodsTestCase(ShoptaskTransactionTestCase):
+    def create_assigned(self, count):
+        goods = Goods.objects.bulk_create(
+            [Goods(customer=self.customer, necessary=self.necessary, purchase=self.purchase,
+                   label='Goods %s' % index, quantity=1, metric='piece')
+             for index in range(count)])
+        if any(obj.pk is None for obj in goods):
+            goods = list(Goods.objects.filter(purchase=self.purchase).order_by('id'))
+
+        GoodsAssigned.objects.bulk_create(
+            [GoodsAssigned(goods=obj, operator=self.operator, is_done=True) for obj in goods])
+        recount_goods_status(purchase_ids=[self.purchase.id])
+        recount_progress(purchase_ids=[self.purchase.id])
+        Purchase.objects.filter(id=self.purchase.id).update(status=DONE)
+        self.purchase.refresh_from_db()
+
+    def accept(self):
+        with CaptureQueriesContext(connection) as context:
+            transition_purchase(self.purchase, ACCEPT)
+        return len(context.captured_queries)
+
+    def test_constant_queries(self):
+        # ChangeLog content type cached before measured
+        ContentType.objects.get_for_model(Purchase, for_concrete_model=False)
+        self.create_assigned(5)
+        small = self.accept()
+
+        Goods.objects.all().delete()
+        self.purchase = Purchase.objects.create(customer=self.customer, label='Belanja besar')
+        self.necessary = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                                  label='Kebutuhan dapur')
+        self.create_assigned(500)
+        self.assertEqual(self.accept(), small)
+
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.accept_count, 500)
+        self.assertFalse(GoodsAssigned.objects.filter(is_accept=False).exists())
+        self.assertFalse(Goods.objects.exclude(status=ACCEPT).exists())
+
+    def test_same_transaction(self):
+        self.create_assigned(3)
+
+        # crash after the status moved roll back the accepted goods too
+        with self.assertRaises(TransitionConflict):
+            with transaction.atomic():
+                transition_purchase(self.purchase, ACCEPT)
+                self.assertFalse(GoodsAssigned.objects.filter(is_accept=False).exists())
+                raise TransitionConflict()
+
+        self.assertEqual(Purchase.objects.get(id=self.purchase.id).status, DONE)
+        self.assertFalse(GoodsAssigned.objects.filter(is_accept=True).exists())
+        self.assertFalse(Goods.objects.filter(status=ACCEPT).exists())
+
+    def test_only_transition(self):
+        self.create_assigned(3)
+        self.accept()
+
+        # new assignment after accept left as is by plain save
+        goods = Goods.objects.filter(purchase=self.purchase).first()
+        GoodsAssigned.objects.create(goods=goods, operator=self.operator, is_done=True)
+        self.purchase.refresh_from_db()
+
+        with CaptureQueriesContext(connection) as context:
+            self.purchase.save()
+        self.assertFalse([query for query in context.captured_queries
+                          if 'shoptask_goodsassigned' in query['sql']])
+        self.assertEqual(GoodsAssigned.objects.filter(is_accept=False).count(), 1)
+
+
+class ChangeLogTestCase(ShoptaskTransactionTestCase):
+    def test_write_on_commit(self):
+        goods = self.create_goods()
+
+        with transaction.atomic():
+            transition_purchase(self.purchase, SUBMITTED)
+            goods.price = 2000
+            goods.quantity = 3
+            goods.save()
+            self.assertFalse(ChangeLog.objects.exists())
+
+        changelogs = ChangeLog.objects.order_by('id') \
+            .values_list('column', 'old_value', 'new_value')
+        self.assertEqual(list(changelogs), [('status', DRAFT, SUBMITTED), ('price', '', '2000'),
+                                            ('quantity', '1', '3')])
+
+    def test_rollback(self):
+        with self.assertRaises(TransitionConflict):
+            with transaction.atomic():
+                transition_purchase(self.purchase, SUBMITTED)
+                raise TransitionConflict()
+        self.assertFalse(ChangeLog.objects.exists())
+
+        # next transaction not carry the dropped entries
+        with transaction.atomic():
+            self.purchase.refresh_from_db()
+            transition_purchase(self.purchase, SUBMITTED)
+        self.assertEqual(ChangeLog.objects.count(), 1)
+
+    def test_savepoint_rollback(self):
+        goods = self.create_goods()
+        ChangeLog.objects.all().delete()
+
+        with transaction.atomic():
+            transition_purchase(self.purchase, SUBMITTED)
+
+            with self.assertRaises(TransitionConflict):
+                with transaction.atomic():
+                    goods.price = 9999
+                    goods.save()
+                    raise TransitionConflict()
+
+            # released savepoint kept
+            goods = Goods.objects.get(id=goods.id)
+            with transaction.atomic():
+                goods.quantity = 3
+                goods.save()
+
+        changelogs = ChangeLog.objects.order_by('column') \
+            .values_list('column', 'new_value')
+        self.assertEqual(list(changelogs), [('quantity', '3'), ('status', SUBMITTED)])
+
+
+class SignalCoalesceTestCase(ShoptaskTransactionTestCase):
+    def save_assigned(self, times):
+        """Queries of saving PurchaseAssigned :times in one transaction, cascade included"""
+        with CaptureQueriesContext(connection) as context:
+            with transaction.atomic():
+                assigned = PurchaseAssigned.objects.create(purchase=self.purchase,
+                                                           operator=self.operator)
+                for index in range(times - 1):
+                    assigned.save()
+        return context.captured_queries
+
+    def test_run_once(self):
+        self.save_assigned(10)
+
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.status, ASSIGNED)
+        self.assertEqual(list(ChangeLog.objects.values_list('column', 'new_value')),
+                         [('status', ASSIGNED)])
+
+    def test_not_scale(self):
+        once = self.save_assigned(1)
+        PurchaseAssigned.objects.all().delete()
+        Purchase.objects.filter(id=self.purchase.id).update(status=DRAFT)
+        self.purchase.refresh_from_db()
+        many = self.save_assigned(20)
+
+        # only the save itself repeated
+        cascade = re.compile(r'"shoptask_(purchase|changelog)"')
+        self.assertEqual(len([query for query in many if cascade.search(query['sql'])]),
+                         len([query for query in once if cascade.search(query['sql'])]))
+        self.assertEqual(len(many) - len(once), 19)
+
+    def test_nested_atomic(self):
+        once = self.save_assigned(1)
+        PurchaseAssigned.objects.all().delete()
+        Purchase.objects.filter(id=self.purchase.id).update(status=DRAFT)
+        self.purchase.refresh_from_db()
+        ChangeLog.objects.all().delete()
+
+        # each save in sibling savepoint, one queue for whole transaction
+        with CaptureQueriesContext(connection) as context:
+            with transaction.atomic():
+                with transaction.atomic():
+                    assigned = PurchaseAssigned.objects.create(purchase=self.purchase,
+                                                               operator=self.operator)
+                for index in range(3):
+                    with transaction.atomic():
+                        assigned.save()
+
+                # rolled back savepoint drop only its own call
+                with self.assertRaises(TransitionConflict):
+                    with transaction.atomic():
+                        assigned.save()
+                        raise TransitionConflict()
+
+        cascade = re.compile(r'"shoptask_(purchase|changelog)"')
+        self.assertEqual(len([query for query in context.captured_queries
+                              if cascade.search(query['sql'])]),
+                         len([query for query in once if cascade.search(query['sql'])]))
+
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.status, ASSIGNED)
+        self.assertEqual(list(ChangeLog.objects.values_list('column', 'new_value')),
+                         [('status', ASSIGNED)])
+
+    def test_rollback(self):
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+                    raise TransitionConflict()
+            except TransitionConflict:
+                pass
+
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.status, DRAFT)
+
+
+class PurchaseSummaryTestCase(ShoptaskTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        Purchase.objects.create(customer=self.customer, label='Belanja bulanan', status=SUBMITTED)
+        Purchase.objects.create(customer=self.customer, label='Belanja mingguan', status=SUBMITTED)
+        self.client = APIClient()
+
+    def get_summary(self, user, url):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {item['status']: item['count'] for item in response.data['results']}
+
+    def test_customer_summary(self):
+        url = '/api/customer/purchases/summary/'
+        with CaptureQueriesContext(connection) as context:
+            summary = self.get_summary(self.customer, url)
+        self.assertEqual(len([query for query in context.captured_queries
+                              if 'GROUP BY' in query['sql']]), 1)
+        self.assertEqual((summary[DRAFT], summary[SUBMITTED], summary[DONE]), (1, 2, 0))
+
+        # cached until status changed, DatabaseCache still query the cache table
+        with CaptureQueriesContext(connection) as context:
+            self.get_summary(self.customer, url)
+        self.assertFalse([query for query in context.captured_queries
+                          if 'GROUP BY' in query['sql'] or 'COUNT(' in query['sql']])
+
+        transition_purchase(self.purchase, SUBMITTED)
+        summary = self.get_summary(self.customer, url)
+        self.assertEqual((summary[DRAFT], summary[SUBMITTED]), (0, 3))
+
+    def test_operator_summary(self):
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+        summary = self.get_summary(self.operator, '/api/operator/purchases/summary/')
+        self.assertEqual((summary[ASSIGNED], summary[SUBMITTED]), (1, 0))
+
+
+class PurchaseTimelineTestCase(ShoptaskTransactionTestCase):
+    def test_timeline(self):
+        PurchaseDelivery.objects.create(purchase=self.purchase, schedule_date=date(2020, 5, 9))
+        transition_purchase(self.purchase, SUBMITTED)
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+
+        client = APIClient()
+        client.force_authenticate(user=self.customer)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/customer/purchases/%s/timeline/' % self.purchase.uuid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([query for query in context.captured_queries
+                              if 'UNION' in query['sql']]), 1)
+
+        events = [(item['event'], item['old_value'], item['new_value']) for item in response.data]
+        self.assertEqual(sorted(events), [('assigned', '', 'operator'),
+                                          ('delivery', '', '2020-05-09'),
+                                          ('status', DRAFT, SUBMITTED),
+                                          ('status', SUBMITTED, ASSIGNED)])
+        self.assertEqual(response.data[0]['event'], 'status')
+
+    def test_prune(self):
+        transition_purchase(self.purchase, SUBMITTED)
+        ChangeLog.objects.update(date_created=now() - timedelta(days=400))
+        transition_purchase(self.purchase, DRAFT)
+
+        call_command('prune_changelog', days=30, batch_size=1, stdout=StringIO())
+        self.assertEqual(list(ChangeLog.objects.values_list('new_value', flat=True)), [DRAFT])
+
+
+class PurchaseDetailPrefetchTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        address = ShippingAddress.objects.create(customer=self.customer, label='Rumah',
+                                                 telephone='0812345678', address='Jl. Mawar')
+        PurchaseDelivery.objects.create(purchase=self.purchase, shipping_address=address,
+                                        schedule_date=date(2020, 5, 9))
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+
+    def test_customer_retrieve(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/customer/purchases/%s/' % self.purchase.uuid)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['has_operator'])
+        self.assertTrue(response.data['has_delivery'])
+        self.assertFalse(response.data['has_schedule'])
+        self.assertEqual(response.data['shipping']['shipping_address']['label'], 'Rumah')
+        self.assertEqual(response.data['assigned']['operator']['username'], 'operator')
+
+    def test_without_prefetch(self):
+        purchase = Purchase.objects.get(id=self.purchase.id)
+        self.assertTrue(purchase.has_delivery)
+        self.assertEqual(purchase.assigned.operator_id, self.operator.id)
+
+
+class PurchaseClaimTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        set_roles(user=self.operator, roles=[OPERATOR])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.operator)
+
+    def create_submitted(self, label, latitude=None, longitude=None):
+        purchase = Purchase.objects.create(customer=self.customer, label=label, status=SUBMITTED)
+        address = ShippingAddress.objects.create(customer=self.customer, label=label,
+                                                 telephone='0812345678', address='Jl. Mawar',
+                                                 latitude=latitude, longitude=longitude)
+        PurchaseDelivery.objects.create(purchase=purchase, shipping_address=address)
+        return purchase
+
+    def test_claim_oldest(self):
+        first = self.create_submitted('Pertama')
+        self.create_submitted('Kedua')
+
+        response = self.client.post('/api/operator/purchases/claim/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['uuid'], str(first.uuid))
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, ASSIGNED)
+        self.assertEqual(first.assigned.operator_id, self.operator.id)
+
+    def test_claim_conflict_take_next(self):
+        first = self.create_submitted('Pertama')
+        second = self.create_submitted('Kedua')
+
+        # other operator moved the first between read and update
+        def moved_first(purchase, status):
+            if purchase.id == first.id:
+                raise TransitionConflict()
+            return transition_purchase(purchase, status)
+
+        with mock.patch('apps.shoptask.utils.claim.transition_purchase', moved_first):
+            self.assertEqual(claim_purchase(self.operator).id, second.id)
+
+        self.assertEqual(claim_purchase(self.operator).id, first.id)
+        self.assertIsNone(claim_purchase(self.operator))
+
+    def test_claim_area(self):
+        self.create_submitted('Jauh', latitude=-6.2, longitude=106.8)
+        near = self.create_submitted('Dekat', latitude=-7.79, longitude=110.37)
+
+        response = self.client.post('/api/operator/purchases/claim/',
+                                    {'latitude': -7.797, 'longitude': 110.37, 'radius': 5},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['uuid'], str(near.uuid))
+
+        response = self.client.post('/api/operator/purchases/claim/',
+                                    {'latitude': -7.797, 'longitude': 110.37, 'radius': 5},
+                                    format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_claim_not_operator(self):
+        self.create_submitted('Pertama')
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/api/operator/purchases/claim/')
+        self.assertEqual(response.status_code, 403)
+
+
+class DispatchTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.far = User.objects.create_user('far', 'far@email.com', '123456')
+        for user, latitude, longitude in ((self.operator, -7.79, 110.37), (self.far, -6.2, 106.8)):
+            set_roles(user=user, roles=[OPERATOR])
+            user.profile.latitude = latitude
+            user.profile.longitude = longitude
+            user.profile.save()
+
+    def create_submitted(self, label, latitude, longitude, schedule_date=None):
+        purchase = Purchase.objects.create(customer=self.customer, label=label, status=SUBMITTED)
+        address = ShippingAddress.objects.create(customer=self.customer, label=label,
+                                                 telephone='0812345678', address='Jl. Mawar',
+                                                 latitude=latitude, longitude=longitude)
+        PurchaseDelivery.objects.create(purchase=purchase, shipping_address=address,
+                                        schedule_date=schedule_date)
+        return purchase
+
+    def test_plan_capacity(self):
+        purchases = [(1, -7.79, 110.37), (2, -7.8, 110.38), (3, -7.81, 110.39)]
+        operators = [(10, -7.79, 110.37, 0), (20, -6.2, 106.8, 0)]
+
+        plan = plan_dispatch(purchases, operators, capacity=2)
+        self.assertEqual(list(plan.values()).count(10), 2)
+        self.assertEqual(list(plan.values()).count(20), 1)
+
+        plan = plan_dispatch(purchases, operators, capacity=2, radius=50)
+        self.assertEqual(plan, {1: 10, 2: 10})
+
+    def test_dispatch(self):
+        near = self.create_submitted('Dekat', -7.8, 110.38)
+        far = self.create_submitted('Jauh', -6.21, 106.81)
+        later = self.create_submitted('Nanti', -7.8, 110.38, schedule_date=date(2020, 6, 1))
+
+        plan, total = dispatch_purchases(date_to=date(2020, 5, 31))
+        self.assertEqual(total, 0)
+
+        plan, total = dispatch_purchases()
+        self.assertEqual(total, 3)
+        self.assertEqual(PurchaseAssigned.objects.get(purchase=near).operator_id, self.operator.id)
+        self.assertEqual(PurchaseAssigned.objects.get(purchase=far).operator_id, self.far.id)
+        self.assertEqual(Purchase.objects.filter(status=ASSIGNED).count(), 3)
+
+        # already assigned never planned again
+        self.assertEqual(dispatch_purchases(), ({}, 0))
+
+    def test_dispatch_query_count(self):
+        for index in range(20):
+            self.create_submitted('Belanja %s' % index, -7.8, 110.38 + index * 0.01)
+
+        with CaptureQueriesContext(connection) as context:
+            plan, total = dispatch_purchases(capacity=20)
+        self.assertEqual(total, 20)
+        self.assertLess(len(context.captured_queries), 15)
+
+    def test_command_dry_run(self):
+        self.create_submitted('Dekat', -7.8, 110.38)
+        out = StringIO()
+        call_command('dispatch_purchases', '--dry-run', stdout=out)
+        self.assertIn('Planned 1, assigned 0', out.getvalue())
+        self.assertFalse(PurchaseAssigned.objects.exists())
+
+
+class NearbyTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        set_roles(user=self.operator, roles=[OPERATOR])
+        self.operator.profile.latitude = -7.797
+        self.operator.profile.longitude = 110.37
+        self.operator.profile.save()
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.operator)
+
+    def create_submitted(self, label, latitude, longitude):
+        purchase = Purchase.objects.create(customer=self.customer, label=label, status=SUBMITTED)
+        address = ShippingAddress.objects.create(customer=self.customer, label=label,
+                                                 telephone='0812345678', address='Jl. Mawar',
+                                                 latitude=latitude, longitude=longitude)
+        PurchaseDelivery.objects.create(purchase=purchase, shipping_address=address)
+        return purchase
+
+    def test_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, precision=11), 'u4pruydqqvj')
+        self.assertEqual(self.operator.profile.geohash, encode_geohash(-7.797, 110.37))
+
+        address = ShippingAddress.objects.create(customer=self.customer, label='Rumah',
+                                                 telephone='0812345678', address='Jl. Mawar')
+        self.assertIsNone(address.geohash)
+
+        address.latitude = -7.8
+        address.longitude = 110.38
+        address.save(update_fields=['latitude', 'longitude'])
+        address.refresh_from_db()
+        self.assertEqual(address.geohash, encode_geohash(-7.8, 110.38))
+
+    def test_nearby(self):
+        second = self.create_submitted('Kedua', -7.81, 110.38)
+        first = self.create_submitted('Pertama', -7.798, 110.371)
+        self.create_submitted('Jauh', -6.2, 106.8)
+
+        # just outside the radius but inside the box
+        self.create_submitted('Pojok', -7.797 + 0.04, 110.37 + 0.04)
+
+        response = self.client.get('/api/operator/purchases/nearby/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['uuid'] for item in response.data],
+                         [str(first.uuid), str(second.uuid)])
+        self.assertLess(response.data[0]['distance'], response.data[1]['distance'])
+
+        response = self.client.get('/api/operator/purchases/nearby/', {'radius': 'far'})
+        self.assertEqual(response.status_code, 406)
+
+    def test_nearest_operators(self):
+        self.assertEqual([item[0] for item in nearest_operators(-7.8, 110.38, 5)],
+                         [self.operator.id])
+        self.assertEqual(nearest_operators(-6.2, 106.8, 5), [])
+
+
+class OperatorSnapshotTestCase(ShoptaskTestCase):
+    def setUp(self):
+        super().setUp()
+        address = ShippingAddress.objects.create(customer=self.customer, label='Rumah',
+                                                 telephone='0812345678', address='Jl. Mawar')
+        PurchaseDelivery.objects.create(purchase=self.purchase, shipping_address=address)
+        PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.operator)
+        self.url = '/api/operator/purchases/%s/snapshot/' % self.purchase.uuid
+
+    def get_queries(self, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, **headers)
+        return response, len(context.captured_queries)
+
+    def test_snapshot(self):
+        self.create_goods('Minyak')
+        response, few = self.get_queries()
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.content)
+        self.assertEqual(data['version'], response['ETag'])
+        self.assertEqual(data['purchase']['shipping']['shipping_address']['label'], 'Rumah')
+        self.assertEqual([item['label'] for item in data['necessaries'][0]['goods']], ['Minyak'])
+        self.assertIn('picture', data['necessaries'][0]['goods'][0])
+
+        other = Necessary.objects.create(customer=self.customer, purchase=self.purchase,
+                                         label='Kebutuhan bayi')
+        for index in range(20):
+            self.create_goods('Goods %s' % index, necessary=other)
+
+        response, many = self.get_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(few, many)
+
+    def test_not_modified(self):
+        goods = self.create_goods('Minyak')
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        goods.quantity = 3
+        goods.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_gzip(self):
+        self.create_goods('Minyak')
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data['purchase']['uuid'], str(self.purchase.uuid))
+
+    def test_not_assigned(self):
+        other = User.objects.create_user('other', 'other@email.com', '123456')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+
+class DeltaSyncTestCase(ShoptaskTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+
+    def sync_token(self):
+        # token go back SYNC_OVERLAP, move the rows before it
+        return str(int((now() + timedelta(minutes=1)).timestamp() * 1000000))
+
+    def test_purchase_since(self):
+        draft = Purchase.objects.create(customer=self.customer, label='Belanja bulanan')
+        response = self.client.get('/api/customer/purchases/', {'status': DRAFT})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('sync_token', response.data)
+        self.assertNotIn('deleted', response.data)
+
+        Purchase.objects.create(customer=self.customer, label='Tidak berubah')
+        since = now()
+        Purchase.objects.exclude(id=self.purchase.id) \
+            .update(date_updated=since - timedelta(hours=1))
+        Purchase.objects.filter(id=self.purchase.id).update(date_updated=since + timedelta(seconds=1))
+        draft_uuid = draft.uuid
+        draft.delete()
+
+        response = self.client.get('/api/customer/purchases/', {'since': since.isoformat()})
+        self.assertEqual([item['uuid'] for item in response.data['results']],
+                         [str(self.purchase.uuid)])
+        self.assertEqual(response.data['deleted'], [draft_uuid])
+
+        response = self.client.get('/api/customer/purchases/', {'since': self.sync_token()})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['deleted'], [])
+
+    def test_operator_unassigned(self):
+        assigned = PurchaseAssigned.objects.create(purchase=self.purchase, operator=self.operator)
+        since = now()
+        assigned.delete()
+
+        self.client.force_authenticate(user=self.operator)
+        response = self.client.get('/api/operator/purchases/', {'since': since.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], [self.purchase.uuid])
+
+    def test_goods_cascade(self):
+        goods = self.create_goods('Minyak')
+        since = now()
+        self.necessary.delete()
+
+        self.assertEqual(deleted_since(Goods, self.customer.id, since), [goods.uuid])
+        self.assertEqual(deleted_since(Necessary, self.customer.id, since), [self.necessary.uuid])
+
+    def test_rollback_delete(self):
+        goods = self.create_goods('Minyak')
+        since = now()
+
+        with transaction.atomic():
+            with self.assertRaises(TransitionConflict):
+                with transaction.atomic():
+                    goods.delete()
+                    raise TransitionConflict()
+
+        self.assertTrue(Goods.objects.filter(uuid=goods.uuid).exists())
+        self.assertEqual(deleted_since(Goods, self.customer.id, since), [])
+
+    def test_expired_and_invalid(self):
+        expired = (now() - timedelta(days=TOMBSTONE_DAYS + 1)).isoformat()
+        response = self.client.get('/api/customer/purchases/', {'since': expired})
+        self.assertEqual(response.status_code, 410)
+
+        response = self.client.get('/api/customer/purchases/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 406)
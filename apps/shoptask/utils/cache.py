@@ -0,0 +1,113 @@
+import json
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from utils.commit import collect
+
+# Cached count live until invalidated, but not forever
+COUNT_TIMEOUT = 60 * 60
+
+# Approximate count never invalidated by signals, only expired
+APPROXIMATE_COUNT_TIMEOUT = 60 * 5
+
+# Scopes, each has own generation
+CATALOG_SCOPE = 'catalog'
+
+
+def user_scope(user_id):
+    return 'user:%s' % user_id
+
+
+def _generation_key(scope):
+    return 'count:generation:%s' % scope
+
+
+def get_generations(scopes):
+    """
+    Current generation of each scope, missing one created
+    random value so evicted generation never reused
+    """
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+
+    missing = {key: uuid4().hex for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def _delete_generations(batches, using=DEFAULT_DB_ALIAS):
+    """Generation keys dropped in a transaction, each deleted once after commit"""
+    keys = set()
+    for batch in batches:
+        keys.update(batch)
+    cache.delete_many(sorted(keys))
+
+
+def invalidate_counts(*scopes, using=DEFAULT_DB_ALIAS):
+    """
+    Drop generation so all counts cached under scopes ignored,
+    only after commit so count calculated by other request
+    before data committed not survive, each key deleted once
+    """
+    keys = set(_generation_key(scope) for scope in scopes)
+    if not keys:
+        return
+
+    collect('generation', keys, _delete_generations, using=using)
+
+
+class CountCache:
+    """
+    Count list keyed by (user, endpoint, filter set)
+    -------------
+    :scopes generations included in the key, so a write
+            to the scope make the count calculated again
+    :approximate allow `?count=approximate`, the count only expired
+    """
+    ignored_params = ('cursor', 'limit', 'count',)
+
+    def __init__(self, request, scopes=(), approximate=False):
+        self.request = request
+        self.scopes = tuple(scopes)
+        self.approximate = approximate
+
+    def make_key(self, approximate=False):
+        params = sorted((key, sorted(values)) for key, values in self.request.query_params.lists()
+                        if key not in self.ignored_params)
+        generations = None if approximate else get_generations(self.scopes)
+        identity = [self.request.user.id, self.request.path, params, generations]
+
+        digest = hashlib.md5(json.dumps(identity).encode('utf-8')).hexdigest()
+        return 'count:%s:%s' % ('approximate' if approximate else 'exact', digest)
+
+    def get_count(self, queryset, approximate=False):
+        approximate = approximate and self.approximate
+        key = self.make_key(approximate=approximate)
+
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, APPROXIMATE_COUNT_TIMEOUT if approximate else COUNT_TIMEOUT)
+        return count
+
+    def get_summary(self, queryset, lookup='status'):
+        """
+        Count of each `lookup` value with one GROUP BY,
+        cached under same generations as the count
+        """
+        key = '%s:summary:%s' % (self.make_key(), lookup)
+
+        summary = cache.get(key)
+        if summary is None:
+            summary = dict(queryset.order_by()
+                           .values(lookup)
+                           .annotate(count=Count('pk'))
+                           .values_list(lookup, 'count'))
+            cache.set(key, summary, COUNT_TIMEOUT)
+        return summary
@@ -0,0 +1,91 @@
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef
+
+from utils.generals import get_model
+from utils.geo import nearby, nearby_filter
+from apps.shoptask.utils.constant import SUBMITTED, REVIEWED, ASSIGNED
+from apps.shoptask.utils.transition import transition_purchase, TransitionConflict
+
+# Purchase can claimed by operator, oldest first
+CLAIM_STATUSES = (SUBMITTED, REVIEWED,)
+
+# Tried each claim when backend can't skip locked rows
+CLAIM_CANDIDATES = 10
+
+
+def claimable_purchases(area=None):
+    """
+    :area (latitude, longitude, radius km) of the operator,
+          Purchase with shipping address inside the box only
+    """
+    Purchase = get_model('shoptask', 'Purchase')
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+
+    queryset = Purchase.objects \
+        .filter(status__in=CLAIM_STATUSES) \
+        .order_by('date_created', 'id')
+
+    if area:
+        # subquery not join, locked row never duplicated
+        deliveries = PurchaseDelivery.objects \
+            .filter(purchase_id=OuterRef('id')) \
+            .filter(nearby_filter(*area, lookup='shipping_address__'))
+        queryset = queryset.filter(Exists(deliveries))
+    return queryset
+
+
+def claim_purchase(operator, area=None):
+    """
+    Oldest claimable Purchase assigned to :operator, None if nothing left
+    -------------
+    SELECT ... FOR UPDATE SKIP LOCKED, row locked by other operator
+    just skipped so parallel claims never wait each other.
+    Backend without it (SQLite) read few candidates and let the
+    compare-and-swap of `transition_purchase` pick the winner,
+    the loser try next candidate.
+    """
+    PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+
+    queryset = claimable_purchases(area=area)
+    features = connections[queryset.db].features
+
+    with transaction.atomic():
+        if features.has_select_for_update_skip_locked:
+            of = ('self',) if features.has_select_for_update_of else ()
+            candidates = queryset.select_for_update(skip_locked=True, of=of)[:1]
+        else:
+            candidates = queryset[:CLAIM_CANDIDATES]
+
+        for purchase in candidates:
+            try:
+                with transaction.atomic():
+                    transition_purchase(purchase, ASSIGNED)
+                    PurchaseAssigned.objects.create(purchase=purchase, operator=operator)
+            except TransitionConflict:
+                continue
+            return purchase
+    return None
+
+
+def nearby_purchases(latitude, longitude, radius, limit=None):
+    """
+    Claimable Purchase with shipping address inside the circle, nearest first
+    each with `distance` in kilometer
+    """
+    Purchase = get_model('shoptask', 'Purchase')
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+
+    deliveries = PurchaseDelivery.objects \
+        .filter(purchase__status__in=CLAIM_STATUSES,
+                purchase__purchase_assigned__isnull=True)
+
+    distances = dict()
+    for purchase_id, distance in nearby(deliveries, latitude, longitude, radius,
+                                        lookup='shipping_address__', key='purchase_id'):
+        distances.setdefault(purchase_id, distance)
+
+    ids = list(distances)[:limit]
+    purchases = Purchase.objects.in_bulk(ids)
+    for purchase_id in ids:
+        purchases[purchase_id].distance = distances[purchase_id]
+    return [purchases[purchase_id] for purchase_id in ids]
@@ -0,0 +1,116 @@
+from uuid import uuid4
+
+from django.contrib.contenttypes.models import ContentType
+
+from utils.generals import get_model
+from apps.shoptask.utils.constant import DRAFT, LEFT
+
+# Rows each INSERT, database backend may lower it
+CLONE_BATCH_SIZE = 500
+
+
+def bulk_copy(model, objs, **overrides):
+    """
+    Insert a copy of each object with new uuid, return {old pk: new pk}
+    -------------
+    :overrides value set to each copy, callable one called with the object
+               egg: necessary_id=lambda obj: necessary_map[obj.necessary_id]
+    Backend not return pk from bulk_create (SQLite, MySQL)
+    the pk fetched back with one query by uuid
+    """
+    objs = list(objs)
+    if not objs:
+        return dict()
+
+    old_ids = list()
+    for obj in objs:
+        old_ids.append(obj.pk)
+
+        obj.pk = None
+        obj.uuid = uuid4()
+        obj._state.adding = True
+
+        for name, value in overrides.items():
+            setattr(obj, name, value(obj) if callable(value) else value)
+
+    model.objects.bulk_create(objs, batch_size=CLONE_BATCH_SIZE)
+
+    if any(obj.pk is None for obj in objs):
+        new_ids = dict(model.objects
+                       .filter(uuid__in=[obj.uuid for obj in objs])
+                       .values_list('uuid', 'id'))
+        for obj in objs:
+            obj.pk = new_ids[obj.uuid]
+
+    return {old_id: obj.pk for old_id, obj in zip(old_ids, objs)}
+
+
+def clone_purchase(purchase, customer):
+    """
+    Copy whole Purchase tree for :customer as new DRAFT Purchase
+    -------------
+    Necessary, Goods, GoodsCatalog, PurchaseDelivery and Goods pictures
+    each copied with bulk insert, old to new pk mapped explicitly so
+    Goods with same label never mixed. Query count not follow the size.
+    Price, bill and assignment not copied, signals not fired
+    caller must recount progress and invalidate counts.
+    """
+    Purchase = get_model('shoptask', 'Purchase')
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+    Necessary = get_model('shoptask', 'Necessary')
+    Goods = get_model('shoptask', 'Goods')
+    GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
+    Attachment = get_model('shoptask', 'Attachment')
+
+    # built as new instance, status change of the original not logged
+    old_purchase_id = purchase.id
+    values = {field.attname: getattr(purchase, field.attname)
+              for field in Purchase._meta.concrete_fields if not field.primary_key}
+    values.update(uuid=uuid4(), customer_id=customer.id, status=DRAFT)
+
+    new_purchase = Purchase(**values)
+    new_purchase.save()
+
+    # Necessary
+    necessary_map = bulk_copy(
+        Necessary, Necessary.objects.filter(purchase_id=old_purchase_id).order_by('id'),
+        customer_id=customer.id, purchase_id=new_purchase.id)
+
+    # Goods, picture pointed after pictures copied
+    goods = list(Goods.objects.filter(purchase_id=old_purchase_id).order_by('id'))
+    old_pictures = [obj.primary_picture_id for obj in goods]
+    goods_map = bulk_copy(
+        Goods, goods,
+        customer_id=customer.id, purchase_id=new_purchase.id,
+        necessary_id=lambda obj: necessary_map[obj.necessary_id],
+        price=None, bill=None, status=LEFT, assigned_id=None, primary_picture_id=None)
+
+    # GoodsCatalog
+    bulk_copy(
+        GoodsCatalog, GoodsCatalog.objects.filter(goods_id__in=goods_map.keys()).order_by('id'),
+        goods_id=lambda obj: goods_map[obj.goods_id])
+
+    # Delivery, schedule picked again
+    bulk_copy(
+        PurchaseDelivery, PurchaseDelivery.objects.filter(purchase_id=old_purchase_id),
+        purchase_id=new_purchase.id,
+        schedule_date=None, schedule_time_start=None, schedule_time_end=None)
+
+    # Goods pictures, file shared with the original
+    content_type = ContentType.objects.get_for_model(Goods, for_concrete_model=False)
+    attachments = Attachment.objects \
+        .filter(content_type_id=content_type.id, object_id__in=goods_map.keys(), is_delete=False)
+    attachment_map = bulk_copy(
+        Attachment, attachments,
+        object_id=lambda obj: goods_map[obj.object_id])
+
+    pictured = list()
+    for obj, old_picture_id in zip(goods, old_pictures):
+        picture_id = attachment_map.get(old_picture_id, None)
+        if picture_id:
+            obj.primary_picture_id = picture_id
+            pictured.append(obj)
+
+    if pictured:
+        Goods.objects.bulk_update(pictured, ['primary_picture'], batch_size=CLONE_BATCH_SIZE)
+    return new_purchase
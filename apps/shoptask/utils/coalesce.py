@@ -0,0 +1,57 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from utils.commit import collect
+
+
+def merge_calls(calls):
+    """
+    One call kept each (handler, sender, pk), the newest instance win,
+    `created` and `update_fields` merged from every save.
+    """
+    merged = dict()
+    for handler, sender, instance, kwargs in calls:
+        key = (handler, sender, instance.pk)
+        call = merged.get(key, None)
+
+        if call is not None:
+            old_kwargs = call[1]
+            kwargs['created'] = kwargs.get('created', False) or old_kwargs.get('created', False)
+
+            # None mean all fields saved
+            old_fields = old_kwargs.get('update_fields', None)
+            new_fields = kwargs.get('update_fields', None)
+            if old_fields is None or new_fields is None:
+                kwargs['update_fields'] = None
+            else:
+                kwargs['update_fields'] = frozenset(old_fields) | frozenset(new_fields)
+
+        merged[key] = (instance, kwargs)
+    return merged
+
+
+def run_calls(calls, using=DEFAULT_DB_ALIAS):
+    """Handler calls collected during a transaction, run once after commit"""
+    for (handler, sender, pk), (instance, kwargs) in merge_calls(calls).items():
+        handler(sender=sender, instance=instance, **kwargs)
+
+
+def coalesce(handler):
+    """
+    Receiver deferring :handler to `transaction.on_commit`
+    -------------
+    Saved many times in one transaction the handler run once,
+    outside transaction run immediately. Connect with `weak=False`.
+    egg: post_save.connect(coalesce(purchase_save_handler), sender=Purchase, weak=False)
+    """
+    def receiver(sender, instance, **kwargs):
+        kwargs.pop('signal', None)
+        using = kwargs.get('using', None) or DEFAULT_DB_ALIAS
+
+        if not connections[using].in_atomic_block:
+            handler(sender=sender, instance=instance, **kwargs)
+        else:
+            # copy, merged kwargs must not touch the call of other save
+            collect('coalesce', (handler, sender, instance, dict(kwargs)), run_calls, using=using)
+
+    receiver.handler = handler
+    return receiver
@@ -25,6 +25,19 @@ STATUS_CHOICES = (
 ALLOWED_DELETE_STATUS = [REJECTED, DRAFT]
 
 
+# GOODS STATUS
+# follow the current GoodsAssigned
+# precedence is accept > done > skip
+LEFT = 'left'
+SKIP = 'skip'
+GOODS_STATUS_CHOICES = (
+    (LEFT, _("Left")),
+    (DONE, _("Done")),
+    (SKIP, _("Skip")),
+    (ACCEPT, _("Accept")),
+)
+
+
 # Metrics
 KILOGRAM = 'kg'
 HECTOGRAM = 'hg'  # similar to ONS
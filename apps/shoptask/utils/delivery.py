@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.utils.timezone import localtime, now
+
+from utils.generals import get_model
+from apps.shoptask.utils.constant import DRAFT
+
+
+def clear_expired_schedules(today=None, batch_size=500):
+    """
+    DRAFT Purchase with `schedule_date` already past must pick
+    the schedule again, set all `schedule_*` to null
+    -------------
+    One UPDATE each batch in own transaction, so rows
+    never locked long. `date_updated` of the delivery and the Purchase
+    bumped so delta sync return them. Return how many PurchaseDelivery cleared.
+    """
+    Purchase = get_model('shoptask', 'Purchase')
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+
+    today = today or localtime(now()).date()
+    expired = PurchaseDelivery.objects \
+        .filter(purchase__status=DRAFT, schedule_date__lt=today) \
+        .order_by('id')
+
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(expired.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+
+        with transaction.atomic():
+            timestamp = now()
+
+            # status may changed since selected
+            cleared = expired.filter(id__in=ids)
+            Purchase.objects.filter(id__in=cleared.values('purchase_id')) \
+                .update(date_updated=timestamp)
+            total += cleared.update(schedule_date=None, schedule_time_start=None,
+                                    schedule_time_end=None, date_updated=timestamp)
+        last_id = ids[-1]
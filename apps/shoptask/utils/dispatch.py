@@ -0,0 +1,186 @@
+import numpy as np
+
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.utils.timezone import now
+
+from utils.generals import get_model
+from utils.geo import haversine_matrix, nearby
+from apps.person.utils.constant import OPERATOR
+from apps.shoptask.utils.constant import ASSIGNED, PROCESSED
+from apps.shoptask.utils.claim import CLAIM_STATUSES
+from apps.shoptask.utils.log import CreateChangeLog
+from apps.shoptask.utils.transition import TransitionConflict
+from apps.shoptask.utils.cache import invalidate_counts, user_scope
+
+# Open Purchase each operator can hold
+DISPATCH_CAPACITY = 5
+
+# Kilometer added to the distance for each open Purchase of the operator,
+# so nearby but busy operator lose to a free one a bit further
+DISPATCH_LOAD_PENALTY = 2.0
+
+
+def dispatch_candidates(date_from=None, date_to=None):
+    """
+    Unassigned Purchase with located shipping address
+    -------------
+    :date_from, date_to limit to delivery `schedule_date` in the window
+    Return list of (purchase id, latitude, longitude), one each Purchase
+    """
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+
+    queryset = PurchaseDelivery.objects \
+        .filter(purchase__status__in=CLAIM_STATUSES,
+                purchase__purchase_assigned__isnull=True,
+                shipping_address__latitude__isnull=False,
+                shipping_address__longitude__isnull=False) \
+        .order_by('purchase__date_created', 'purchase_id', 'id')
+
+    if date_from:
+        queryset = queryset.filter(schedule_date__gte=date_from)
+
+    if date_to:
+        queryset = queryset.filter(schedule_date__lte=date_to)
+
+    rows = queryset.values_list('purchase_id', 'shipping_address__latitude',
+                                'shipping_address__longitude')
+
+    # first delivery of the Purchase only
+    purchases = dict()
+    for purchase_id, latitude, longitude in rows:
+        purchases.setdefault(purchase_id, (purchase_id, latitude, longitude))
+    return list(purchases.values())
+
+
+def dispatch_operators():
+    """
+    Operator with base position and how many Purchase still open
+    Return list of (user id, latitude, longitude, load)
+    """
+    User = get_model('auth', 'User')
+
+    open_assigned = Q(purchase_assigned__purchase__status__in=(ASSIGNED, PROCESSED))
+    queryset = User.objects \
+        .filter(is_active=True, role__identifier=OPERATOR,
+                profile__latitude__isnull=False, profile__longitude__isnull=False) \
+        .annotate(load=Count('purchase_assigned', filter=open_assigned, distinct=True)) \
+        .order_by('id')
+
+    return list(queryset.values_list('id', 'profile__latitude', 'profile__longitude', 'load'))
+
+
+def nearest_operators(latitude, longitude, radius):
+    """[(user id, distance km), ...] of operator inside the circle, nearest first"""
+    User = get_model('auth', 'User')
+
+    queryset = User.objects.filter(is_active=True, role__identifier=OPERATOR)
+    return nearby(queryset, latitude, longitude, radius, lookup='profile__', key='id')
+
+
+def plan_dispatch(purchases, operators, capacity=DISPATCH_CAPACITY, radius=None):
+    """
+    Pick operator for each Purchase, return {purchase id: operator id}
+    -------------
+    Distance of every pair computed at once as numpy matrix,
+    then greedy take the cheapest pair left while the operator
+    still have capacity. Purchase oldest first win the tie.
+    :radius kilometer, pair further than it never taken
+    """
+    if not purchases or not operators:
+        return dict()
+
+    purchase_ids = [item[0] for item in purchases]
+    operator_ids = [item[0] for item in operators]
+    loads = np.array([item[3] for item in operators], dtype=float)
+    remaining = np.maximum(capacity - loads, 0).astype(int)
+
+    distance = haversine_matrix([item[1:3] for item in purchases],
+                                [item[1:3] for item in operators])
+    cost = distance + DISPATCH_LOAD_PENALTY * loads[None, :]
+
+    if radius is not None:
+        cost[distance > radius] = np.inf
+
+    plan = dict()
+    order = np.argsort(cost, axis=None, kind='stable')
+    rows, cols = np.unravel_index(order, cost.shape)
+
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        if not np.isfinite(cost[row, col]):
+            break
+
+        if remaining[col] <= 0 or purchase_ids[row] in plan:
+            continue
+
+        plan[purchase_ids[row]] = operator_ids[col]
+        remaining[col] -= 1
+
+        if len(plan) == len(purchase_ids) or not remaining.any():
+            break
+    return plan
+
+
+def write_dispatch(plan):
+    """
+    Save the plan, all PurchaseAssigned with one bulk insert
+    -------------
+    Purchase moved to ASSIGNED with one UPDATE, ChangeLog buffered
+    and written once on commit. No post_save fired, counts invalidated here.
+    Purchase taken by other since planned make whole batch rolled back
+    with TransitionConflict, run it again. Return how many assigned.
+    """
+    Purchase = get_model('shoptask', 'Purchase')
+    PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+
+    if not plan:
+        return 0
+
+    with transaction.atomic():
+        queryset = Purchase.objects \
+            .filter(id__in=plan.keys(), status__in=CLAIM_STATUSES) \
+            .exclude(purchase_assigned__isnull=False)
+
+        features = connections[queryset.db].features
+        if features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        rows = list(queryset.values_list('id', 'status', 'customer_id'))
+        if not rows:
+            return 0
+
+        ids = [purchase_id for purchase_id, status, customer_id in rows]
+        updated = Purchase.objects \
+            .filter(id__in=ids, status__in=CLAIM_STATUSES) \
+            .update(status=ASSIGNED, date_updated=now())
+
+        if updated != len(ids):
+            raise TransitionConflict()
+
+        PurchaseAssigned.objects.bulk_create(
+            [PurchaseAssigned(purchase_id=purchase_id, operator_id=plan[purchase_id])
+             for purchase_id in ids])
+
+        for purchase_id, status, customer_id in rows:
+            CreateChangeLog(obj=Purchase, obj_id=purchase_id, column='status',
+                            old_value=status, new_value=ASSIGNED).save()
+
+        scopes = set(user_scope(customer_id) for purchase_id, status, customer_id in rows)
+        scopes.update(user_scope(plan[purchase_id]) for purchase_id in ids)
+        invalidate_counts(*scopes)
+    return len(rows)
+
+
+def dispatch_purchases(date_from=None, date_to=None, capacity=DISPATCH_CAPACITY,
+                       radius=None, dry_run=False):
+    """
+    Assign waiting Purchase to nearest operator with capacity
+    Return (plan, how many written)
+    """
+    purchases = dispatch_candidates(date_from=date_from, date_to=date_to)
+    operators = dispatch_operators()
+    plan = plan_dispatch(purchases, operators, capacity=capacity, radius=radius)
+
+    if dry_run:
+        return plan, 0
+    return plan, write_dispatch(plan)
@@ -1,24 +1,100 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from utils.commit import collect
 from utils.generals import get_model
 
 from django_currentuser.middleware import (
     get_current_user, get_current_authenticated_user)
 
+logger = logging.getLogger(__name__)
+
+# Background writer when `settings.CHANGELOG_QUEUE` enabled
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='changelog')
+
+
+def _write(entries, using=DEFAULT_DB_ALIAS):
+    """One bulk_create each model, ChangeLog and Tombstone share the buffer"""
+    models = dict()
+    for entry in entries:
+        models.setdefault(type(entry), list()).append(entry)
+
+    for model, objs in models.items():
+        model.objects.using(using).bulk_create(objs)
+
+
+def _write_in_queue(entries, using=DEFAULT_DB_ALIAS):
+    try:
+        _write(entries, using=using)
+    finally:
+        # connection opened by executor thread
+        connections[using].close()
+
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error('ChangeLog write failed', exc_info=(type(exc), exc, exc.__traceback__))
+
+
+def _flush(batches, using=DEFAULT_DB_ALIAS):
+    """
+    ChangeLog (and Tombstone) collected during a transaction,
+    written with one bulk_create each model after commit
+    -------------
+    With `settings.CHANGELOG_QUEUE` the write run in background executor,
+    failure logged because nobody wait the result.
+    """
+    entries = [entry for batch in batches for entry in batch]
+    if not entries:
+        return
+
+    if getattr(settings, 'CHANGELOG_QUEUE', False):
+        future = _EXECUTOR.submit(_write_in_queue, entries, using)
+        future.add_done_callback(_log_failure)
+    else:
+        _write(entries, using=using)
+
+
+def write_on_commit(objs, using=DEFAULT_DB_ALIAS):
+    """
+    Queue unsaved objects to the transaction buffer, outside transaction written immediately,
+    rolled back transaction or savepoint drop its objects
+    """
+    objs = list(objs)
+    if not objs:
+        return
+    collect('changelog', objs, _flush, using=using)
+
 
 class CreateChangeLog:
-    def __init__(self, obj, obj_id, column, old_value, new_value):
+    def __init__(self, obj, obj_id, column, old_value, new_value, using=DEFAULT_DB_ALIAS):
         self.obj = obj
         self.obj_id = obj_id
         self.column = column
         self.changed_by = get_current_authenticated_user()
-        self.old_value = old_value
-        self.new_value = new_value
+        self.old_value = '' if old_value is None else str(old_value)
+        self.new_value = '' if new_value is None else str(new_value)
+        self.using = using
 
-    def save(self):
+    def build(self):
+        """Unsaved ChangeLog, for caller queue many with `write_on_commit` at once"""
         from django.contrib.contenttypes.models import ContentType
         ChangeLog = get_model('shoptask', 'ChangeLog')
 
         ct = ContentType.objects.get_for_model(self.obj, for_concrete_model=False)
-        obj = ChangeLog.objects.create(content_type=ct, object_id=self.obj_id,
-                                       column=self.column, old_value=self.old_value,
-                                       new_value=self.new_value, changed_by=self.changed_by)
+        return ChangeLog(content_type=ct, object_id=self.obj_id,
+                         column=self.column, old_value=self.old_value,
+                         new_value=self.new_value, changed_by=self.changed_by)
+
+    def save(self):
+        """
+        Queue the ChangeLog to the transaction buffer,
+        outside transaction written immediately
+        """
+        obj = self.build()
+        write_on_commit([obj], using=self.using)
         return obj
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from apps.person.utils.constant import OPERATOR
+
 
 class IsCustomerOrReadOnly(permissions.BasePermission):
     """
@@ -34,3 +36,11 @@ class IsOperatorOrReject(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return False
         return obj.purchase_assigneds.filter(operator_id=request.user.id).exists()
+
+
+class IsOperatorRole(permissions.BasePermission):
+    """
+    Only user with Operator role can pull new work
+    """
+    def has_permission(self, request, view):
+        return request.user.roles.filter(identifier=OPERATOR).exists()
@@ -0,0 +1,131 @@
+from django.db.models import Subquery
+from django.utils.timezone import now
+from django.contrib.contenttypes.models import ContentType
+
+from utils.generals import get_model
+from apps.shoptask.utils.progress import bump_version
+
+
+def latest_picture(content_type_id, object_id):
+    """Newest image Attachment of an object as subquery"""
+    Attachment = get_model('shoptask', 'Attachment')
+
+    return Attachment.objects \
+        .filter(content_type_id=content_type_id, object_id=object_id, is_delete=False) \
+        .exclude(value_image='') \
+        .order_by('-date_updated') \
+        .values('id')[:1]
+
+
+def refresh_primary_picture(content_type_id, object_id):
+    """
+    Point Goods or Catalog `primary_picture` to their newest picture
+    run each time Attachment saved or deleted, the Necessary version follow
+    """
+    GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
+
+    for model_name in ('Goods', 'Catalog'):
+        model = get_model('shoptask', model_name)
+        content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+
+        if content_type.id == content_type_id:
+            model.objects.filter(id=object_id) \
+                .update(primary_picture=Subquery(latest_picture(content_type_id, object_id)),
+                        date_updated=now())
+
+            # goods list show the picture, Catalog one as fallback
+            if model_name == 'Goods':
+                bump_version(goods_ids=[object_id])
+            else:
+                bump_version(goods_ids=GoodsCatalog.objects.filter(catalog_id=object_id)
+                             .values('goods_id'))
+            return
+
+
+class PictureResolver:
+    """
+    Resolve picture for a page of Goods or Catalog in bulk
+    -------------
+    Goods use their own picture, if not defined use the Catalog picture.
+    Each object only read `primary_picture` pointer, so a page need at most;
+    - 1 query for GoodsCatalog if `goods_catalogs__catalog` not selected
+    - 1 query for Attachment if `primary_picture` not selected
+    """
+
+    def __init__(self, objs):
+        self.pictures = dict()
+        self.resolve([obj for obj in objs if obj is not None])
+
+    def _catalogs(self, goods_list):
+        """Map goods id to (catalog id, catalog primary_picture_id)"""
+        GoodsCatalog = get_model('shoptask', 'GoodsCatalog')
+        Goods = get_model('shoptask', 'Goods')
+
+        catalogs = dict()
+        unresolved = list()
+
+        for goods in goods_list:
+            if Goods.goods_catalogs.is_cached(goods):
+                goods_catalog = getattr(goods, 'goods_catalogs', None)
+                catalog = goods_catalog.catalog if goods_catalog else None
+                if catalog:
+                    catalogs[goods.id] = catalog
+            else:
+                unresolved.append(goods.id)
+
+        if unresolved:
+            goods_catalogs = GoodsCatalog.objects \
+                .select_related('catalog', 'catalog__primary_picture') \
+                .filter(goods_id__in=unresolved)
+
+            for goods_catalog in goods_catalogs:
+                catalogs[goods_catalog.goods_id] = goods_catalog.catalog
+        return catalogs
+
+    def resolve(self, objs):
+        Goods = get_model('shoptask', 'Goods')
+        Attachment = get_model('shoptask', 'Attachment')
+
+        # object to the one hold the picture pointer
+        owners = dict()
+        goods_list = [obj for obj in objs if isinstance(obj, Goods)]
+        catalogs = self._catalogs([goods for goods in goods_list if not goods.primary_picture_id])
+
+        for obj in objs:
+            self.pictures[(obj.__class__, obj.pk)] = None
+
+            owner = obj
+            if isinstance(obj, Goods) and not obj.primary_picture_id:
+                owner = catalogs.get(obj.id, None)
+
+            if owner is not None and owner.primary_picture_id:
+                owners[(obj.__class__, obj.pk)] = owner
+
+        # load pictures not selected yet with one query
+        loaded = dict()
+        unloaded = set()
+
+        for owner in owners.values():
+            if owner.__class__.primary_picture.is_cached(owner):
+                loaded[owner.primary_picture_id] = owner.primary_picture
+            else:
+                unloaded.add(owner.primary_picture_id)
+
+        if unloaded:
+            for attachment in Attachment.objects.filter(id__in=unloaded):
+                loaded[attachment.id] = attachment
+
+        for key, owner in owners.items():
+            self.pictures[key] = loaded.get(owner.primary_picture_id, None)
+
+    def get(self, obj):
+        key = (obj.__class__, obj.pk)
+        if key not in self.pictures:
+            self.resolve([obj])
+        return self.pictures.get(key, None)
+
+    def get_url(self, obj, request):
+        picture = self.get(obj)
+        if picture and picture.value_image:
+            return request.build_absolute_uri(picture.value_image.url)
+        return None
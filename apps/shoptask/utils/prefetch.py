@@ -0,0 +1,54 @@
+from django.db.models import Prefetch, Case, When, Value, BooleanField
+
+from utils.generals import get_model
+
+# `to_attr` read by `Purchase.shipping` and `Purchase.assigned`
+DELIVERIES_ATTR = 'prefetched_deliveries'
+ASSIGNEDS_ATTR = 'prefetched_assigneds'
+
+
+def purchase_detail_prefetch():
+    """
+    Prefetch for single Purchase, delivery with the shipping address
+    and assignment with the operator each loaded in one query
+    -------------
+    Egg: Purchase.objects.prefetch_related(*purchase_detail_prefetch())
+    """
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+    PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+
+    deliveries = PurchaseDelivery.objects \
+        .select_related('shipping_address') \
+        .order_by('id')
+
+    assigneds = PurchaseAssigned.objects \
+        .select_related('operator', 'operator__account', 'operator__profile') \
+        .order_by('id')
+
+    return (
+        Prefetch('purchase_deliveries', queryset=deliveries, to_attr=DELIVERIES_ATTR),
+        Prefetch('purchase_assigneds', queryset=assigneds, to_attr=ASSIGNEDS_ATTR),
+    )
+
+
+def necessary_goods_prefetch(picture=False):
+    """
+    All goods of the necessaries with one query, pictures joined if asked
+    -------------
+    Egg: Necessary.objects.prefetch_related(necessary_goods_prefetch())
+    """
+    Goods = get_model('shoptask', 'Goods')
+
+    select_related = ['goods_catalog', 'goods_catalog__catalog', 'assigned']
+    if picture:
+        select_related.extend(['primary_picture', 'goods_catalog__catalog__primary_picture'])
+
+    queryset = Goods.objects \
+        .select_related(*select_related) \
+        .annotate(is_from_catalog=Case(
+            When(goods_catalog__isnull=False, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        )) \
+        .order_by('-date_created', '-id')
+    return Prefetch('goods', queryset=queryset)
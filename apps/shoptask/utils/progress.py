@@ -0,0 +1,231 @@
+from django.db.models import (
+    F, Q, Count, Sum, Value, Subquery, OuterRef, IntegerField, CharField, Case, When)
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from utils.generals import get_model
+from apps.shoptask.utils.constant import LEFT, SKIP, DONE, ACCEPT
+
+# Counters shared by Necessary and Purchase
+PROGRESS_COUNTERS = ('total_count', 'done_count', 'skip_count', 'accept_count', 'left_count',
+                     'bill_summary',)
+
+
+def update_progress(necessary_id=None, purchase_id=None, delta=None):
+    """
+    Apply counters delta to Necessary and Purchase
+    each with single UPDATE, no save() and signals fired
+    ------------
+    Necessary `version` and `date_updated` bumped in the same UPDATE, even without delta
+    :delta egg: {'total_count': 1, 'left_count': 1}
+    """
+    Necessary = get_model('shoptask', 'Necessary')
+    Purchase = get_model('shoptask', 'Purchase')
+
+    delta = delta or dict()
+    values = {key: F(key) + value for key, value in delta.items() if value}
+
+    if necessary_id:
+        Necessary.objects.filter(id=necessary_id) \
+            .update(version=F('version') + 1, date_updated=now(),
+                    **{key: values[key] for key in values if key in PROGRESS_COUNTERS})
+
+    purchase_values = {key: values[key] for key in values if key in PROGRESS_COUNTERS}
+    if purchase_id and purchase_values:
+        Purchase.objects.filter(id=purchase_id).update(date_updated=now(), **purchase_values)
+
+
+def bump_version(necessary_ids=None, goods_ids=None):
+    """
+    Mark Necessary changed without touching the counters
+    :goods_ids can be a queryset, the Necessary of each Goods bumped
+    """
+    Necessary = get_model('shoptask', 'Necessary')
+    Goods = get_model('shoptask', 'Goods')
+
+    lookup = Q(id__in=list(necessary_ids or []))
+    if goods_ids is not None:
+        lookup |= Q(id__in=Goods.objects.filter(id__in=goods_ids).values('necessary_id'))
+    return Necessary.objects.filter(lookup).update(version=F('version') + 1, date_updated=now())
+
+
+def move_progress(old_parents=None, old=None, new_parents=None, new=None):
+    """
+    Object changed from `old` counters on `old_parents`
+    to `new` counters on `new_parents`
+    :parents is tuple (necessary_id, purchase_id)
+    """
+    old = old or dict()
+    new = new or dict()
+
+    if old_parents and new_parents and tuple(old_parents) == tuple(new_parents):
+        delta = {key: new.get(key, 0) - old.get(key, 0) for key in set(old) | set(new)}
+        update_progress(*new_parents, delta=delta)
+        return
+
+    if old_parents and old:
+        update_progress(*old_parents, delta={key: -value for key, value in old.items()})
+
+    if new_parents and new:
+        update_progress(*new_parents, delta=new)
+
+
+def _subquery(queryset, lookup, aggregate):
+    """Aggregate `queryset` grouped by `lookup` for each outer row"""
+    queryset = queryset.filter(**{lookup: OuterRef('pk')}) \
+        .order_by() \
+        .values(lookup) \
+        .annotate(value=aggregate) \
+        .values('value')
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), Value(0))
+
+
+def progress_expressions(lookup):
+    """
+    Counters expression from Goods and GoodsAssigned
+    :lookup is `necessary` or `purchase`
+    """
+    Goods = get_model('shoptask', 'Goods')
+    GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+
+    goods = Goods.objects.all()
+    goods_assigned = GoodsAssigned.objects.all()
+    goods_lookup = 'goods__%s' % lookup
+
+    return {
+        'total_count': _subquery(goods, lookup, Count('pk')),
+        'done_count': _subquery(goods_assigned.filter(is_done=True), goods_lookup, Count('pk')),
+        'skip_count': _subquery(goods_assigned.filter(is_skip=True), goods_lookup, Count('pk')),
+        'accept_count': _subquery(goods_assigned.filter(is_accept=True), goods_lookup, Count('pk')),
+        'left_count': _subquery(goods.filter(goods_assigned__isnull=True), lookup, Count('pk')),
+        'bill_summary': _subquery(goods, lookup, Sum('bill')),
+    }
+
+
+def recount_progress(necessary_ids=None, purchase_ids=None):
+    """
+    Recompute counters from scratch with one UPDATE for Necessary
+    and one UPDATE for Purchase, used after bulk write and by reconciliation
+    ------------
+    Necessary inside :purchase_ids and Purchase of :necessary_ids follow
+    """
+    Necessary = get_model('shoptask', 'Necessary')
+    Purchase = get_model('shoptask', 'Purchase')
+
+    necessary_ids = list(necessary_ids or [])
+    purchase_ids = list(purchase_ids or [])
+    if not necessary_ids and not purchase_ids:
+        return 0, 0
+
+    necessaries = Necessary.objects \
+        .filter(Q(id__in=necessary_ids) | Q(purchase_id__in=purchase_ids))
+    purchases = Purchase.objects \
+        .filter(Q(id__in=purchase_ids)
+                | Q(id__in=Necessary.objects.filter(id__in=necessary_ids).values('purchase_id')))
+
+    expressions = progress_expressions('necessary')
+    necessary_count = necessaries.update(version=F('version') + 1, date_updated=now(),
+                                         **{key: expressions[key] for key in PROGRESS_COUNTERS})
+
+    expressions = progress_expressions('purchase')
+    purchase_count = purchases.update(date_updated=now(),
+                                      **{key: expressions[key] for key in PROGRESS_COUNTERS})
+    return necessary_count, purchase_count
+
+
+def progress_drift(necessary_ids=None, purchase_ids=None):
+    """
+    How many Necessary and Purchase stored counters differ from the
+    recomputed one, same selection as `recount_progress`
+    """
+    Necessary = get_model('shoptask', 'Necessary')
+    Purchase = get_model('shoptask', 'Purchase')
+
+    necessary_ids = list(necessary_ids or [])
+    purchase_ids = list(purchase_ids or [])
+    if not necessary_ids and not purchase_ids:
+        return 0, 0
+
+    necessaries = Necessary.objects \
+        .filter(Q(id__in=necessary_ids) | Q(purchase_id__in=purchase_ids))
+    purchases = Purchase.objects \
+        .filter(Q(id__in=purchase_ids)
+                | Q(id__in=Necessary.objects.filter(id__in=necessary_ids).values('purchase_id')))
+
+    counts = list()
+    for queryset, lookup in ((necessaries, 'necessary'), (purchases, 'purchase')):
+        expressions = progress_expressions(lookup)
+        drifted = Q()
+        for key in PROGRESS_COUNTERS:
+            drifted |= ~Q(**{key: F('expected_%s' % key)})
+
+        queryset = queryset \
+            .annotate(**{'expected_%s' % key: expressions[key] for key in PROGRESS_COUNTERS}) \
+            .filter(drifted)
+        counts.append(queryset.count())
+    return tuple(counts)
+
+
+def goods_status_expressions():
+    """
+    Current GoodsAssigned (the newest) and status it give to Goods
+    same precedence as `GoodsAssigned.goods_status`
+    """
+    GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+
+    current = GoodsAssigned.objects \
+        .filter(goods_id=OuterRef('pk')) \
+        .order_by('-date_created', '-id') \
+        .annotate(goods_status=Case(
+            When(is_accept=True, then=Value(ACCEPT)),
+            When(is_done=True, then=Value(DONE)),
+            When(is_skip=True, then=Value(SKIP)),
+            default=Value(LEFT),
+            output_field=CharField()
+        ))
+
+    return {
+        'assigned': Subquery(current.values('id')[:1]),
+        'status': Coalesce(Subquery(current.values('goods_status')[:1], output_field=CharField()),
+                           Value(LEFT)),
+    }
+
+
+def recount_goods_status(goods_ids=None, purchase_ids=None):
+    """
+    Point Goods to their current GoodsAssigned with single UPDATE,
+    used when assignment deleted or written in bulk
+    """
+    Goods = get_model('shoptask', 'Goods')
+
+    goods_ids = list(goods_ids or [])
+    purchase_ids = list(purchase_ids or [])
+    if not goods_ids and not purchase_ids:
+        return 0
+
+    return Goods.objects \
+        .filter(Q(id__in=goods_ids) | Q(purchase_id__in=purchase_ids)) \
+        .update(date_updated=now(), **goods_status_expressions())
+
+
+def accept_goods(purchase_ids=None):
+    """
+    Mark current GoodsAssigned (the newest) of each Goods accepted
+    with single UPDATE, return how many changed
+    ------------
+    No signals fired, caller recount progress and Goods status
+    """
+    GoodsAssigned = get_model('shoptask', 'GoodsAssigned')
+
+    purchase_ids = list(purchase_ids or [])
+    if not purchase_ids:
+        return 0
+
+    current = GoodsAssigned.objects \
+        .filter(goods_id=OuterRef('goods_id')) \
+        .order_by('-date_created', '-id')
+
+    return GoodsAssigned.objects \
+        .filter(goods__purchase_id__in=purchase_ids, is_accept=False,
+                id=Subquery(current.values('id')[:1])) \
+        .update(is_accept=True, date_updated=now())
@@ -0,0 +1,31 @@
+from django.db.models import Count, Sum, Max
+
+from utils.generals import get_model
+from apps.shoptask.utils.prefetch import DELIVERIES_ATTR, ASSIGNEDS_ATTR
+
+
+def snapshot_version(purchase):
+    """
+    Parts changed each time something in the Purchase tree changed
+    -------------
+    Purchase must loaded with `purchase_detail_prefetch`, only one more
+    query for the Necessary. Their `version` bumped by Goods, assignment
+    and picture changes, count and date catch created or deleted one.
+    """
+    Necessary = get_model('shoptask', 'Necessary')
+
+    necessaries = Necessary.objects \
+        .filter(purchase_id=purchase.id) \
+        .aggregate(count=Count('id'), version=Sum('version'), updated=Max('date_updated'))
+
+    deliveries = [(obj.id, obj.schedule_date, obj.schedule_time_start, obj.schedule_time_end,
+                   obj.shipping_address_id,
+                   obj.shipping_address.date_updated if obj.shipping_address else None)
+                  for obj in getattr(purchase, DELIVERIES_ATTR)]
+
+    assigneds = [(obj.id, obj.operator_id, obj.is_done, obj.is_accept)
+                 for obj in getattr(purchase, ASSIGNEDS_ATTR)]
+
+    return [purchase.id, purchase.status, purchase.date_updated,
+            necessaries['count'], necessaries['version'], necessaries['updated'],
+            deliveries, assigneds]
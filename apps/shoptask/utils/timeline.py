@@ -0,0 +1,66 @@
+from django.db.models import F, Value, CharField
+from django.db.models.functions import Cast, Coalesce
+from django.contrib.contenttypes.models import ContentType
+
+from utils.generals import get_model
+
+# Timeline event
+STATUS_EVENT = 'status'
+ASSIGNED_EVENT = 'assigned'
+DELIVERY_EVENT = 'delivery'
+
+# Newest events returned by the endpoint
+TIMELINE_LIMIT = 100
+
+TIMELINE_FIELDS = ('event', 'date', 'old_value', 'new_value',)
+_COLUMNS = ('timeline_event', 'timeline_date', 'timeline_old', 'timeline_new',)
+
+
+def purchase_timeline(purchase, limit=None):
+    """
+    Status ChangeLog, operator assignment and delivery of a Purchase
+    merged with one UNION query newest first
+    -------------
+    ChangeLog read through `changelog_object_idx`,
+    the others through their `purchase` foreign key index
+    """
+    ChangeLog = get_model('shoptask', 'ChangeLog')
+    PurchaseAssigned = get_model('shoptask', 'PurchaseAssigned')
+    PurchaseDelivery = get_model('shoptask', 'PurchaseDelivery')
+
+    content_type = ContentType.objects.get_for_model(purchase, for_concrete_model=False)
+
+    def columns(event, date, old_value, new_value):
+        """Same annotation order in each part, UNION match column by position"""
+        text = CharField()
+        return {
+            'timeline_event': Value(event, output_field=text),
+            'timeline_date': date,
+            'timeline_old': old_value,
+            'timeline_new': new_value,
+        }
+
+    empty = Value('', output_field=CharField())
+    changelogs = ChangeLog.objects \
+        .filter(content_type_id=content_type.id, object_id=purchase.id, column='status') \
+        .annotate(**columns(STATUS_EVENT, F('date_created'), F('old_value'), F('new_value'))) \
+        .order_by() \
+        .values_list(*_COLUMNS)
+
+    assigneds = PurchaseAssigned.objects \
+        .filter(purchase_id=purchase.id) \
+        .annotate(**columns(ASSIGNED_EVENT, F('date_updated'), empty, F('operator__username'))) \
+        .order_by() \
+        .values_list(*_COLUMNS)
+
+    deliveries = PurchaseDelivery.objects \
+        .filter(purchase_id=purchase.id) \
+        .annotate(**columns(DELIVERY_EVENT, F('date_updated'), empty,
+                            Coalesce(Cast('schedule_date', output_field=CharField()), empty))) \
+        .order_by() \
+        .values_list(*_COLUMNS)
+
+    queryset = changelogs.union(assigneds, deliveries, all=True).order_by('-timeline_date')
+    if limit:
+        queryset = queryset[:limit]
+    return [dict(zip(TIMELINE_FIELDS, row)) for row in queryset]
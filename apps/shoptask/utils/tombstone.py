@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+from django.contrib.contenttypes.models import ContentType
+from django.utils.timezone import now
+
+from utils.generals import get_model
+from utils.sync import SyncExpired, parse_since, sync_token
+from apps.shoptask.utils.log import write_on_commit
+
+# Tombstone kept this long, older `since` must fetch the full list
+TOMBSTONE_DAYS = 30
+
+
+def bury(model, object_uuid, user_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Remember deleted object for each user who listed it,
+    written with the ChangeLog once transaction committed,
+    delete rolled back with its savepoint leave no Tombstone
+    """
+    Tombstone = get_model('shoptask', 'Tombstone')
+
+    content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+    write_on_commit([Tombstone(content_type=content_type, object_uuid=object_uuid, user_id=user_id)
+                     for user_id in sorted(set(user_ids)) if user_id], using=using)
+
+
+def deleted_since(model, user_id, since):
+    """Uuid of :model deleted after :since seen by the user"""
+    Tombstone = get_model('shoptask', 'Tombstone')
+
+    content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+    return list(Tombstone.objects
+                .filter(user_id=user_id, content_type_id=content_type.id, date_created__gt=since)
+                .order_by()
+                .values_list('object_uuid', flat=True)
+                .distinct())
+
+
+class DeltaSyncMixin:
+    """
+    `since` param on list, only row updated after it returned
+    with the `deleted` uuids and `sync_token` for the next one
+    -------------
+    View set `sync_model`, filter queryset with `filter_since`
+    and put `get_sync()` to the response.
+    """
+    sync_model = None
+
+    def get_since(self):
+        if not hasattr(self, '_since'):
+            self._sync_started = now()
+            value = self.request.query_params.get('since', None)
+            self._since = parse_since(value) if value else None
+
+            if self._since and self._since < now() - timedelta(days=TOMBSTONE_DAYS):
+                raise SyncExpired()
+        return self._since
+
+    def filter_since(self, queryset):
+        since = self.get_since()
+        if since:
+            queryset = queryset.filter(date_updated__gt=since)
+        return queryset
+
+    def get_sync(self):
+        since = self.get_since()
+        sync = {'sync_token': sync_token(self._sync_started)}
+        if since:
+            sync['deleted'] = deleted_since(self.sync_model, self.request.user.id, since)
+        return sync
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers, status as response_status
+from rest_framework.exceptions import APIException
+
+from utils.generals import get_model
+from apps.shoptask.utils.constant import (
+    DRAFT, SUBMITTED, REVIEWED, ASSIGNED, PROCESSED, DONE, ACCEPT, REJECTED)
+from apps.shoptask.utils.log import CreateChangeLog
+
+# Purchase status allowed next
+# customer can pull back or resubmit until an operator assigned,
+# after that only the operator move it forward
+TRANSITIONS = {
+    DRAFT: (SUBMITTED,),
+    SUBMITTED: (DRAFT, REVIEWED, ASSIGNED, REJECTED,),
+    REVIEWED: (DRAFT, SUBMITTED, ASSIGNED, REJECTED,),
+    ASSIGNED: (REVIEWED, PROCESSED,),
+    PROCESSED: (DONE,),
+    DONE: (ACCEPT,),
+    REJECTED: (DRAFT, SUBMITTED,),
+    ACCEPT: (),
+}
+
+
+class TransitionConflict(APIException):
+    status_code = response_status.HTTP_409_CONFLICT
+    default_detail = _("Purchase status already changed, reload and try again.")
+    default_code = 'conflict'
+
+
+def transition_purchase(purchase, status, validate=True):
+    """
+    Move Purchase to `status` with single compare-and-swap UPDATE
+    -------------
+    UPDATE ... WHERE id = ? AND status = <status the instance have>
+    no row lock held, other request changed it first get TransitionConflict.
+    ChangeLog written in the same transaction, post_save sent manually
+    so handlers (egg: accept the Goods) still run.
+    :validate False only for system move (egg: operator assigned)
+    """
+    Purchase = get_model('shoptask', 'Purchase')
+
+    expected = purchase.status
+    if status == expected:
+        return purchase
+
+    if validate and status not in TRANSITIONS.get(expected, ()):
+        raise serializers.ValidationError({'status': _("You can't perform this action.")})
+
+    with transaction.atomic():
+        updated = Purchase.objects \
+            .filter(id=purchase.id, status=expected) \
+            .update(status=status, date_updated=now())
+
+        if not updated:
+            raise TransitionConflict()
+
+        CreateChangeLog(obj=purchase, obj_id=purchase.id, column='status',
+                        old_value=expected, new_value=status).save()
+
+        purchase.sync_status(status)
+        post_save.send(sender=Purchase, instance=purchase, created=False,
+                       update_fields=frozenset(['status', 'date_updated']),
+                       raw=False, using=purchase._state.db)
+    return purchase
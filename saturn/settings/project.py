@@ -133,3 +133,6 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': PAGINATION_PER_PAGE
 }
+
+# Write ChangeLog in background executor after commit
+CHANGELOG_QUEUE = False
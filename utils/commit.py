@@ -0,0 +1,77 @@
+import weakref
+from threading import local
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# Collectors of current transaction, one each thread, alias and name
+_COLLECTORS = local()
+
+
+class CommitCollector:
+    """
+    Values collected during the outermost transaction,
+    handed once to `flush(values, using)` after commit
+    -------------
+    Each value remember the savepoint it added in, one `on_commit` hook
+    registered each savepoint. Hook held here only by weak reference:
+    Django drop the hook of rolled back savepoint, so it die without run
+    and values added inside that savepoint not flushed.
+    Rely on CPython reference counting, the dropped hook freed at once.
+    """
+
+    def __init__(self, flush, using=DEFAULT_DB_ALIAS):
+        self.flush = flush
+        self.using = using
+        self.hooks = dict()
+        self.entries = list()
+        self.done = False
+
+    def is_active(self):
+        """Transaction not committed yet and not rolled back as whole"""
+        return not self.done and any(ref() is not None for ref in self.hooks.values())
+
+    def add(self, value):
+        savepoint = tuple(connections[self.using].savepoint_ids)
+        if savepoint not in self.hooks:
+            hook = self.make_hook()
+            self.hooks[savepoint] = weakref.ref(hook)
+            transaction.on_commit(hook, using=self.using)
+        self.entries.append((savepoint, value))
+
+    def make_hook(self):
+        def hook():
+            # first hook run flush all, the rest still waiting alive
+            if self.done:
+                return
+            self.done = True
+
+            committed = set(savepoint for savepoint, ref in self.hooks.items()
+                            if ref() is not None)
+            values = [value for savepoint, value in self.entries if savepoint in committed]
+            self.entries = list()
+            if values:
+                self.flush(values, self.using)
+        return hook
+
+
+def collect(name, value, flush, using=DEFAULT_DB_ALIAS):
+    """
+    Queue :value to `flush` after commit, outside transaction flushed immediately
+    -------------
+    :name one collector each name, egg: 'changelog'
+    :flush called with list of values in added order and the alias
+    """
+    if not connections[using].in_atomic_block:
+        flush([value], using)
+        return
+
+    collectors = getattr(_COLLECTORS, using, None)
+    if collectors is None:
+        collectors = dict()
+        setattr(_COLLECTORS, using, collectors)
+
+    collector = collectors.get(name, None)
+    if collector is None or not collector.is_active():
+        collector = CommitCollector(flush, using=using)
+        collectors[name] = collector
+    collector.add(value)
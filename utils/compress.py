@@ -0,0 +1,30 @@
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from rest_framework import status as response_status
+from rest_framework.renderers import JSONRenderer
+
+# Smaller body not worth the compression
+MIN_COMPRESS_SIZE = 200
+
+
+def compressed_response(request, data, status=response_status.HTTP_200_OK):
+    """
+    JSON response gzipped if client accept it
+    -------------
+    Rendered here, not by the view renderer, so the body
+    can compressed without GZipMiddleware for whole site.
+    """
+    content = JSONRenderer().render(data)
+    response = HttpResponse(content_type='application/json', status=status)
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if 'gzip' in accept and len(content) >= MIN_COMPRESS_SIZE:
+        content = compress_string(content)
+        response['Content-Encoding'] = 'gzip'
+
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    return response
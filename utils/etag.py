@@ -0,0 +1,47 @@
+import json
+import hashlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+from rest_framework import status as response_status
+from rest_framework.response import Response
+
+
+def make_etag(request, *parts):
+    """
+    Weak ETag from `parts` (egg: version stamp) and what the
+    user asked for, so each user and filter set has own tag
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    identity = [request.user.id, request.path, params, parts]
+
+    digest = hashlib.md5(json.dumps(identity, cls=DjangoJSONEncoder).encode('utf-8')).hexdigest()
+    return 'W/%s' % quote_etag(digest)
+
+
+def etag_matches(request, etag):
+    """`If-None-Match` sent contain the etag, weak comparison"""
+    header = request.META.get('HTTP_IF_NONE_MATCH', None)
+    if not header or not etag:
+        return False
+
+    tags = parse_etags(header)
+    if '*' in tags:
+        return True
+
+    strip = lambda tag: tag[2:] if tag.startswith('W/') else tag
+    return strip(etag) in [strip(tag) for tag in tags]
+
+
+def set_etag(response, etag):
+    """Client keep the response but always ask again"""
+    if etag:
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(etag):
+    return set_etag(Response(status=response_status.HTTP_304_NOT_MODIFIED), etag)
@@ -0,0 +1,160 @@
+import math
+
+import numpy as np
+
+from django.db.models import Q
+
+# Kilometer each degree of latitude
+KM_PER_DEGREE = 111.32
+
+# Mean earth radius in kilometer
+EARTH_RADIUS = 6371.0
+
+# Geohash stored with this length, about 5 meter cell
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Sort after every geohash character, end of prefix range
+_GEOHASH_END = '{'
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    ((min lat, max lat), (min lng, max lng)) around the point
+    -------------
+    :radius in kilometer, the box a bit larger than the circle
+    but can use plain index range on latitude and longitude
+    """
+    lat_delta = radius / KM_PER_DEGREE
+    lng_delta = radius / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return ((latitude - lat_delta, latitude + lat_delta),
+            (longitude - lng_delta, longitude + lng_delta))
+
+
+def haversine_matrix(origins, targets):
+    """
+    Great-circle distance in kilometer each origin to each target
+    -------------
+    :origins sequence of (latitude, longitude), N items
+    :targets sequence of (latitude, longitude), M items
+    Return numpy array with shape (N, M)
+    """
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    targets = np.radians(np.asarray(targets, dtype=float).reshape(-1, 2))
+
+    lat1, lng1 = origins[:, 0][:, None], origins[:, 1][:, None]
+    lat2, lng2 = targets[:, 0][None, :], targets[:, 1][None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 \
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of the point, None if one of them empty"""
+    if latitude is None or longitude is None:
+        return None
+
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = list()
+    bits = 0
+    value = 0
+    even = True
+
+    while len(geohash) < precision:
+        # bits alternate, longitude first
+        if even:
+            interval, coordinate = lng_range, longitude
+        else:
+            interval, coordinate = lat_range, latitude
+
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+
+        even = not even
+        bits += 1
+        if bits == 5:
+            geohash.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(geohash)
+
+
+def geohash_cell_size(precision):
+    """(height, width) in degree of geohash cell with the length"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lng_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def geohash_cells(latitude, longitude, radius):
+    """
+    Geohash prefixes covering the circle, None if too big for any
+    -------------
+    Longest prefix with cell not smaller than :radius taken,
+    the cell of the point and the 8 around it cover the circle.
+    """
+    lng_scale = max(math.cos(math.radians(latitude)), 0.01)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        if height * KM_PER_DEGREE >= radius and width * KM_PER_DEGREE * lng_scale >= radius:
+            break
+    else:
+        return None
+
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            lat = min(max(latitude + lat_step * height, -90.0), 90.0 - 1e-9)
+            lng = (longitude + lng_step * width + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(lat, lng, precision=precision))
+    return sorted(cells)
+
+
+def nearby_filter(latitude, longitude, radius, lookup=''):
+    """
+    Q of rows maybe inside the circle, exact distance not checked
+    -------------
+    Geohash prefix as index range (work on every backend, no PostGIS)
+    then the bounding box on plain latitude and longitude.
+    :lookup path to model with `geohash`, `latitude` and `longitude`
+            egg: 'shipping_address__'
+    """
+    (lat_min, lat_max), (lng_min, lng_max) = bounding_box(latitude, longitude, radius)
+    query = Q(**{lookup + 'latitude__range': (lat_min, lat_max),
+                 lookup + 'longitude__range': (lng_min, lng_max)})
+
+    cells = geohash_cells(latitude, longitude, radius)
+    if cells:
+        prefix = Q()
+        for cell in cells:
+            prefix |= Q(**{lookup + 'geohash__gte': cell,
+                           lookup + 'geohash__lt': cell + _GEOHASH_END})
+        query &= prefix
+    return query
+
+
+def nearby(queryset, latitude, longitude, radius, lookup='', key='pk'):
+    """
+    [(key, distance km), ...] inside the circle, nearest first
+    -------------
+    Rows prefiltered by `nearby_filter`, distance of the rest
+    computed at once with numpy.
+    """
+    rows = list(queryset
+                .filter(nearby_filter(latitude, longitude, radius, lookup=lookup))
+                .values_list(key, lookup + 'latitude', lookup + 'longitude'))
+    if not rows:
+        return list()
+
+    distance = haversine_matrix([(latitude, longitude)], [row[1:] for row in rows])[0]
+    order = np.argsort(distance, kind='stable')
+    return [(rows[index][0], float(distance[index]))
+            for index in order.tolist() if distance[index] <= radius]
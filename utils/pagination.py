@@ -1,4 +1,16 @@
+import json
+import base64
+import binascii
+import datetime
+
 from django.conf import settings
+from django.db.models import Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class Pagination:
@@ -17,3 +29,139 @@ class Pagination:
         self.root_queryset = queryset
         self.show_all = False
         self.show_full_result_count = True
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on `ordering` fields, last field must unique (egg: id)
+    -------------
+    Create one for each request, state never shared between requests.
+    Deep page cost same as first page because no OFFSET used,
+    `count` only calculated if `?count=true` sent.
+    :counter optional object with `get_count(queryset, approximate)`,
+             used for `?count=approximate` too
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    count_query_param = 'count'
+    max_limit = 100
+
+    def __init__(self, ordering=('-date_created', '-id',), counter=None):
+        self.ordering = tuple(ordering)
+        self.counter = counter
+        self.default_limit = settings.PAGINATION_PER_PAGE
+        self.request = None
+        self.count = None
+        self.offset = None
+        self.limit = self.default_limit
+        self.next_position = None
+        self.previous_position = None
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+            if limit > 0:
+                return min(limit, self.max_limit)
+        except (KeyError, ValueError):
+            pass
+        return self.default_limit
+
+    def decode_cursor(self, request):
+        """Return (position, reverse) or (None, False) for first page"""
+        encoded = request.query_params.get(self.cursor_query_param, None)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = cursor['p']
+            reverse = bool(cursor.get('r', False))
+            if len(position) != len(self.ordering):
+                raise ValueError()
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(_("Invalid cursor."))
+        return position, reverse
+
+    def encode_cursor(self, position, reverse=False):
+        # keep microsecond, DjangoJSONEncoder cut it to millisecond
+        position = [value.isoformat() if isinstance(value, datetime.datetime) else value
+                    for value in position]
+        cursor = json.dumps({'p': position, 'r': reverse}, cls=DjangoJSONEncoder)
+        encoded = base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def get_keyset_filter(self, model, position, reverse=False):
+        """
+        Rows after `position` in ordering, egg for (-date_created, -id);
+        date_created < x OR (date_created = x AND id < y)
+        """
+        keyset = Q()
+        equals = dict()
+
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            value = model._meta.get_field(name).to_python(value)
+            descending = field.startswith('-') != reverse
+            lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+
+            keyset |= Q(**equals, **{lookup: value})
+            equals[name] = value
+        return keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        position, reverse = self.decode_cursor(request)
+
+        count = request.query_params.get(self.count_query_param, None)
+        if count in ('true', '1', 'approximate'):
+            if self.counter is not None:
+                self.count = self.counter.get_count(queryset, approximate=count == 'approximate')
+            else:
+                self.count = queryset.count()
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else '-%s' % field for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(queryset.model, position, reverse))
+
+        results = list(queryset[:self.limit + 1])
+        has_following = len(results) > self.limit
+        results = results[:self.limit]
+
+        if reverse:
+            results.reverse()
+
+        self.next_position = None
+        self.previous_position = None
+
+        if results:
+            first = self.get_position(results[0])
+            last = self.get_position(results[-1])
+
+            # going back always has next page, going forward has previous page if cursor sent
+            if reverse:
+                self.next_position = last
+                self.previous_position = first if has_following else None
+            else:
+                self.next_position = last if has_following else None
+                self.previous_position = first if position is not None else None
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status as response_status
+from rest_framework.exceptions import APIException, NotAcceptable
+
+# Token issued a bit back, row written by transaction
+# still open at request time received next sync
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class SyncExpired(APIException):
+    status_code = response_status.HTTP_410_GONE
+    default_detail = _("Sync token expired, fetch the full list again.")
+    default_code = 'sync_expired'
+
+
+def sync_token(started):
+    """Opaque token for next `since`, epoch in microsecond"""
+    return str(int((started - SYNC_OVERLAP).timestamp() * 1000000))
+
+
+def parse_since(value):
+    """
+    `since` as sync token or ISO datetime, return aware datetime
+    naive datetime read as current timezone
+    """
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value) / 1000000, tz=timezone.utc)
+
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+
+    if since is None:
+        raise NotAcceptable(detail=_("Invalid since, use sync token or ISO datetime."))
+
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since